@@ -0,0 +1,14 @@
+"""
+Headless Python library for the DDU Clay 3D-Printing Slicer.
+
+The modules in this package contain the Rhino-free core logic used by some
+of the Grasshopper UserObjects in ``grasshopper_userobjects_src``. They only
+depend on the Python standard library (and NumPy where noted) so they can be
+run, profiled and benchmarked outside of Rhino/Grasshopper.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+__version__ = '261018'
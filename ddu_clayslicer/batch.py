@@ -0,0 +1,426 @@
+"""
+Command line batch slicing of model libraries.
+
+Slices every mesh (OBJ, STL, PLY) of a folder with one settings file and
+writes one G-code file per model plus a summary CSV of the estimated print
+times. Models are processed in parallel on a process pool, every model is an
+independent task (the largest files are submitted first), so the run time
+scales with the number of worker processes as long as there are more models
+than workers.
+
+    python -m ddu_clayslicer.batch MODELS SETTINGS.json -o OUTPUT -j 8
+
+The settings file is a JSON object using the input names of the definition
+components, missing keys use ``DEFAULT_SETTINGS``:
+
+    {"LayerHeight": 2.0, "LineWidth": 4.0, "SpiralizeContours": true,
+     "RandomizeSeam": false, "FloorLayerCount": 3}
+
+The G-code follows the GenerateGCODE component (same header, layer comments,
+travel and retraction moves). Paths are centered on the XY origin.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import argparse
+import csv
+import datetime
+import getpass
+import json
+import os
+import time
+from multiprocessing import Pool
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# LOCAL IMPORTS
+from .gcode_codecs import GCodeBlock
+from .gcode_format import GCodeFormatter
+from .gcode_writer import write_gcode
+from .mesh_io import MESH_EXTENSIONS, read_mesh
+from .planar_slicer import layer_heights, slice_mesh
+from .print_time import DEFAULT_ACCELERATION, estimate_print
+from .toolpaths import (RESET, adjust_seams, build_moves, floor_infill,
+                        polyline_paths, spiralize)
+
+# settings of the batch slicer, named like the definition inputs
+DEFAULT_SETTINGS = {
+    # slicing
+    'LayerHeight': 2.0,
+    'LineWidth': 4.0,
+    # seams (AdjustSliceSeams)
+    'SeamAdjust': 0.0,
+    'RandomizeSeam': False,
+    'Seed': 0,
+    # spiralized contours (not applied to floors and branching models)
+    'SpiralizeContours': False,
+    # number of filled floor layers at the bottom, infill angle in degrees
+    'FloorLayerCount': 0,
+    'FloorAngle': 45.0,
+    # GenerateGCODE
+    'PrintSpeed': 1500.0,
+    'TravelSpeed': 3000.0,
+    'RetractionSpeed': 1500.0,
+    'ExtrusionRate': 1.0,
+    'InitExtrusionConstant': 0.0,
+    'RetractionConstant': 0.0,
+    'ZHopDistance': 0.0,
+    # print time estimation in mm/s^2, 0 for constant speeds
+    'Acceleration': DEFAULT_ACCELERATION,
+}
+
+# columns of the summary CSV
+SUMMARY_FIELDS = ('model', 'status', 'triangles', 'layers', 'paths',
+                  'spiralized', 'lines', 'hours', 'minutes', 'seconds',
+                  'print_time_s', 'clay_l', 'slice_s', 'gcode', 'error')
+
+# safe approach height above the first point, like GenerateGCODE
+Z_SAFETY = 5.0
+
+GCODE_FOOTER = [
+    "G1 E-1 ; retract",
+    "G92 E0 ; reset E value",
+    "M104 S0 ; turn off extruder",
+    "M140 S0 ; turn off bed",
+    "G28 X0 Y0 ; home all axes",
+    "M84; disable motors",
+    "M82 ; absolute extrusion mode",
+    "; --- END OF GCODE ---",
+]
+
+
+def _setting_value(key, value):
+    """
+    Return ``value`` with the type of the default of setting ``key``, raise
+    ValueError if the JSON type does not match instead of converting it.
+    """
+    default = DEFAULT_SETTINGS[key]
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+    elif isinstance(value, bool):
+        pass
+    elif isinstance(default, int):
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif isinstance(value, (int, float)):
+        return float(value)
+    raise ValueError('Setting {0} has to be {1}, got {2!r}!'.format(
+        key, {bool: 'a boolean', int: 'an integer'}.get(type(default),
+                                                       'a number'), value))
+
+
+def load_settings(path=None, **overrides):
+    """
+    Return the settings of a JSON settings file merged into the defaults.
+    Raises ValueError on unknown keys and on values whose type does not
+    match the type of the default (booleans have to be booleans, integers
+    integral numbers).
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    data = {}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError('Settings file has to contain a JSON object!')
+    data.update(overrides)
+    unknown = sorted(set(data).difference(DEFAULT_SETTINGS))
+    if unknown:
+        raise ValueError('Unknown settings: {0}'.format(', '.join(unknown)))
+    for key, value in data.items():
+        settings[key] = _setting_value(key, value)
+    if settings['LayerHeight'] <= 0 or settings['LineWidth'] <= 0:
+        raise ValueError('LayerHeight and LineWidth have to be positive!')
+    return settings
+
+
+def find_models(folder):
+    """Return the paths of all mesh files in a folder, largest first."""
+    paths = [os.path.join(folder, name) for name in os.listdir(folder)
+             if os.path.splitext(name)[1].lower() in MESH_EXTENSIONS]
+    paths = [p for p in paths if os.path.isfile(p)]
+    return sorted(paths, key=lambda p: (-os.path.getsize(p), p))
+
+
+# TOOLPATHS --------------------------------------------------------------------
+
+def model_paths(result, settings):
+    """
+    Create the print paths of a sliced model.
+
+    Returns:
+        tuple: (paths, layers, spiralized) the list of point arrays, the
+               layer index of every path (an array of layer indices per
+               point for the spiral) and whether the contours were
+               spiralized
+    """
+    result = adjust_seams(result, settings['SeamAdjust'],
+                          settings['RandomizeSeam'], settings['Seed'])
+    floors = min(settings['FloorLayerCount'], len(result.heights))
+    contours = polyline_paths(result)
+    planes = result.planes.tolist()
+    paths = []
+    layers = []
+    for plane in range(floors):
+        # contours first, then the infill with alternating directions
+        for path, p in zip(contours, planes):
+            if p == plane:
+                paths.append(path)
+                layers.append(plane)
+        infill = floor_infill(result, plane, settings['LineWidth'],
+                              settings['FloorAngle'] + 90.0 * (plane % 2))
+        paths.extend(infill)
+        layers.extend([plane] * len(infill))
+    spiral = None
+    if settings['SpiralizeContours']:
+        spiral = spiralize(result, first=floors)
+    if spiral is not None:
+        paths.append(spiral)
+        sel = result.planes >= floors
+        layers.append(np.repeat(result.planes[sel],
+                                np.diff(result.offsets)[sel]))
+    else:
+        for path, p in zip(contours, planes):
+            if p >= floors:
+                paths.append(path)
+                layers.append(p)
+    return paths, layers, spiral is not None
+
+
+def gcode_header(settings, name, first_point):
+    """Header lines of the G-code, like the GenerateGCODE component."""
+    p0 = first_point
+    return [
+        "; GCODE Generation Script by: Arkitekturens Teknologi (AT) + "
+        "SuperFormLab",
+        "; Modified, adapted and extended by: Max Eschenbach, DDU - Digital "
+        "Design Unit, TU Darmstadt",
+        "; Created by : {0}".format(getpass.getuser()),
+        "; File name  : {0}".format(name),
+        "; Date time  : {0}".format(
+            datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")),
+        ";",
+        "; --- BEGIN_DDU_3DCLAYPRINTING_HEADER ---",
+        "; PRINTSPEED={0}".format(settings['PrintSpeed']),
+        "; TRAVELSPEED={0}".format(settings['TravelSpeed']),
+        "; RETRACTIONSPEED={0}".format(settings['RetractionSpeed']),
+        "; EXTRUSIONRATE={0}".format(settings['ExtrusionRate']),
+        "; LAYERHEIGHT={0}".format(settings['LayerHeight']),
+        "; LINEWIDTH={0}".format(settings['LineWidth']),
+        "; --- END_DDU_3DCLAYPRINTING_HEADER ---",
+        ";",
+        "M105 ; get extruder temperature",
+        "M109 S0 ; set extruder temp to 0 (deactivate)",
+        "M82 ; use absolute distances for extrusion",
+        "G90 ; use absolute coordintes",
+        "M106 S0 ; set fan speed to 0 (deactivate)",
+        "M107 ; fan off",
+        "M104 S0 T0 ; set hotend temperature to 0 (deactivate)",
+        "G28 ; home all axes",
+        "T0 ; set extruder to extruder 0 (first and only one)",
+        "G21 ; set units to millimetres",
+        "G92 E0 ; reset E distance",
+        "; approach the first vertex using z safety height",
+        "G0 X0.0 Y0.0 Z{0:.3f} F{1}".format(p0[2] + Z_SAFETY, 3000),
+        "; approach first point with x and y coordinates",
+        "G1 X{0:.3f} Y{1:.3f} Z{2:.3f}".format(p0[0], p0[1],
+                                                      p0[2] + Z_SAFETY),
+        "; --- END HEADER ---",
+    ]
+
+
+def iter_gcode(moves, header):
+    """
+    Yield the G-code for ``write_gcode(..., chunks=True)``, the header and
+    footer as lists of lines and every layer as one ``GCodeBlock``.
+    """
+    formatter = GCodeFormatter(commands={1: 'G1', RESET: 'G92'}, modal=False)
+    yield header
+    bounds = np.flatnonzero(np.r_[True, moves.layers[1:] !=
+                                  moves.layers[:-1], True])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        pts = moves.points[lo:hi]
+        data = formatter.format_bytes(moves.commands[lo:hi], X=pts[:, 0],
+                                      Y=pts[:, 1], Z=pts[:, 2],
+                                      E=moves.e[lo:hi], F=moves.f[lo:hi])
+        comment = "; ///// LAYER {0} /////\n".format(moves.layers[lo] + 1)
+        yield GCodeBlock(comment.encode('ascii') + data, hi - lo + 1)
+    yield GCODE_FOOTER
+
+
+# MODELS -----------------------------------------------------------------------
+
+def slice_model(path, settings, output):
+    """
+    Slice one mesh file, write its G-code into the ``output`` folder and
+    estimate its print time.
+
+    Returns:
+        dict: A row of the summary CSV
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    row = dict((field, '') for field in SUMMARY_FIELDS)
+    row['model'] = os.path.basename(path)
+    t0 = time.perf_counter()
+    try:
+        vertices, faces = read_mesh(path)
+        if not len(faces):
+            raise ValueError('Mesh has no faces!')
+        heights = layer_heights(vertices, settings['LayerHeight'])
+        result = slice_mesh(vertices, faces, heights)
+        if not len(result):
+            raise ValueError('Slicing produced no contours!')
+        paths, layers, spiralized = model_paths(result, settings)
+
+        # center the paths on the XY origin like GenerateGCODE
+        points = result.points
+        center = 0.5 * (points[:, :2].min(axis=0) + points[:, :2].max(axis=0))
+        moves = build_moves(
+            paths, layers, settings['ExtrusionRate'],
+            init_extrusion=settings['InitExtrusionConstant'],
+            retraction=settings['RetractionConstant'],
+            print_speed=settings['PrintSpeed'],
+            travel_speed=settings['TravelSpeed'],
+            retraction_speed=settings['RetractionSpeed'],
+            z_hop=settings['ZHopDistance'], offset=-center)
+        first = paths[0][0] - (center[0], center[1], 0.0)
+        gcode = os.path.join(output, name + '.gcode')
+        stats = write_gcode(gcode, iter_gcode(moves, gcode_header(
+            settings, name, first)), chunks=True)
+
+        # estimate the print time from the approach point on
+        valid = moves.commands != RESET
+        start = first + (0.0, 0.0, Z_SAFETY)
+        est = estimate_print(
+            np.vstack([start, moves.points[valid]]),
+            np.r_[0.0, moves.f[valid]],
+            extruding=np.r_[False, moves.extruding[valid]],
+            layers=np.r_[-1, moves.layers[valid]],
+            acceleration=settings['Acceleration'] or None,
+            line_width=settings['LineWidth'],
+            layer_height=settings['LayerHeight'])
+        hours, minutes, seconds = est.hours_minutes_seconds()
+        row.update({
+            'status': 'ok',
+            'triangles': len(faces),
+            'layers': len(np.unique(result.planes)),
+            'paths': len(paths),
+            'spiralized': int(spiralized),
+            'lines': stats.lines,
+            'hours': hours,
+            'minutes': minutes,
+            'seconds': seconds,
+            'print_time_s': round(est.total_time, 1),
+            'clay_l': round(est.volume / 1e6, 3),
+            'gcode': gcode,
+        })
+    except (IOError, OSError, ValueError, IndexError) as e:
+        row['status'] = 'error'
+        row['error'] = str(e) or e.__class__.__name__
+    row['slice_s'] = round(time.perf_counter() - t0, 3)
+    return row
+
+
+def _slice_task(args):
+    return slice_model(*args)
+
+
+def slice_folder(folder, settings, output, processes=None, progress=None):
+    """
+    Slice all models of a folder on a process pool.
+
+    Args:
+        folder: Folder containing the mesh files
+        settings: Settings dict (see ``load_settings``)
+        output: Folder for the G-code files
+        processes: Number of worker processes (defaults to the CPU count),
+                   1 slices in the current process
+        progress: Optional callable, called as ``progress(row)`` after every
+                  model
+
+    Returns:
+        list: Summary rows of all models, ordered by model name
+    """
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    tasks = [(path, settings, output) for path in find_models(folder)]
+    processes = processes or os.cpu_count() or 1
+    rows = []
+    if processes == 1 or len(tasks) < 2:
+        results = map(_slice_task, tasks)
+        pool = None
+    else:
+        pool = Pool(min(processes, len(tasks)))
+        # one model per task, results arrive as soon as they are done
+        results = pool.imap_unordered(_slice_task, tasks, chunksize=1)
+    try:
+        for row in results:
+            rows.append(row)
+            if progress is not None:
+                progress(row)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return sorted(rows, key=lambda r: r['model'])
+
+
+def write_summary(rows, path):
+    """Write the summary rows to a CSV file."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ddu_clayslicer.batch',
+        description='Slice all meshes (OBJ, STL, PLY) of a folder into '
+                    'G-code files.')
+    parser.add_argument('models', help='folder containing the mesh files')
+    parser.add_argument('settings', nargs='?', default=None,
+                        help='JSON settings file (default: built-in '
+                             'defaults)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='output folder (default: MODELS/gcode)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: CPU '
+                             'count)')
+    parser.add_argument('--summary', default=None,
+                        help='summary CSV path (default: '
+                             'OUTPUT/summary.csv)')
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.models):
+        parser.error('"{0}" is not a folder'.format(args.models))
+    try:
+        settings = load_settings(args.settings)
+    except (IOError, OSError, ValueError) as e:
+        parser.error(str(e))
+    output = args.output or os.path.join(args.models, 'gcode')
+    summary = args.summary or os.path.join(output, 'summary.csv')
+
+    def report(row):
+        print('{0}: {1} ({2} s){3}'.format(
+            row['model'], row['status'], row['slice_s'],
+            ' ' + row['error'] if row['error'] else ''))
+
+    t0 = time.perf_counter()
+    rows = slice_folder(args.models, settings, output, args.processes,
+                        progress=report)
+    write_summary(rows, summary)
+    failed = sum(1 for r in rows if r['status'] != 'ok')
+    print('{0} models sliced in {1:.1f} s, {2} failed, summary: {3}'.format(
+        len(rows) - failed, time.perf_counter() - t0, failed, summary))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,829 @@
+"""
+Headless benchmarks for the ddu_clayslicer library.
+
+Usage:
+    python -m ddu_clayslicer.bench                       (list benchmarks)
+    python -m ddu_clayslicer.bench gcode_formats --size 5000000
+    python -m ddu_clayslicer.bench trim_domains --check   (property checks)
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import time
+
+# registry of all benchmarks, filled by the ``benchmark`` decorator
+BENCHMARKS = {}
+
+
+def benchmark(default_size, check=None):
+    """
+    Register a benchmark function under its name (without the ``bench_``
+    prefix). Benchmark functions take a ``size`` argument and return a list
+    of result rows (dicts). An optional ``check`` function takes a number of
+    random seeds and returns a list of property violations (run with
+    ``--check``).
+    """
+    def decorator(func):
+        name = func.__name__
+        if name.startswith('bench_'):
+            name = name[len('bench_'):]
+        func.default_size = default_size
+        func.check = check
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class Timer(object):
+    """Minimal wall clock timer context manager."""
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        self.seconds = 0.0
+        return self
+
+    def __exit__(self, *args):
+        self.seconds = time.perf_counter() - self.t0
+
+
+# SYNTHETIC DATA ---------------------------------------------------------------
+
+def synthetic_gcode_lines(count, points_per_layer=400, radius=100.0,
+                          layer_height=2.0):
+    """
+    Yield ``count`` lines of G-code resembling a spiralized vase print as it
+    is produced by the GenerateGCODE component.
+    """
+    e = 0.0
+    step = 2.0 * math.pi / points_per_layer
+    seg = 2.0 * radius * math.sin(step * 0.5)
+    i = 0
+    layer = 0
+    while i < count:
+        if i % (points_per_layer + 1) == 0:
+            layer += 1
+            yield '; ///// LAYER {0} /////'.format(layer)
+            i += 1
+            continue
+        a = i * step
+        z = layer * layer_height + (i % points_per_layer) * (
+            layer_height / points_per_layer)
+        e += seg * 0.05
+        yield 'G1 X{0:.3f} Y{1:.3f} Z{2:.3f} E{3:.3f} F{4}'.format(
+            radius * math.cos(a), radius * math.sin(a), z, e, 1500)
+        i += 1
+
+
+def synthetic_tube(faces, height=200.0, radius=50.0):
+    """
+    Return the vertices and faces of a closed (wrapping around, open at top
+    and bottom) wavy tube mesh with about ``faces`` triangles, resembling a
+    vase to be sliced.
+    """
+    import numpy as np
+
+    nu = max(int(math.sqrt(faces / 2.0)), 3)
+    nv = max(int(faces / (2.0 * nu)), 1) + 1
+    u = np.linspace(0.0, 2.0 * math.pi, nu, endpoint=False)
+    v = np.linspace(0.0, height, nv)
+    uu, vv = np.meshgrid(u, v)
+    r = radius + 0.1 * radius * np.sin(vv / 7.0) + 0.06 * radius * np.sin(
+        5.0 * uu)
+    vertices = np.stack([r * np.cos(uu), r * np.sin(uu), vv],
+                        axis=-1).reshape(-1, 3)
+    row = np.arange(nv - 1)[:, None] * nu
+    col = np.arange(nu)[None, :]
+    a = (row + col).ravel()
+    b = (row + (col + 1) % nu).ravel()
+    quads = np.stack([a, b, b + nu, a + nu], axis=1)
+    return vertices, np.concatenate([quads[:, [0, 1, 2]],
+                                     quads[:, [0, 2, 3]]])
+
+
+class SyntheticType(object):
+    """Stand-in for a .NET type, ``str()`` returns the full type name."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class SyntheticComponent(object):
+    """Duck-typed record of a Grasshopper (script) component."""
+
+    def __init__(self, objtype, name, nickname, iguid, category='',
+                 source=None):
+        self._type = objtype
+        self.Name = name
+        self.NickName = nickname
+        self.InstanceGuid = iguid
+        self.Category = category
+        self.source = source
+
+    def GetType(self):
+        return self._type
+
+    def TryGetSource(self):
+        return self.source is not None, self.source
+
+
+class SyntheticCluster(SyntheticComponent):
+    """Duck-typed record of a Grasshopper cluster."""
+
+    def __init__(self, objtype, iguid, document):
+        super(SyntheticCluster, self).__init__(objtype, 'Cluster', 'Cluster',
+                                               iguid)
+        self._document = document
+
+    def Document(self, name):
+        return self._document
+
+
+class SyntheticDocument(object):
+    """Duck-typed record of a Grasshopper document."""
+
+    def __init__(self, doc_id, objects=None):
+        self.DocumentID = doc_id
+        self.Objects = objects or []
+
+
+SCRIPT_TYPE = SyntheticType('RhinoCodePluginGH.Components.Python3Component')
+PARAM_TYPE = SyntheticType('Grasshopper.Kernel.Parameters.Param_Number')
+CLUSTER_TYPE = SyntheticType('Grasshopper.Kernel.Special.GH_Cluster')
+
+
+def synthetic_document(count, script_ratio=0.3, cluster_size=50,
+                       cluster_depth=3, unique_scripts=40):
+    """
+    Create a synthetic document with ``count`` components, of which
+    ``script_ratio`` are script components (instances of
+    ``unique_scripts`` different scripts). Every ``cluster_size``
+    components a cluster with nested sub-clusters is added, every second
+    cluster is shared with the previous one.
+    """
+    header = '"""\nAuthor: DDU\nLicense: MIT License\nVersion: {0}\n"""\n'
+    body = 'import Rhino\n' + 'x = 1\n' * 200
+    sources = [header.format(250000 + i) + body for i in range(unique_scripts)]
+    counter = [0]
+
+    def make_objects(n):
+        objects = []
+        for _ in range(n):
+            i = counter[0]
+            counter[0] += 1
+            if (i * 7919) % 100 < script_ratio * 100:
+                k = i % unique_scripts
+                objects.append(SyntheticComponent(
+                    SCRIPT_TYPE, 'Script{0}'.format(k), 'S{0}'.format(k),
+                    'guid-{0}'.format(i), 'DDUClayPrintingSlicer',
+                    sources[k]))
+            else:
+                objects.append(SyntheticComponent(
+                    PARAM_TYPE, 'Number', 'Num', 'guid-{0}'.format(i)))
+        return objects
+
+    def make_cluster(depth):
+        doc = SyntheticDocument('doc-{0}'.format(counter[0]),
+                                make_objects(cluster_size // 2))
+        if depth > 1:
+            doc.Objects.append(SyntheticCluster(
+                CLUSTER_TYPE, 'cluster-{0}'.format(counter[0]),
+                make_cluster(depth - 1)))
+        return doc
+
+    root = SyntheticDocument('root')
+    clusters = 0
+    while counter[0] < count:
+        root.Objects.extend(make_objects(cluster_size))
+        if clusters % 2 == 0:
+            cluster_doc = make_cluster(cluster_depth)
+        root.Objects.append(SyntheticCluster(
+            CLUSTER_TYPE, 'cluster-{0}'.format(counter[0]), cluster_doc))
+        clusters += 1
+    return root
+
+
+# BENCHMARKS -------------------------------------------------------------------
+
+@benchmark(default_size=5000000)
+def bench_gcode_formats(size):
+    """
+    Compare file size, write time and read time of all G-code output
+    formats.
+    """
+    from .gcode_codecs import (BINARY, EXTENSIONS, GZIP, TEXT, ZSTD,
+                               read_gcode, zstandard)
+    from .gcode_writer import write_gcode
+
+    lines = list(synthetic_gcode_lines(size))
+    formats = [TEXT, GZIP, BINARY]
+    if zstandard is not None:
+        formats.insert(2, ZSTD)
+    rows = []
+    tmpdir = tempfile.mkdtemp(prefix='ddu_bench_')
+    try:
+        for fmt in formats:
+            path = os.path.join(tmpdir, 'bench' + EXTENSIONS[fmt])
+            stats = write_gcode(path, lines, fmt=fmt)
+            with Timer() as t_read:
+                count = 0
+                for ln in read_gcode(path, fmt):
+                    count += 1
+            if count != len(lines):
+                raise RuntimeError('Round-trip of {0} failed!'.format(fmt))
+            rows.append({
+                'format': fmt,
+                'lines': stats.lines,
+                'size_mb': round(stats.megabytes, 2),
+                'write_s': round(stats.seconds, 3),
+                'read_s': round(t_read.seconds, 3),
+            })
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return rows
+
+
+@benchmark(default_size=5000000)
+def bench_gcode_format(size):
+    """
+    Format ``size`` synthetic move lines using the fixed-point bulk G-code
+    formatter and check a sample against the printf reference.
+    """
+    import numpy as np
+    from .gcode_format import GCodeFormatter, reference_format
+
+    rng = np.random.default_rng(0)
+    per_layer = 400
+    layer = np.arange(size) // per_layer
+    angle = np.arange(size) % per_layer * (2.0 * math.pi / per_layer)
+    radius = 100.0 + rng.random(size)
+    x = np.cos(angle) * radius
+    y = np.sin(angle) * radius
+    z = (layer + 1) * 0.4
+    e = np.cumsum(rng.random(size) * 0.05)
+    travel = angle == 0.0
+    e[travel] = np.nan
+    f = np.where(travel, 3000.0, 1500.0)
+    commands = np.where(travel, 0, 1)
+    axes = {'X': x, 'Y': y, 'Z': z, 'E': e, 'F': f}
+
+    rows = []
+    for chunk_rows in (16384, 65536):
+        formatter = GCodeFormatter()
+        count = 0
+        with Timer() as t:
+            for block in formatter.iter_chunks(commands, chunk_rows, **axes):
+                count += block.lines
+        rows.append({
+            'lines': count,
+            'chunk_rows': chunk_rows,
+            'seconds': round(t.seconds, 3),
+            'mlines_per_s': round(count / max(t.seconds, 1e-9) / 1e6, 2),
+        })
+    # correctness on a sample
+    sample = min(size, 100000)
+    lines = GCodeFormatter().format_lines(
+        commands[:sample], **dict((k, v[:sample]) for k, v in axes.items()))
+    with Timer() as t_ref:
+        ref = reference_format(
+            commands[:sample], **dict((k, v[:sample]) for k, v in axes.items()))
+    if lines != ref:
+        raise RuntimeError('Formatted lines differ from the reference!')
+    # decimal ties, whose scaled binary values are often exactly a half
+    ties = np.round(rng.uniform(-1000.0, 1000.0, sample), 4)
+    ties[:6] = [1.0005, -1.0005, 103.0915, -103.0915, 0.0005, -0.0005]
+    tie_axes = {'X': ties, 'Y': ties[::-1].copy(),
+                'F': np.round(ties * 2.0) / 2.0}
+    lines = GCodeFormatter(modal=False).format_lines(None, **tie_axes)
+    ref = reference_format(np.ones(sample, dtype=np.int64), modal=False,
+                           **tie_axes)
+    if lines != ref:
+        raise RuntimeError('Formatted ties differ from the reference!')
+    for row in rows:
+        row['reference_mlines_per_s'] = round(
+            sample / max(t_ref.seconds, 1e-9) / 1e6, 2)
+    return rows
+
+
+@benchmark(default_size=10000000)
+def bench_gcode_parse(size):
+    """
+    Write a synthetic G-code file of ``size`` lines with layer comments,
+    parse and index it, load a range of layers using the index and compare
+    the rows of a sample to the pure Python reference parser.
+    """
+    import numpy as np
+    from .gcode_format import GCodeFormatter
+    from .gcode_parser import (GCodeIndex, parse_gcode, read_layers,
+                               reference_parse)
+
+    per_layer = 400
+    layers = max(1, size // (per_layer + 1))
+    tmpdir = tempfile.mkdtemp(prefix='ddu_bench_')
+    path = os.path.join(tmpdir, 'bench.gcode')
+    try:
+        # spiralized vase with cumulative extrusion, one layer comment per
+        # layer
+        formatter = GCodeFormatter()
+        with Timer() as t_write:
+            with open(path, 'w') as f:
+                for lo in range(0, layers, 100):
+                    hi = min(lo + 100, layers)
+                    i = np.arange(lo * per_layer, hi * per_layer)
+                    angle = i % per_layer * (2.0 * math.pi / per_layer)
+                    lines = formatter.format_lines(
+                        np.ones(len(i), dtype=np.int64),
+                        X=np.cos(angle) * 100.0,
+                        Y=np.sin(angle) * 100.0,
+                        Z=(i + per_layer) * (0.4 / per_layer),
+                        E=(i + 1) * 0.05,
+                        F=np.full(len(i), 1500.0))
+                    for k in range(hi - lo):
+                        f.write('; ///// LAYER {0} /////\n'.format(lo + k + 1))
+                        f.write('\n'.join(
+                            lines[k * per_layer:(k + 1) * per_layer]))
+                        f.write('\n')
+        megabytes = os.path.getsize(path) / (1024.0 * 1024.0)
+        lines_total = layers * (per_layer + 1)
+        with Timer() as t_parse:
+            columns, index = parse_gcode(path)
+        if index.layer_count != layers or len(columns) != layers * per_layer:
+            raise RuntimeError('Unexpected layer or row count!')
+        # load a range of layers from the middle of the file
+        mid = layers // 2
+        with Timer() as t_range:
+            part = read_layers(index, mid, min(mid + 10, layers))
+        lo, hi = index.layer_rows(mid)
+        if not np.array_equal(part.values[:, :hi - lo],
+                              columns.values[:, lo:hi], equal_nan=True):
+            raise RuntimeError('Loaded layers differ from the full parse!')
+        index_path = path + '.npz'
+        index.save(index_path)
+        if GCodeIndex.load(index_path).layer_count != layers:
+            raise RuntimeError('Saved index differs!')
+        # reference on a sample of the lines
+        sample = min(lines_total, 1000000)
+        with open(path) as f:
+            head = [next(f) for _ in range(sample)]
+        with Timer() as t_ref:
+            command, values = reference_parse(head)
+        rows = len(command)
+        if not (np.array_equal(command, columns.command[:rows]) and
+                np.array_equal(values, columns.values[:, :rows],
+                               equal_nan=True)):
+            raise RuntimeError('Parsed rows differ from the reference!')
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return [{
+        'lines': lines_total,
+        'megabytes': round(megabytes, 1),
+        'layers': index.layer_count,
+        'write_s': round(t_write.seconds, 3),
+        'parse_s': round(t_parse.seconds, 3),
+        'mlines_per_s': round(lines_total / max(t_parse.seconds, 1e-9) / 1e6,
+                              2),
+        'range_10_layers_s': round(t_range.seconds, 4),
+        'reference_mlines_per_s': round(
+            sample / max(t_ref.seconds, 1e-9) / 1e6, 2),
+    }]
+
+
+@benchmark(default_size=5000000)
+def bench_print_time(size):
+    """
+    Estimate the print time and clay volume of a synthetic toolpath with
+    ``size`` moves (with and without acceleration) and compare a smaller
+    toolpath to the pure Python reference.
+    """
+    import numpy as np
+    from .print_time import estimate_print, reference_times
+
+    def toolpath(count, seed=0):
+        rng = np.random.default_rng(seed)
+        per_layer = 400
+        i = np.arange(count + 1)
+        angle = i % per_layer * (2.0 * math.pi / per_layer)
+        radius = 100.0 + 5.0 * np.sin(angle * 7.0)
+        points = np.stack([np.cos(angle) * radius,
+                           np.sin(angle) * radius,
+                           (i // per_layer) * 2.0], axis=1)
+        feedrates = np.where(rng.random(count + 1) < 0.02, 6000.0, 1500.0)
+        return points, feedrates, i // per_layer
+
+    points, feedrates, layers = toolpath(size)
+    rows = []
+    for acceleration in (500.0, None):
+        with Timer() as t:
+            est = estimate_print(points, feedrates, layers=layers,
+                                 acceleration=acceleration,
+                                 line_width=4.0, layer_height=2.0)
+            ids, layer_times = est.layer_times()
+        rows.append({
+            'moves': size,
+            'acceleration': acceleration or 0,
+            'seconds': round(t.seconds, 3),
+            'msegments_per_s': round(size / max(t.seconds, 1e-9) / 1e6, 2),
+            'print_h': round(est.total_time / 3600.0, 2),
+            'layers': len(ids),
+            'clay_l': round(est.volume / 1e6, 1),
+        })
+    # reference on a smaller toolpath and on a random walk with sharp
+    # junctions and long straight runs
+    sample = min(size, 100000)
+    points, feedrates, _ = toolpath(sample, seed=1)
+    est = estimate_print(points, feedrates)
+    with Timer() as t_ref:
+        ref = reference_times(points.tolist(), feedrates.tolist())
+    if not np.allclose(est.move_times, ref, rtol=0.0, atol=1e-10):
+        raise RuntimeError('Move times differ from the reference!')
+    rng = np.random.default_rng(2)
+    points = np.cumsum(rng.normal(0.0, 50.0, (sample + 1, 3)), axis=0)
+    feedrates = rng.choice([600.0, 1500.0, 3000.0, 6000.0], sample + 1)
+    est = estimate_print(points, feedrates)
+    ref = reference_times(points.tolist(), feedrates.tolist())
+    if not np.allclose(est.move_times, ref, rtol=0.0, atol=1e-10):
+        raise RuntimeError('Random walk move times differ from the '
+                           'reference!')
+    for row in rows:
+        row['reference_msegments_per_s'] = round(
+            sample / max(t_ref.seconds, 1e-9) / 1e6, 3)
+    return rows
+
+
+@benchmark(default_size=2000000)
+def bench_planar_slicer(size):
+    """
+    Slice a synthetic tube mesh with ``size`` triangles into 1000 layers and
+    compare a smaller mesh to the pure Python reference.
+    """
+    import numpy as np
+    from .planar_slicer import layer_heights, reference_slice, slice_mesh
+
+    layers = 1000
+    vertices, faces = synthetic_tube(size)
+    triangles = len(faces)
+    heights = layer_heights(vertices, 200.0 / layers)
+    with Timer() as t:
+        result = slice_mesh(vertices, faces, heights)
+    if not result.closed.all() or not (result.signed_areas() > 0).all():
+        raise RuntimeError('Expected closed counter-clockwise contours!')
+    # reference on a smaller mesh
+    vertices, faces = synthetic_tube(min(size, 20000))
+    small = layer_heights(vertices, 200.0 / min(layers, 100))
+    fast = slice_mesh(vertices, faces, small)
+    with Timer() as t_ref:
+        ref = reference_slice(vertices, faces, small)
+    if len(ref) != len(fast) or not all(
+            np.array_equal(fast.polyline(i), np.array(pts))
+            for i, (plane, pts, closed) in enumerate(ref)):
+        raise RuntimeError('Polylines differ from the reference!')
+    return [{
+        'triangles': triangles,
+        'layers': len(heights),
+        'seconds': round(t.seconds, 3),
+        'polylines': len(result),
+        'points': len(result.points),
+        'reference_s': round(t_ref.seconds, 3),
+        'reference_triangles': len(faces),
+        'reference_layers': len(small),
+    }]
+
+
+@benchmark(default_size=8)
+def bench_batch_slice(size):
+    """
+    Batch slice ``size`` synthetic vase models (binary STL, 200k triangles)
+    with one worker process and with one per CPU core.
+    """
+    import numpy as np
+    from .batch import load_settings, slice_folder
+
+    tmp = tempfile.mkdtemp(prefix='ddu_batch_')
+    try:
+        models = os.path.join(tmp, 'models')
+        os.makedirs(models)
+        dtype = np.dtype([('normal', '<f4', 3), ('corners', '<f4', (3, 3)),
+                          ('attributes', '<u2')])
+        for i in range(size):
+            vertices, faces = synthetic_tube(200000, radius=40.0 + i)
+            data = np.zeros(len(faces), dtype=dtype)
+            data['corners'] = vertices[faces]
+            with open(os.path.join(models, 'vase_{0:03d}.stl'.format(i)),
+                      'wb') as f:
+                f.write(b'\0' * 80)
+                f.write(np.array([len(faces)], dtype='<u4').tobytes())
+                f.write(data.tobytes())
+        settings = load_settings(SpiralizeContours=True, FloorLayerCount=3)
+        rows = []
+        cores = os.cpu_count() or 1
+        for processes in sorted(set([1, cores])):
+            with Timer() as t:
+                result = slice_folder(models, settings,
+                                      os.path.join(tmp, 'gcode'), processes)
+            failed = [r['error'] for r in result if r['status'] != 'ok']
+            if failed:
+                raise RuntimeError('Slicing failed: {0}'.format(failed[0]))
+            rows.append({
+                'models': size,
+                'processes': processes,
+                'seconds': round(t.seconds, 2),
+                'models_per_s': round(size / max(t.seconds, 1e-9), 2),
+                'speedup': round(rows[0]['seconds'] / max(t.seconds, 1e-9),
+                                 2) if rows else 1.0,
+                'lines': sum(r['lines'] for r in result),
+            })
+        return rows
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@benchmark(default_size=200000)
+def bench_heat_method(size):
+    """
+    Compute hot/cold scalar fields on a synthetic tube mesh with ``size``
+    triangles, factorizing on the first call and using the cached solver
+    for changed sources.
+    """
+    import numpy as np
+    from .heat_method import SolverCache
+
+    vertices, faces = synthetic_tube(size)
+    z = vertices[:, 2]
+    bottom = np.flatnonzero(z == z.min())
+    top = np.flatnonzero(z == z.max())
+    cache = SolverCache()
+    rows = []
+    for run, (hot, cold) in enumerate([(bottom, top), (bottom[::2], top),
+                                       (bottom, top[::3])]):
+        with Timer() as t:
+            solver = cache.get(vertices, faces)
+            solver.scalar_field(hot, cold)
+        rows.append({
+            'triangles': len(faces),
+            'vertices': len(vertices),
+            'run': 'cold' if run == 0 else 'cached',
+            'seconds': round(t.seconds, 3),
+            'cache_mb': cache.stats['megabytes'],
+            'hits': cache.hits,
+            'misses': cache.misses,
+        })
+    return rows
+
+
+@benchmark(default_size=1000000)
+def bench_iso_contours(size):
+    """
+    Extract 500 iso-contours of a wavy scalar field on a synthetic tube mesh
+    with ``size`` triangles and check them against the planar slicer on the
+    height field.
+    """
+    import numpy as np
+    from .iso_contours import iso_contours, iso_levels
+    from .planar_slicer import slice_mesh
+
+    count = 500
+    vertices, faces = synthetic_tube(size)
+    angle = np.arctan2(vertices[:, 1], vertices[:, 0])
+    values = vertices[:, 2] + 15.0 * np.sin(3.0 * angle)
+    levels = iso_levels(values, count + 2)
+    with Timer() as t:
+        result = iso_contours(vertices, faces, values, levels)
+    with Timer() as t_ccw:
+        oriented = iso_contours(vertices, faces, values, levels,
+                                normal=(0.0, 0.0, 1.0))
+    # contours near the open ends of the tube leave the mesh and stay open
+    if not np.array_equal(oriented.points, result.points):
+        raise RuntimeError('Expected consistently oriented contours!')
+    # the contours of the height field are the planar slices
+    heights = iso_levels(vertices[:, 2], count + 2)
+    planar = slice_mesh(vertices, faces, heights)
+    field = iso_contours(vertices, faces, vertices[:, 2], heights)
+    if not (np.array_equal(planar.offsets, field.offsets) and
+            np.array_equal(planar.points[:, :2], field.points[:, :2])):
+        raise RuntimeError('Height field contours differ from the slices!')
+    return [{
+        'triangles': len(faces),
+        'levels': len(levels),
+        'seconds': round(t.seconds, 3),
+        'oriented_s': round(t_ccw.seconds, 3),
+        'polylines': len(result),
+        'open': int((~result.closed).sum()),
+        'points': len(result.points),
+    }]
+
+
+@benchmark(default_size=2000000)
+def bench_seams(size):
+    """
+    Place the seams of 500 layers of 16 synthetic tubes with ``size``
+    triangles in total using every seam strategy and compare a smaller set
+    of layers to the pure Python reference.
+    """
+    import numpy as np
+    from .planar_slicer import SliceResult, layer_heights, slice_mesh
+    from .seams import (SEAM_STRATEGIES, place_seams, reference_seam_starts,
+                        seam_starts)
+
+    def tubes(faces, layers, grid=4):
+        # a grid of tubes gives every layer one polyline per tube
+        vertices, tris = synthetic_tube(faces // grid ** 2)
+        shifts = 150.0 * np.array([(i % grid, i // grid, 0)
+                                   for i in range(grid ** 2)])
+        all_vertices = (vertices[None, :, :] + shifts[:, None, :]).reshape(
+            -1, 3)
+        all_faces = (tris[None, :, :] + len(vertices) * np.arange(
+            grid ** 2)[:, None, None]).reshape(-1, 3)
+        return slice_mesh(all_vertices, all_faces,
+                          layer_heights(all_vertices, 200.0 / layers))
+
+    result = tubes(size, 500)
+    small = tubes(min(size, 40000), 50)
+    # the same layers with some open polylines, starting with an open one
+    closed = small.closed.copy()
+    closed[::7] = False
+    partly_open = SliceResult(small.points, small.offsets, small.planes,
+                              closed, small.heights)
+    # mixes corner and aligned seams on the coarse reference tubes
+    angle = 23.5
+    rows = []
+    for strategy in SEAM_STRATEGIES:
+        with Timer() as t:
+            place_seams(result, strategy, seed=1, min_angle=angle)
+        with Timer() as t_ref:
+            ref = reference_seam_starts(small, strategy, seed=1,
+                                        min_angle=angle)
+        if not np.array_equal(seam_starts(small, strategy, seed=1,
+                                          min_angle=angle), ref):
+            raise RuntimeError('Seams differ from the reference!')
+        ref = reference_seam_starts(partly_open, strategy, seam=0.3,
+                                    seed=1, min_angle=angle)
+        if not np.array_equal(seam_starts(partly_open, strategy, seam=0.3,
+                                          seed=1, min_angle=angle), ref):
+            raise RuntimeError('Seams of open polylines differ from the '
+                               'reference!')
+        rows.append({
+            'strategy': strategy,
+            'polylines': len(result),
+            'points': len(result.points),
+            'layers': len(result.heights),
+            'seconds': round(t.seconds, 3),
+            'reference_s': round(t_ref.seconds, 3),
+            'reference_polylines': len(small),
+        })
+    return rows
+
+
+@benchmark(default_size=10000)
+def bench_document_scan(size):
+    """
+    Scan, dedupe and version-resolve a synthetic document with nested
+    clusters.
+    """
+    from . import document_scan
+
+    dispatch = {
+        str(SCRIPT_TYPE): ('PY3', lambda obj: obj.TryGetSource()),
+        str(CLUSTER_TYPE): ('CLUSTER', None),
+    }
+    doc = synthetic_document(size)
+    with Timer() as t_scan:
+        script_components = document_scan.scan_document(doc, dispatch)
+    # clear the version memo to time a cold run first
+    document_scan._VERSION_CACHE.clear()
+    with Timer() as t_cold:
+        unique = document_scan.process_script_components(
+            script_components, 'DDUClayPrintingSlicer')[0]
+    with Timer() as t_warm:
+        document_scan.process_script_components(
+            script_components, 'DDUClayPrintingSlicer')
+    return [{
+        'components': size,
+        'scripts': len(script_components),
+        'unique': len(unique),
+        'scan_s': round(t_scan.seconds, 4),
+        'process_cold_s': round(t_cold.seconds, 4),
+        'process_warm_s': round(t_warm.seconds, 4),
+    }]
+
+
+def check_trim_domains(seeds):
+    """
+    Check the trim domain invariants and the reference on ``seeds`` random
+    sets of curves.
+    """
+    from .trim_domains import check_properties
+
+    return check_properties(range(seeds))
+
+
+@benchmark(default_size=10000000, check=check_trim_domains)
+def bench_trim_domains(size):
+    """
+    Compute the trim domains of ``size`` analysis parameters of random
+    closed curves, vectorized and using the pure Python reference (on at
+    most 1M parameters), and check the domain invariants.
+    """
+    import numpy as np
+    from .trim_domains import (batch_domains, random_parameters,
+                               reference_domains, validate_domains)
+
+    a, b, offsets = random_parameters(max(1, size // 33))
+    with Timer() as t_vec:
+        starts, ends = batch_domains(a, b, offsets)
+    with Timer() as t_check:
+        bad = validate_domains(starts, ends, offsets)
+    if bad:
+        raise RuntimeError('Invalid domains on {0} curves!'.format(len(bad)))
+    # reference on a prefix of the curves
+    ref_curves = int(np.searchsorted(offsets, min(len(a), 1000000),
+                                     side='right')) - 1
+    with Timer() as t_ref:
+        for k in range(ref_curves):
+            lo, hi = offsets[k], offsets[k + 1]
+            ref = reference_domains(a[lo:hi].tolist(), b[lo:hi].tolist())
+            if ref != list(zip(starts[lo:hi].tolist(), ends[lo:hi].tolist())):
+                raise RuntimeError('Domains of curve {0} differ from the '
+                                   'reference!'.format(k))
+    ref_params = int(offsets[ref_curves])
+    return [{
+        'curves': len(offsets) - 1,
+        'params': len(a),
+        'vectorized_s': round(t_vec.seconds, 3),
+        'mparams_per_s': round(len(a) / max(t_vec.seconds, 1e-9) / 1e6, 1),
+        'validate_s': round(t_check.seconds, 3),
+        'reference_params': ref_params,
+        'reference_s': round(t_ref.seconds, 3),
+    }]
+
+
+# COMMAND LINE -----------------------------------------------------------------
+
+def format_rows(rows):
+    """Format a list of result rows as a plain text table."""
+    if not rows:
+        return ''
+    keys = list(rows[0].keys())
+    widths = [max(len(k), max(len(str(r[k])) for r in rows)) for k in keys]
+    out = ['  '.join(k.ljust(w) for k, w in zip(keys, widths))]
+    for r in rows:
+        out.append('  '.join(str(r[k]).ljust(w) for k, w in zip(keys, widths)))
+    return '\n'.join(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ddu_clayslicer.bench',
+        description='Run headless ddu_clayslicer benchmarks.')
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run (default: list benchmarks)')
+    parser.add_argument('--size', type=int, default=None,
+                        help='problem size (default: benchmark specific)')
+    parser.add_argument('--check', action='store_true',
+                        help='run the property checks of the benchmarks '
+                             'instead, exit with 1 on any violation')
+    parser.add_argument('--seeds', type=int, default=200,
+                        help='number of random seeds of the property checks '
+                             '(default: 200)')
+    args = parser.parse_args(argv)
+    if args.check:
+        names = args.names or sorted(n for n in BENCHMARKS
+                                     if BENCHMARKS[n].check)
+        failed = False
+        for name in names:
+            if name not in BENCHMARKS or not BENCHMARKS[name].check:
+                parser.error('No property checks for "{0}"'.format(name))
+            violations = BENCHMARKS[name].check(args.seeds)
+            print('--- {0}: {1} seeds, {2} violations ---'.format(
+                name, args.seeds, len(violations)))
+            for violation in violations:
+                print(violation)
+            failed = failed or bool(violations)
+        return 1 if failed else 0
+    if not args.names:
+        for name in sorted(BENCHMARKS):
+            func = BENCHMARKS[name]
+            doc = ' '.join((func.__doc__ or '').split())
+            print('{0} (size={1}): {2}'.format(name, func.default_size, doc))
+        return 0
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error('Unknown benchmark "{0}"'.format(name))
+        func = BENCHMARKS[name]
+        size = args.size or func.default_size
+        print('--- {0} (size={1}) ---'.format(name, size))
+        print(format_rows(func(size)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
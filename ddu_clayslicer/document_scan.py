@@ -0,0 +1,193 @@
+"""
+Headless document scan for script components.
+
+Contains the scan, dedupe and version-resolution logic of the
+ExportScriptsAndSource component. It works on duck-typed records that
+expose the same members as the Grasshopper objects used by the component:
+
+    document:  ``Objects`` (iterable of objects), ``DocumentID``
+    object:    ``GetType()``, ``Name``, ``NickName``, ``InstanceGuid``,
+               ``Category``
+    cluster:   ``Document('')`` returning the cluster document
+
+so the live Grasshopper document can be passed in unchanged, while synthetic
+documents can be used for profiling and regression testing.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+from collections import OrderedDict
+import hashlib
+import re
+
+# first line containing the word "version" (case insensitive)
+VERSION_RE = re.compile(r'^.*version.*$', re.IGNORECASE | re.MULTILINE)
+
+# memoized versions, keyed by source hash, least recently used first
+_VERSION_CACHE = OrderedDict()
+# maximum number of memoized versions
+VERSION_CACHE_SIZE = 1024
+
+# script type ids of old (not exported) script components
+OLD_SCRIPT_TYPES = {
+    'GHPY': 'IS AN OLD GHPYTHON SCRIPT!',
+    'CS': 'IS AN OLD C# SCRIPT!',
+}
+
+
+class VersionConflictError(ValueError):
+    """
+    Raised if a script component is found in a newer version than an
+    already found instance of the same script component.
+    """
+    pass
+
+
+def get_source_version(source):
+    """
+    Attempts to get the first instance of the word "version" (or, "Version")
+    in a multi line string. Then attempts to extract an integer from this line
+    where the word "version" exists. So format version YYMMDD in the
+    docstring like so (or any other integer system):
+        Version: 160121
+    The search stops at the first matching line (usually in the docstring
+    header) and results are memoized per source hash (the most recently
+    used ``VERSION_CACHE_SIZE`` sources).
+    """
+    key = hashlib.sha1(source.encode('utf-8')).hexdigest()
+    if key in _VERSION_CACHE:
+        _VERSION_CACHE.move_to_end(key)
+        return _VERSION_CACHE[key]
+    version = None
+    match = VERSION_RE.search(source)
+    if match:
+        # get the first substring integer
+        version_int = [int(s) for s in match.group(0).split() if s.isdigit()]
+        if version_int:
+            version = version_int[0]
+    _VERSION_CACHE[key] = version
+    if len(_VERSION_CACHE) > VERSION_CACHE_SIZE:
+        _VERSION_CACHE.popitem(last=False)
+    return version
+
+
+def scan_document(document, dispatch, verbose=False):
+    """
+    Scan a document for script components.
+
+    Args:
+        document: The (root) document to scan
+        dispatch: Dict mapping ``str(obj.GetType())`` to a tuple
+                  ``(script_type, extractor)``. ``extractor(obj)`` returns
+                  ``(success, source)``; an extractor of None marks cluster
+                  types, which are stepped into
+        verbose: Print every found script and cluster
+
+    Returns:
+        dict: ``{iguid: [script_type, nickname, name, obj, source]}`` in
+              document order
+    """
+    script_components = {}
+    # clusters are walked iteratively using a stack of object iterators,
+    # which keeps the document order of a recursive walk. every cluster
+    # document is only scanned once.
+    visited = set()
+    stack = [iter(document.Objects)]
+    while stack:
+        obj = next(stack[-1], None)
+        if obj is None:
+            stack.pop()
+            continue
+        handler = dispatch.get(str(obj.GetType()))
+        if handler is None:
+            continue
+        script_type, extractor = handler
+        name = obj.Name
+        nickname = obj.NickName
+        iguid = str(obj.InstanceGuid)
+        # cluster component
+        if extractor is None:
+            cluster_doc = obj.Document('')
+            doc_id = str(cluster_doc.DocumentID)
+            if doc_id in visited:
+                continue
+            visited.add(doc_id)
+            if verbose:
+                print(f'Processing CLUSTER "{nickname}" ({name}, {iguid}) ...')
+            stack.append(iter(cluster_doc.Objects))
+            continue
+        # script component
+        bres, source = extractor(obj)
+        if bres:
+            if verbose:
+                print(f'Found Source for {script_type} Component "{nickname}" ({iguid})')
+            script_components[iguid] = [script_type, nickname, name, obj, source]
+    return script_components
+
+
+def process_script_components(script_components, set_category):
+    """
+    Process found script components and get unique components.
+
+    Every script component is identified by ``nickname + ' ' + name``. The
+    first versioned instance of a script is kept, instances with a lower
+    version are reported, instances with a higher version raise a
+    ``VersionConflictError`` as the older instance has to be updated first.
+
+    Returns:
+        tuple: (unique_script_components, OldScriptsDebug, CategoryDebug,
+                VersionDebug, InfoMessages)
+    """
+    unique_script_components = {}
+    # versions of the unique components, avoids re-resolving them
+    unique_versions = {}
+
+    OldScriptsDebug = []
+    CategoryDebug = []
+    VersionDebug = []
+    InfoMessages = []
+
+    for iguid, values in script_components.items():
+        script_type, nickname, name, obj, source = values
+        category = obj.Category
+        version = get_source_version(source)
+        script_id = nickname + ' ' + name
+        label = f'{script_type} - {nickname} ({name})'
+        # not seen yet script components
+        if script_id not in unique_script_components:
+            if script_type in OLD_SCRIPT_TYPES:
+                OldScriptsDebug.append(label)
+                OldScriptsDebug.append('    - ' + OLD_SCRIPT_TYPES[script_type])
+            if category != set_category:
+                CategoryDebug.append(label)
+                if category == 'Maths':
+                    CategoryDebug.append(f'    - HAS NO CATEGORY ({category})!')
+                else:
+                    CategoryDebug.append(f'    - {category} OUT OF SET CATEGORY {set_category}!')
+            if version is None:
+                VersionDebug.append(' '.join([script_type, nickname, name]))
+                VersionDebug.append('    - HAS NO VERSION!')
+            else:
+                InfoMessages.append(label)
+                unique_script_components[script_id] = values
+                unique_versions[script_id] = version
+        # already seen script components
+        else:
+            existing_version = unique_versions[script_id]
+            if version is None:
+                VersionDebug.append(label)
+                VersionDebug.append('    - HAS NO VERSION!')
+            elif version < existing_version:
+                VersionDebug.append(label)
+                VersionDebug.append(f'    - VERSION {version} < {existing_version}! Continuing...')
+            elif version > existing_version:
+                VersionDebug.append(label)
+                VersionDebug.append(f'    - VERSION {version} > ALREADY FOUND VERSION {existing_version}!')
+                raise VersionConflictError(
+                    f'{label} found in version {version} after version '
+                    f'{existing_version}! Update all instances first.')
+    return (unique_script_components, OldScriptsDebug, CategoryDebug,
+            VersionDebug, InfoMessages)
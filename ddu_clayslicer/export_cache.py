@@ -0,0 +1,134 @@
+"""
+Content-hash export cache for the ExportScriptsAndSource component.
+
+Keeps a persistent JSON manifest keyed by script id (``nickname + ' ' +
+name``) which stores the SHA-256 of the normalized source, the version of
+the source and the hash of the icon used for the last export of every
+script component. Components whose entry is unchanged (and whose exported
+files still exist) can be skipped on the next export.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import hashlib
+import json
+import os
+
+# default filename of the manifest, stored next to the source folder
+MANIFEST_NAME = 'export_manifest.json'
+# version of the manifest layout, bump on incompatible changes
+MANIFEST_VERSION = 1
+
+
+def normalize_source(source):
+    """
+    Normalize source code the same way it is written by the export, i.e.
+    strip all carriage returns.
+    """
+    return source.replace('\r', '')
+
+
+def hash_source(source):
+    """Return the SHA-256 hex digest of the normalized source."""
+    return hashlib.sha256(
+        normalize_source(source).encode('utf-8')).hexdigest()
+
+
+def hash_file(path, blocksize=1 << 16):
+    """Return the SHA-256 hex digest of a file, or '' if it does not
+    exist."""
+    if not path or not os.path.isfile(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path(srcpath, filename=MANIFEST_NAME):
+    """Return the path of the manifest next to the source folder
+    ``srcpath``."""
+    srcpath = os.path.normpath(srcpath)
+    return os.path.join(os.path.dirname(srcpath), filename)
+
+
+class ExportManifest(object):
+    """
+    Persistent manifest of exported script components.
+
+    Every entry is a dict with the keys ``source_sha256``, ``version``,
+    ``icon_sha256`` and ``files`` (list of the exported file paths, relative
+    to the manifest).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest from ``path``. Missing or unreadable manifests
+        result in an empty manifest (i.e. a full export)."""
+        manifest = cls(path)
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get('manifest_version') == MANIFEST_VERSION:
+                    manifest.entries = data.get('entries', {})
+            except (ValueError, OSError):
+                manifest.entries = {}
+        return manifest
+
+    def save(self):
+        """Write the manifest to disk if it has been changed."""
+        if not self.dirty:
+            return False
+        data = {
+            'manifest_version': MANIFEST_VERSION,
+            'entries': self.entries,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.dirty = False
+        return True
+
+    def _relpath(self, path):
+        # store file paths relative to the manifest to keep it portable
+        return os.path.relpath(path, os.path.dirname(self.path)).replace(
+            '\\', '/')
+
+    def _abspath(self, relpath):
+        return os.path.normpath(
+            os.path.join(os.path.dirname(self.path), relpath))
+
+    def make_entry(self, source, version, icon_sha256='', files=None):
+        """Create a manifest entry for a script component."""
+        return {
+            'source_sha256': hash_source(source),
+            'version': version,
+            'icon_sha256': icon_sha256,
+            'files': sorted(self._relpath(fp) for fp in files or []),
+        }
+
+    def is_current(self, script_id, entry):
+        """
+        True if ``entry`` equals the stored entry of ``script_id`` and all
+        exported files of the entry still exist.
+        """
+        if self.entries.get(script_id) != entry:
+            return False
+        return all(os.path.isfile(self._abspath(fp)) for fp in entry['files'])
+
+    def update(self, script_id, entry):
+        """Store ``entry`` for ``script_id``."""
+        if self.entries.get(script_id) != entry:
+            self.entries[script_id] = entry
+            self.dirty = True
@@ -0,0 +1,434 @@
+"""
+Output formats for G-code files.
+
+Supported formats:
+    text:   Plain ASCII G-code (``.gcode``)
+    gzip:   Streaming gzip compressed G-code (``.gcode.gz``)
+    zstd:   Streaming zstandard compressed G-code (``.gcode.zst``), requires
+            the optional ``zstandard`` package
+    binary: Compact binary encoding (``.gcodeb``), see ``BinaryEncoder``
+
+All formats round-trip losslessly back to the original text lines using
+``read_gcode``. Encoders take chunks of lines, or ``GCodeBlock`` chunks of
+already formatted text which the text formats write without splitting them
+into lines again.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import gzip
+import io
+import re
+
+# OPTIONAL IMPORTS
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# format identifiers
+TEXT = 'text'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+BINARY = 'binary'
+
+# file extensions of all formats
+EXTENSIONS = {
+    TEXT: '.gcode',
+    GZIP: '.gcode.gz',
+    ZSTD: '.gcode.zst',
+    BINARY: '.gcodeb',
+}
+
+# default compression levels
+DEFAULT_LEVELS = {
+    GZIP: 6,
+    ZSTD: 3,
+}
+
+# magic bytes at the start of every binary G-code file
+BINARY_MAGIC = b'DDUGCB1\n'
+
+# a command word followed by at least one word with a numeric value
+_MOVE_RE = re.compile(r'^([GMT]\d+)((?: [A-Z]-?\d+(?:\.\d+)?)+)(.*)$')
+
+# marks dictionary entries that are move templates instead of raw lines
+_TEMPLATE_MARK = '\x01'
+
+# all ASCII characters, to test encodings for ASCII compatibility
+_ASCII = bytes(range(128))
+
+
+class GCodeBlock(object):
+    """
+    A chunk of already formatted G-code lines.
+
+    Args:
+        data: ASCII bytes of the lines, every line terminated by ``\n``
+        lines: Number of lines in ``data``
+    """
+
+    __slots__ = ('data', 'lines')
+
+    def __init__(self, data, lines):
+        self.data = data
+        self.lines = lines
+
+    def __len__(self):
+        return self.lines
+
+    def __repr__(self):
+        return 'GCodeBlock({0} lines, {1} bytes)'.format(self.lines,
+                                                         len(self.data))
+
+    def split(self):
+        """Return the lines of the block (without newlines)."""
+        return self.data.decode('ascii').split('\n')[:-1]
+
+
+def format_from_path(path):
+    """Guess the output format from a file path, defaults to text."""
+    lpath = path.lower()
+    if lpath.endswith('.gz'):
+        return GZIP
+    elif lpath.endswith('.zst'):
+        return ZSTD
+    elif lpath.endswith(EXTENSIONS[BINARY]):
+        return BINARY
+    return TEXT
+
+
+def ensure_extension(path, fmt):
+    """Append the extension of ``fmt`` to ``path`` if it is missing."""
+    ext = EXTENSIONS[fmt]
+    if not path.lower().endswith(ext):
+        path = path + ext
+    return path
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError('The zstd format requires the "zstandard" package '
+                          '(pip install zstandard)!')
+
+
+def open_output(path, fmt=TEXT, level=None,
+                buffer_size=io.DEFAULT_BUFFER_SIZE):
+    """
+    Open a binary, writable file object for ``fmt``. Compressed formats
+    compress the data while it is being written.
+    """
+    if fmt == GZIP:
+        level = DEFAULT_LEVELS[GZIP] if level is None else level
+        raw = open(path, 'wb', buffering=buffer_size)
+        # mtime=0 keeps the output reproducible
+        return _ClosingWrapper(
+            gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level,
+                          filename='', mtime=0),
+            raw)
+    elif fmt == ZSTD:
+        _require_zstandard()
+        level = DEFAULT_LEVELS[ZSTD] if level is None else level
+        raw = open(path, 'wb', buffering=buffer_size)
+        cctx = zstandard.ZstdCompressor(level=level)
+        return cctx.stream_writer(raw, closefd=True)
+    elif fmt in (TEXT, BINARY):
+        return open(path, 'wb', buffering=buffer_size)
+    raise ValueError('Unknown G-code format "{0}"!'.format(fmt))
+
+
+def open_input(path, fmt=None):
+    """
+    Open a binary, readable file object for a file written in ``fmt``
+    (guessed from the path if not supplied).
+    """
+    fmt = fmt or format_from_path(path)
+    if fmt == GZIP:
+        return gzip.open(path, 'rb')
+    elif fmt == ZSTD:
+        _require_zstandard()
+        dctx = zstandard.ZstdDecompressor()
+        return dctx.stream_reader(open(path, 'rb'), closefd=True)
+    elif fmt in (TEXT, BINARY):
+        return open(path, 'rb')
+    raise ValueError('Unknown G-code format "{0}"!'.format(fmt))
+
+
+class _ClosingWrapper(object):
+    """Closes an underlying raw file after closing the wrapped stream."""
+
+    def __init__(self, stream, raw):
+        self._stream = stream
+        self._raw = raw
+
+    def write(self, data):
+        return self._stream.write(data)
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# VARINT HELPERS ---------------------------------------------------------------
+
+def _write_uvarint(buf, value):
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_uvarint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _unzigzag(value):
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+
+# BINARY CODEC -----------------------------------------------------------------
+
+class _MoveTemplate(object):
+    """
+    Template of a move line, i.e. command, word letters with their decimal
+    places and the trailing suffix (usually a comment).
+    """
+
+    def __init__(self, key):
+        command, letters, suffix = key[1:].split('\x00')
+        self.letters = []
+        self.scales = []
+        parts = [command]
+        for lt in letters.split(' '):
+            decimals = int(lt[1:])
+            self.letters.append(lt[0])
+            if decimals == 0:
+                self.scales.append(None)
+                parts.append(lt[0] + '%d')
+            else:
+                self.scales.append(float(10 ** decimals))
+                parts.append(lt[0] + '%.' + str(decimals) + 'f')
+        # printf-style format string for the whole line
+        self.fmt = ' '.join(parts) + suffix.replace('%', '%%')
+        self.size = len(self.letters)
+
+    def format(self, values):
+        """Format fixed-point integer ``values`` into a line of text."""
+        return self.fmt % tuple([v if sc is None else v / sc
+                                 for v, sc in zip(values, self.scales)])
+
+
+class BinaryEncoder(object):
+    """
+    Stateful encoder for the compact binary G-code format.
+
+    Every line becomes one record. Lines consisting of a command word and
+    numeric words (i.e. ``G1 X1.000 Y2.000 Z0.500 E0.120 F1000``) are stored
+    as a reference to a template in the command dictionary (command, word
+    letters, decimal places and trailing comment) followed by the
+    zigzag/varint encoded delta of every fixed-point value to the last value
+    of the same letter. All other lines are stored verbatim in the
+    dictionary and referenced by index, so repeated lines cost 1-2 bytes.
+    Lines are only templated if the template reproduces them exactly, which
+    keeps the encoding lossless.
+
+    Record layout (all integers are varints):
+        0, length, utf-8 bytes  -> define the next dictionary entry
+        index + 1 [, deltas...] -> emit dictionary entry ``index``
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._templates = {}
+        self._last = {}
+
+    def header(self):
+        return BINARY_MAGIC
+
+    def _entry(self, buf, key):
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self._index)
+            self._index[key] = idx
+            data = key.encode('utf-8')
+            buf.append(0)
+            _write_uvarint(buf, len(data))
+            buf.extend(data)
+        _write_uvarint(buf, idx + 1)
+
+    def _encode_move(self, buf, line):
+        m = _MOVE_RE.match(line)
+        if not m:
+            return False
+        command, words, suffix = m.groups()
+        if '\x00' in suffix:
+            return False
+        letters = []
+        values = []
+        for word in words[1:].split(' '):
+            dot = word.find('.')
+            letters.append(word[0] + ('0' if dot < 0 else
+                                      str(len(word) - dot - 1)))
+            values.append(int(word[1:].replace('.', '')))
+        key = _TEMPLATE_MARK + command + '\x00' + ' '.join(letters) + \
+            '\x00' + suffix
+        tpl = self._templates.get(key)
+        if tpl is None:
+            tpl = _MoveTemplate(key)
+            if len(set(tpl.letters)) != tpl.size:
+                return False
+            self._templates[key] = tpl
+        # i.e. '-0.000' or leading zeros cannot be reproduced exactly
+        if tpl.format(values) != line:
+            return False
+        self._entry(buf, key)
+        last = self._last
+        for letter, value in zip(tpl.letters, values):
+            delta = value - last.get(letter, 0)
+            last[letter] = value
+            # zigzag encoding maps small negative numbers to small numbers
+            delta = (delta << 1) if delta >= 0 else ((-delta << 1) - 1)
+            if delta < 0x80:
+                buf.append(delta)
+            else:
+                _write_uvarint(buf, delta)
+        return True
+
+    def encode(self, lines):
+        """Encode a chunk of lines into bytes."""
+        buf = bytearray()
+        for line in lines:
+            if not isinstance(line, str):
+                line = str(line)
+            if line.startswith(_TEMPLATE_MARK) or '\n' in line:
+                raise ValueError('Line cannot be encoded: {0!r}'.format(line))
+            if not self._encode_move(buf, line):
+                self._entry(buf, line)
+        return bytes(buf)
+
+    def encode_block(self, block):
+        """Encode a ``GCodeBlock`` into bytes."""
+        return self.encode(block.split())
+
+
+class BinaryDecoder(object):
+    """
+    Decoder for the compact binary G-code format, see ``BinaryEncoder``.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._last = {}
+
+    def decode(self, data):
+        """Decode a complete binary G-code byte string into text lines."""
+        if not data.startswith(BINARY_MAGIC):
+            raise ValueError('Data is not binary G-code!')
+        pos = len(BINARY_MAGIC)
+        end = len(data)
+        entries = self._entries
+        last = self._last
+        while pos < end:
+            tag = data[pos]
+            if tag < 0x80:
+                pos += 1
+            else:
+                tag, pos = _read_uvarint(data, pos)
+            if tag == 0:
+                length, pos = _read_uvarint(data, pos)
+                key = data[pos:pos + length].decode('utf-8')
+                pos += length
+                if key.startswith(_TEMPLATE_MARK):
+                    entries.append(_MoveTemplate(key))
+                else:
+                    entries.append(key)
+                continue
+            entry = entries[tag - 1]
+            if isinstance(entry, str):
+                yield entry
+                continue
+            values = []
+            for letter in entry.letters:
+                delta = data[pos]
+                if delta < 0x80:
+                    pos += 1
+                else:
+                    delta, pos = _read_uvarint(data, pos)
+                value = last.get(letter, 0) + _unzigzag(delta)
+                last[letter] = value
+                values.append(value)
+            yield entry.format(values)
+
+
+class TextEncoder(object):
+    """Encoder for plain text G-code, used for the text and compressed
+    formats."""
+
+    def __init__(self, newline='\n', encoding='utf-8'):
+        self.newline = newline
+        self.encoding = encoding
+        # blocks can be written as they are
+        try:
+            self._passthrough = (newline == '\n' and _ASCII.decode(
+                'ascii').encode(encoding) == _ASCII)
+        except UnicodeError:
+            self._passthrough = False
+
+    def header(self):
+        return b''
+
+    def encode(self, lines):
+        """Encode a chunk of lines into bytes."""
+        try:
+            text = self.newline.join(lines)
+        except TypeError:
+            text = self.newline.join([str(ln) for ln in lines])
+        return (text + self.newline).encode(self.encoding)
+
+    def encode_block(self, block):
+        """Encode a ``GCodeBlock`` into bytes."""
+        if self._passthrough:
+            return block.data
+        return block.data.decode('ascii').replace(
+            '\n', self.newline).encode(self.encoding)
+
+
+def get_encoder(fmt=TEXT, newline='\n', encoding='utf-8'):
+    """Return a new chunk encoder for ``fmt``."""
+    if fmt == BINARY:
+        return BinaryEncoder()
+    return TextEncoder(newline, encoding)
+
+
+def read_gcode(path, fmt=None, encoding='utf-8'):
+    """
+    Read a G-code file written in any of the supported formats and yield
+    its lines (without line terminators).
+    """
+    fmt = fmt or format_from_path(path)
+    with open_input(path, fmt) as f:
+        if fmt == BINARY:
+            for line in BinaryDecoder().decode(f.read()):
+                yield line
+            return
+        for line in io.TextIOWrapper(f, encoding=encoding, newline=None):
+            yield line.rstrip('\n')
@@ -0,0 +1,211 @@
+"""
+Asynchronous G-code export.
+
+Runs ``write_gcode`` on a background worker thread so the caller (i.e. the
+Grasshopper solver thread) is never blocked by file I/O. Jobs report their
+progress, propagate errors through ``result()`` and can be cancelled, i.e.
+when a new export is started before the previous one has finished.
+
+This module does not depend on Rhino or Grasshopper.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# LOCAL IMPORTS
+from .gcode_writer import (DEFAULT_BUFFER_SIZE,
+                           DEFAULT_CHUNK_LINES,
+                           GCodeWriteCancelled,
+                           write_gcode)
+
+# job states
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+FINISHED = 'FINISHED'
+FAILED = 'FAILED'
+CANCELLED = 'CANCELLED'
+
+# a single worker serializes exports so a cancelled job always finishes
+# (and cleans up its file) before the next job starts writing
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor():
+    """Return the shared, lazily created export executor."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix='ddu_gcode_export')
+        return _EXECUTOR
+
+
+class GCodeExportJob(object):
+    """
+    A single background G-code export.
+
+    The lines are snapshotted into a Python list on construction so that the
+    caller can safely mutate or discard the original collection while the
+    job is running.
+
+    Args:
+        path: Path of the file to write
+        lines: Iterable of G-code lines
+        on_progress: Optional callable, called as ``on_progress(job)`` from
+                     the worker thread after every written chunk
+        on_done: Optional callable, called as ``on_done(job)`` from the
+                 worker thread once the job has finished, failed or has
+                 been cancelled
+        chunk_lines: Number of lines joined into one write call
+        buffer_size: Size of the file handle buffer in bytes
+        fmt: Output format (see ``gcode_codecs``), guessed from the path if
+             not supplied
+        level: Optional compression level for compressed formats
+    """
+
+    def __init__(self,
+                 path,
+                 lines,
+                 on_progress=None,
+                 on_done=None,
+                 chunk_lines=DEFAULT_CHUNK_LINES,
+                 buffer_size=DEFAULT_BUFFER_SIZE,
+                 fmt=None,
+                 level=None):
+        self.path = path
+        self.lines = list(lines)
+        self.total = len(self.lines)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.chunk_lines = chunk_lines
+        self.buffer_size = buffer_size
+        self.fmt = fmt
+        self.level = level
+        self.state = PENDING
+        self.stats = None
+        self.error = None
+        self.lines_written = 0
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def progress(self):
+        """Fraction of lines written so far, between 0.0 and 1.0."""
+        if self.total == 0:
+            return 1.0 if self.done else 0.0
+        return self.lines_written / self.total
+
+    @property
+    def done(self):
+        """True if the job has finished, failed or was cancelled."""
+        return self.state in (FINISHED, FAILED, CANCELLED)
+
+    @property
+    def message(self):
+        """Short status message, i.e. for a component message bubble."""
+        if self.state == PENDING:
+            return 'Export pending...'
+        elif self.state == RUNNING:
+            return 'Exporting... {0:.0%}'.format(self.progress)
+        elif self.state == FINISHED:
+            return 'Exported {0} lines'.format(self.stats.lines)
+        elif self.state == CANCELLED:
+            return 'Export cancelled'
+        return 'Export failed'
+
+    def start(self, executor=None):
+        """Submit the job to ``executor`` (or the shared export executor)."""
+        if self._future is not None:
+            raise RuntimeError('GCodeExportJob has already been started!')
+        executor = executor or get_executor()
+        self._future = executor.submit(self._run)
+        return self
+
+    def cancel(self):
+        """Request cancellation of the job."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            # the job never started, so the worker will never report back
+            self.error = GCodeWriteCancelled(
+                'Writing {0} was cancelled!'.format(self.path))
+            self.state = CANCELLED
+            self._notify_done()
+
+    def wait(self, timeout=None):
+        """Block until the job is done. Returns True if it is done."""
+        if self._future is None:
+            return False
+        try:
+            self._future.result(timeout)
+        except Exception:
+            pass
+        return self.done
+
+    def result(self, timeout=None):
+        """
+        Block until the job is done and return its ``GCodeWriteStats``.
+        Re-raises any error that happened on the worker thread.
+        """
+        self.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def _progress(self, stats):
+        self.lines_written = stats.lines
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    def _notify_done(self):
+        if self.on_done is not None:
+            self.on_done(self)
+
+    def _run(self):
+        if self._cancel.is_set():
+            self.error = GCodeWriteCancelled(
+                'Writing {0} was cancelled!'.format(self.path))
+            self.state = CANCELLED
+            self._notify_done()
+            return None
+        self.state = RUNNING
+        try:
+            self.stats = write_gcode(self.path,
+                                     self.lines,
+                                     chunk_lines=self.chunk_lines,
+                                     buffer_size=self.buffer_size,
+                                     progress=self._progress,
+                                     cancel=self._cancel,
+                                     fmt=self.fmt,
+                                     level=self.level)
+            self.state = FINISHED
+        except GCodeWriteCancelled as e:
+            self.error = e
+            self.state = CANCELLED
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+        finally:
+            # release the snapshot as soon as possible
+            self.lines = []
+            self._notify_done()
+        return self.stats
+
+
+def export_gcode_async(path, lines, previous=None, **kwargs):
+    """
+    Start a background export of ``lines`` to ``path``. If ``previous`` is
+    a still running ``GCodeExportJob``, it is cancelled first.
+
+    Returns:
+        GCodeExportJob: The started job
+    """
+    if previous is not None and not previous.done:
+        previous.cancel()
+    return GCodeExportJob(path, lines, **kwargs).start()
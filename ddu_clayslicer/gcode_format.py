@@ -0,0 +1,389 @@
+"""
+High-throughput, fixed-point G-code line formatter.
+
+Formats NumPy arrays of X/Y/Z/E/F values plus per-row command codes into
+G-code lines in bulk, i.e.
+
+    G1 X10.000 Y-2.500 Z0.400 E1.234 F1500
+
+Values are converted to fixed-point integers with a fixed number of decimal
+places per axis, correctly rounded like ``'%.3f' % value`` (and ``round``),
+also for values like 1.0005 whose scaled binary value is exactly a half.
+The digits of a chunk are looked up in groups of three from tables of
+ASCII bytes packed into 64-bit integers. The groups are combined into
+8 byte slots at fixed offsets of every line, with zero bytes as padding.
+The zero bytes are deleted from the whole chunk in one go, so no Python
+code runs per line.
+
+Modal axes: an axis word is only emitted if its (fixed-point) value differs
+from the last emitted value of the same axis. NaN values are never emitted,
+i.e. to omit E on travel moves.
+
+The output is streamed in ``GCodeBlock`` chunks of formatted bytes which
+``write_gcode`` writes directly, without splitting them into lines
+(``write_gcode(path, formatter.iter_chunks(...), chunks=True)``).
+
+Unlike the .NET formatting used by the GenerateGCODE component, negative
+values which round to zero are formatted without a sign (``0.000``).
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# LOCAL IMPORTS
+from .gcode_codecs import GCodeBlock
+
+# axis letters in output order
+AXES = ('X', 'Y', 'Z', 'E', 'F')
+# default decimal places per axis
+DEFAULT_DECIMALS = {'X': 3, 'Y': 3, 'Z': 3, 'E': 3, 'F': 0}
+# default command codes
+COMMANDS = {0: 'G0', 1: 'G1'}
+# default number of rows per formatted chunk
+DEFAULT_CHUNK_ROWS = 16384
+
+_NEWLINE = ord('\n')
+# splits doubles into halves for the exact products (Dekker)
+_SPLITTER = 134217729.0
+# packed digit tables by (width, kind, head), see _digit_table
+_TABLES = {}
+
+
+def _packed(text):
+    """The bytes of ``text`` packed little-endian into an integer."""
+    return int.from_bytes(text.encode('ascii'), 'little')
+
+
+def _digit_table(width, kind, head=None):
+    """
+    Packed ASCII digits of all numbers below ``10 ** width``. ``kind`` is
+    'full' (leading zeros), 'dot' (like full, after a decimal point),
+    'blank' (no leading zeros, but 0 has one digit) or 'none' (no leading
+    zeros, 0 has no digits), suppressed zeros are zero bytes. With a
+    ``head`` (i.e. ' X') the digits follow the head and a sign byte, the
+    second half of the table holds the negative numbers.
+    """
+    key = (width, kind, head)
+    if key not in _TABLES:
+        numbers = range(10 ** width)
+        if kind == 'full':
+            texts = ['%0*d' % (width, i) for i in numbers]
+        elif kind == 'dot':
+            texts = ['.%0*d' % (width, i) for i in numbers]
+        else:
+            texts = ['%*d' % (width, i) for i in numbers]
+            if kind == 'none':
+                texts[0] = ''
+        texts = [t.replace(' ', '\x00') for t in texts]
+        if head is not None:
+            texts = ([head + '\x00' + t for t in texts] +
+                     [head + '-' + t for t in texts])
+        _TABLES[key] = np.array([_packed(t) for t in texts], dtype=np.uint64)
+    return _TABLES[key]
+
+
+def _two_product_error(a, b):
+    """
+    Rounding error of the products ``a * b``, i.e. ``a * b`` is exactly
+    ``fl(a * b) + error`` (Dekker's algorithm, without overflow).
+    """
+    p = a * b
+    c = _SPLITTER * a
+    a_hi = c - (c - a)
+    a_lo = a - a_hi
+    c = _SPLITTER * b
+    b_hi = c - (c - b)
+    b_lo = b - b_hi
+    return ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+
+
+def _fixed_point(values, decimals):
+    """
+    Correctly rounded fixed-point integers of ``values`` with ``decimals``
+    places, i.e. the digits of ``'%.*f' % (decimals, value)``. Scaling a
+    value rounds it to binary, so products which land exactly on a half are
+    resolved using the exact rounding error of the product.
+    """
+    scale = float(10 ** decimals)
+    scaled = values * scale
+    fixed = np.rint(scaled)
+    if decimals > 0:
+        halves = np.flatnonzero(np.abs(scaled - fixed) == 0.5)
+        if len(halves):
+            error = _two_product_error(values[halves], scale)
+            half = scaled[halves] - fixed[halves]
+            fixed[halves] += ((half > 0) & (error > 0)).astype(np.float64)
+            fixed[halves] -= ((half < 0) & (error < 0)).astype(np.float64)
+    return fixed.astype(np.int64)
+
+
+def _place(mat, offset, width, values, index=None):
+    """
+    Bitwise or the packed ``values`` of ``width`` bytes into the 8 byte
+    slots ``mat`` (one row per slot) at the byte ``offset`` of the lines,
+    only into the lines ``index`` if given. Values which do not fit into
+    their slot continue in the next one.
+    """
+    slot, shift = divmod(offset, 8)
+    if shift:
+        if shift + width > 8:
+            _place(mat, offset + 8 - shift, shift + width - 8,
+                   values >> np.uint64(64 - 8 * shift), index)
+        values = values << np.uint64(8 * shift)
+    if index is None:
+        mat[slot] |= values
+    else:
+        mat[slot, index] |= values
+
+
+class GCodeFormatter(object):
+    """
+    Stateful bulk formatter of G-code move lines.
+
+    Args:
+        decimals: Dict of decimal places per axis letter, missing axes use
+                  ``DEFAULT_DECIMALS``
+        commands: Dict mapping integer command codes to command words
+        modal: Suppress axis words whose value did not change
+    """
+
+    def __init__(self, decimals=None, commands=None, modal=True):
+        self.decimals = dict(DEFAULT_DECIMALS)
+        if decimals:
+            self.decimals.update(decimals)
+        self.commands = dict(commands or COMMANDS)
+        self.modal = modal
+        # packed command words, one table per 8 bytes of the longest word
+        codes = sorted(self.commands)
+        self._codes = np.array(codes, dtype=np.int64)
+        words = [self.commands[c] for c in codes]
+        self._token_width = max(len(w) for w in words)
+        self._tokens = [
+            np.array([_packed(w[k:k + 8]) for w in words], dtype=np.uint64)
+            for k in range(0, self._token_width, 8)]
+        self.reset()
+
+    def reset(self):
+        """Forget the modal state, the next row emits all axes."""
+        self._last = {}
+
+    def _fixed(self, letter, values):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if valid.all():
+            return _fixed_point(values, self.decimals[letter]), valid
+        fixed = _fixed_point(np.where(valid, values, 0.0),
+                             self.decimals[letter])
+        return fixed, valid
+
+    def _emit_mask(self, letter, fixed, valid):
+        # which rows emit this axis, updates the modal state
+        dense = valid.all()
+        values = fixed if dense else fixed[valid]
+        last = self._last.get(letter, None)
+        if len(values):
+            self._last[letter] = int(values[-1])
+        if not self.modal:
+            return valid
+        # compare every valid value with the previous valid value
+        changed = np.empty(len(values), dtype=bool)
+        if len(values):
+            changed[0] = last is None or values[0] != last
+            np.not_equal(values[1:], values[:-1], out=changed[1:])
+        if dense:
+            return changed
+        emit = np.zeros(len(fixed), dtype=bool)
+        emit[valid] = changed
+        return emit
+
+    def _word_pieces(self, letter, fixed, digits):
+        """
+        The packed pieces ``(width, values)`` of the ' <letter><number>'
+        words of the fixed-point values, laid out for ``digits`` integer
+        digits, which are grouped by three.
+        """
+        decimals = self.decimals[letter]
+        negative = fixed < 0
+        a = np.abs(fixed)
+        if decimals > 0:
+            integer = a // 10 ** decimals
+            fraction = a - integer * 10 ** decimals
+        else:
+            integer = a
+        # space, letter, sign and the highest integer digits
+        groups = (digits + 2) // 3
+        width = digits - 3 * (groups - 1)
+        table = _digit_table(width, 'blank' if groups == 1 else 'none',
+                             ' ' + letter)
+        top = integer // 1000 ** (groups - 1) if groups > 1 else integer
+        pieces = [(3 + width, table[top + negative * 10 ** width])]
+        for g in range(groups - 2, -1, -1):
+            # full three digits if any higher digit is set
+            table = np.concatenate([
+                _digit_table(3, 'blank' if g == 0 else 'none'),
+                _digit_table(3, 'full')])
+            group = (integer // 1000 ** g if g else integer) % 1000
+            pieces.append(
+                (3, table[group + 1000 * (integer >= 1000 ** (g + 1))]))
+        # decimal point and fraction digits, grouped by three
+        groups = (decimals + 2) // 3
+        for g in range(groups - 1, -1, -1):
+            group = fraction // 1000 ** g if g else fraction
+            if g < groups - 1:
+                pieces.append((3, _digit_table(3, 'full')[group % 1000]))
+            else:
+                width = decimals - 3 * g
+                pieces.append((width + 1, _digit_table(width, 'dot')[group]))
+        return pieces
+
+    def format(self, commands=None, **axes):
+        """
+        Format one chunk of rows into G-code text (see ``format_bytes``).
+
+        Returns:
+            str: The formatted lines, every line terminated by a newline
+        """
+        return self.format_bytes(commands, **axes).decode('ascii')
+
+    def format_bytes(self, commands=None, **axes):
+        """
+        Format one chunk of rows into ASCII G-code bytes.
+
+        Args:
+            commands: Array of command codes per row (defaults to G1 if the
+                      code 1 exists, otherwise the first code)
+            **axes: Arrays of values per axis letter (X, Y, Z, E, F), NaN
+                    values are not emitted
+
+        Returns:
+            bytes: The formatted lines, every line terminated by a newline
+        """
+        letters = [ax for ax in AXES if axes.get(ax) is not None]
+        unknown = set(axes).difference(AXES)
+        if unknown:
+            raise ValueError('Unknown axes: {0}'.format(sorted(unknown)))
+        if not letters and commands is None:
+            return b''
+        rows = len(commands) if commands is not None else \
+            len(axes[letters[0]])
+        if rows == 0:
+            return b''
+        if commands is None:
+            default = 1 if 1 in self.commands else int(self._codes[0])
+            token_idx = np.full(rows, np.searchsorted(self._codes, default))
+        else:
+            codes = np.asarray(commands, dtype=np.int64)
+            token_idx = np.searchsorted(self._codes, codes)
+            token_idx = np.minimum(token_idx, len(self._codes) - 1)
+            if (self._codes[token_idx] != codes).any():
+                raise ValueError('Unknown command code in commands!')
+        # the pieces of all words are packed into 8 byte slots per line at
+        # fixed byte offsets
+        words = []
+        width = self._token_width
+        for letter in letters:
+            fixed, valid = self._fixed(letter, axes[letter])
+            if len(fixed) != rows:
+                raise ValueError('Array lengths do not match!')
+            emit = self._emit_mask(letter, fixed, valid)
+            top = int(np.abs(fixed).max()) // 10 ** self.decimals[letter]
+            index = mask = None
+            count = np.count_nonzero(emit)
+            if count < rows // 8:
+                # words of few lines (i.e. modal Z and F) are only
+                # formatted for these lines
+                index = np.flatnonzero(emit)
+                fixed = fixed[index]
+            elif count < rows:
+                mask = emit
+            pieces = self._word_pieces(letter, fixed, len(str(top)))
+            words.append((pieces, index, mask))
+            width += sum(w for w, _ in pieces)
+        # one row per slot, so the pieces are written contiguously
+        mat = np.zeros((width // 8 + 1, rows), dtype='<u8')
+        offset = 0
+        for k, table in enumerate(self._tokens):
+            w = min(self._token_width - 8 * k, 8)
+            _place(mat, offset, w, table[token_idx])
+            offset += w
+        for pieces, index, mask in words:
+            for w, values in pieces:
+                if mask is not None:
+                    values *= mask
+                _place(mat, offset, w, values, index)
+                offset += w
+        mat[offset // 8] |= np.uint64(_NEWLINE << 8 * (offset % 8))
+        # deleting the zero padding from the bytes is much faster than
+        # compacting the lines
+        return mat.T.tobytes().translate(None, b'\x00')
+
+    def format_lines(self, commands=None, **axes):
+        """Format one chunk of rows into a list of lines."""
+        text = self.format(commands, **axes)
+        return text.split('\n')[:-1] if text else []
+
+    def iter_chunks(self, commands=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                    **axes):
+        """
+        Format all rows and yield ``GCodeBlock`` objects of at most
+        ``chunk_rows`` lines, i.e. for ``write_gcode(path, chunks,
+        chunks=True)``.
+        """
+        letters = [ax for ax in AXES if axes.get(ax) is not None]
+        if commands is not None:
+            rows = len(commands)
+        elif letters:
+            rows = len(axes[letters[0]])
+        else:
+            return
+        for lo in range(0, rows, chunk_rows):
+            hi = min(lo + chunk_rows, rows)
+            yield GCodeBlock(self.format_bytes(
+                None if commands is None else commands[lo:hi],
+                **dict((ax, axes[ax][lo:hi]) for ax in letters)), hi - lo)
+
+
+def format_gcode(commands=None, decimals=None, modal=True, **axes):
+    """Format all rows into a list of G-code lines in one call."""
+    return GCodeFormatter(decimals, modal=modal).format_lines(commands,
+                                                              **axes)
+
+
+# REFERENCE --------------------------------------------------------------------
+
+def reference_format(commands, decimals=None, command_words=None, modal=True,
+                     **axes):
+    """
+    Pure Python reference implementation of ``GCodeFormatter.format_lines``
+    formatting every value using printf-style formatting.
+
+    Returns:
+        list: The formatted lines
+    """
+    places = dict(DEFAULT_DECIMALS)
+    if decimals:
+        places.update(decimals)
+    command_words = command_words or COMMANDS
+    letters = [ax for ax in AXES if axes.get(ax) is not None]
+    last = {}
+    lines = []
+    for i, code in enumerate(commands):
+        words = [command_words[int(code)]]
+        for letter in letters:
+            value = float(axes[letter][i])
+            if value != value:
+                continue
+            text = '%.*f' % (places[letter], value)
+            fixed = int(text.replace('.', ''))
+            if modal and last.get(letter) == fixed:
+                continue
+            last[letter] = fixed
+            if fixed == 0:
+                text = text.lstrip('-')
+            words.append(letter + text)
+        lines.append(' '.join(words))
+    return lines
@@ -0,0 +1,720 @@
+"""
+Streaming parser and layer indexer for plain text G-code files.
+
+The file is memory-mapped and parsed in chunks of whole lines into columnar
+NumPy arrays, without creating a Python object per line. Every ``G`` command
+line becomes one row:
+
+    command:  The G command number (i.e. 0, 1, 92), int16
+    x/y/z/e/f: The values of the X, Y, Z, E and F words, NaN if the word is
+               not present on the line (use ``GCodeColumns.filled`` for the
+               modal values)
+    offset:   The byte offset of the line in the file, int64
+    layer:    The layer of the row, -1 before the first layer, int32
+
+Comments (everything after ``;``) and all other lines are skipped, words
+have to be uppercase and separated by whitespace as written by the
+GenerateGCODE component.
+
+The layer index is built from the ``; ///// LAYER n /////`` comments written
+by GenerateGCODE. Files without layer comments are indexed by Z changes of
+the extruding moves (G1 moves with increasing E), which does not work for
+spiralized prints. Travel moves belong to the layer of the preceding
+extruding move. Using the index, any range of layers can be loaded later by
+parsing only its byte range of the file (``read_layers``).
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import mmap
+import os
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# LOCAL IMPORTS
+from .gcode_codecs import TEXT, format_from_path
+
+# axis letters in column order
+AXES = ('X', 'Y', 'Z', 'E', 'F')
+# prefix of the layer comments written by GenerateGCODE
+LAYER_PREFIX = b'; ///// LAYER '
+# markers of the settings header written by GenerateGCODE
+HEADER_BEGIN = 'BEGIN_DDU_3DCLAYPRINTING_HEADER'
+HEADER_END = 'END_DDU_3DCLAYPRINTING_HEADER'
+# default number of bytes parsed per chunk
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+# maximum number of characters of a numeric value
+MAX_NUMBER_LENGTH = 24
+
+_NEWLINE = ord('\n')
+_SEMICOLON = ord(';')
+_G = ord('G')
+
+# character class bit flags of every byte value, all bytes of a chunk are
+# classified in a single lookup, axis letters store their axis index in the
+# upper bits
+_DIGIT = 0x01
+_DOT = 0x02
+_SIGN = 0x04
+_SPACE = 0x08
+_LETTER = 0x10
+_AXIS_SHIFT = 5
+_CLASS_LUT = np.zeros(256, dtype=np.uint8)
+_CLASS_LUT[[ord(c) for c in '0123456789']] = _DIGIT
+_CLASS_LUT[ord('.')] = _DOT
+_CLASS_LUT[[ord('+'), ord('-')]] = _SIGN
+_CLASS_LUT[[ord(' '), ord('\t')]] = _SPACE
+for _i, _letter in enumerate(AXES):
+    _CLASS_LUT[ord(_letter)] = _LETTER | (_i << _AXIS_SHIFT)
+# uint64 constants of the SWAR number parsing: masks of the lowest k bytes,
+# the lowest bit of every byte, ascii zeros and powers of ten
+_MASK_BELOW = np.array([(1 << (8 * k)) - 1 for k in range(9)],
+                       dtype=np.uint64)
+_LOW_BITS = np.uint64(0x0101010101010101)
+_ZEROS = np.uint64(0x3030303030303030)
+_POW10_INT = 10 ** np.arange(9, dtype=np.uint64)
+
+
+class GCodeColumns(object):
+    """
+    Columnar arrays of parsed G-code rows, see the module docstring.
+
+    Args:
+        command: Array of G command numbers
+        values: Array of shape (5, rows) with the X, Y, Z, E and F values
+        offset: Array of byte offsets of the lines
+        layer: Array of layer indices of the rows
+        initial: Modal X, Y, Z, E and F values before the first row (NaN
+                 if unknown), used by ``filled``
+    """
+
+    def __init__(self, command, values, offset, layer=None, initial=None):
+        self.command = command
+        self.values = values
+        self.offset = offset
+        if layer is None:
+            layer = np.full(len(command), -1, dtype=np.int32)
+        self.layer = layer
+        if initial is None:
+            initial = np.full(len(AXES), np.nan)
+        self.initial = np.asarray(initial, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.command)
+
+    def __repr__(self):
+        return 'GCodeColumns({0} rows)'.format(len(self))
+
+    @property
+    def x(self):
+        return self.values[0]
+
+    @property
+    def y(self):
+        return self.values[1]
+
+    @property
+    def z(self):
+        return self.values[2]
+
+    @property
+    def e(self):
+        return self.values[3]
+
+    @property
+    def f(self):
+        return self.values[4]
+
+    def column(self, letter):
+        """Return the raw values of the axis ``letter``."""
+        return self.values[AXES.index(letter)]
+
+    def filled(self, letter):
+        """
+        Return the modal values of the axis ``letter``, i.e. missing values
+        are filled with the last value given before (or the initial value).
+        """
+        axis = AXES.index(letter)
+        return _forward_fill(self.values[axis], self.initial[axis])
+
+    def select(self, rows):
+        """
+        Return the columns of the rows selected by a slice, index or
+        boolean array. Modal values of the selection are not updated.
+        """
+        return GCodeColumns(self.command[rows], self.values[:, rows],
+                            self.offset[rows], self.layer[rows], self.initial)
+
+
+class GCodeIndex(object):
+    """
+    Layer index of a G-code file.
+
+    Layer ``k`` spans the rows ``starts[k]:starts[k + 1]`` and the bytes
+    ``byte_offsets[k]:byte_offsets[k + 1]`` of the file. Rows before the
+    first layer (i.e. the header) are not part of any layer.
+
+    Args:
+        path: Path of the indexed file
+        size: Size of the file in bytes when it was indexed
+        mtime: Modification time of the file when it was indexed
+        starts: Row offsets of all layers, length ``layer_count + 1``
+        byte_offsets: Byte offsets of all layers, length ``layer_count + 1``
+        numbers: Layer numbers (from the layer comments or 1, 2, ...)
+        state: Array of shape (layer_count, 5) of the modal X, Y, Z, E and
+               F values at the start of every layer
+    """
+
+    def __init__(self, path, size, mtime, starts, byte_offsets, numbers,
+                 state):
+        self.path = path
+        self.size = int(size)
+        self.mtime = float(mtime)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.byte_offsets = np.asarray(byte_offsets, dtype=np.int64)
+        self.numbers = np.asarray(numbers, dtype=np.int64)
+        self.state = np.asarray(state, dtype=np.float64).reshape(-1,
+                                                                 len(AXES))
+
+    def __repr__(self):
+        return 'GCodeIndex({0} layers, {1} rows)'.format(self.layer_count,
+                                                         self.rows)
+
+    @property
+    def layer_count(self):
+        return len(self.numbers)
+
+    @property
+    def rows(self):
+        """Number of rows of the whole file."""
+        return int(self.starts[-1]) if len(self.starts) else 0
+
+    def layer_rows(self, layer):
+        """Return the (start, stop) rows of ``layer``."""
+        return int(self.starts[layer]), int(self.starts[layer + 1])
+
+    def is_current(self, path=None):
+        """Check if the file did not change since it was indexed."""
+        st = os.stat(path or self.path)
+        return st.st_size == self.size and st.st_mtime == self.mtime
+
+    def save(self, path):
+        """Save the index to a ``.npz`` file."""
+        with open(path, 'wb') as f:
+            np.savez(f,
+                     path=np.array(self.path),
+                     size=self.size,
+                     mtime=self.mtime,
+                     starts=self.starts,
+                     byte_offsets=self.byte_offsets,
+                     numbers=self.numbers,
+                     state=self.state)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved using ``save``."""
+        with np.load(path) as data:
+            return cls(str(data['path']), int(data['size']),
+                       float(data['mtime']), data['starts'],
+                       data['byte_offsets'], data['numbers'], data['state'])
+
+
+# HEADER -----------------------------------------------------------------------
+
+def parse_header(lines):
+    """
+    Parse the ``; KEY=value`` settings of the DDU 3D clay printing header
+    written by GenerateGCODE (i.e. PRINTSPEED, LAYERHEIGHT, LINEWIDTH) from
+    an iterable of lines. Lines after the end of the header are not read.
+
+    Returns:
+        dict: Values by key, numeric values are converted to float
+    """
+    header = {}
+    inside = False
+    for line in lines:
+        line = line.strip()
+        if HEADER_BEGIN in line:
+            inside = True
+        elif HEADER_END in line:
+            break
+        elif inside and line.startswith(';') and '=' in line:
+            key, value = line[1:].split('=', 1)
+            value = value.split(';', 1)[0].strip()
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+            header[key.strip()] = value
+    return header
+
+
+def read_header(path):
+    """Read the header settings of a G-code file, see ``parse_header``."""
+    with open(path, 'r') as f:
+        return parse_header(f)
+
+
+# PARSING ----------------------------------------------------------------------
+
+def _forward_fill(values, initial=np.nan):
+    # fill NaN values with the last valid value before them
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(len(values)), -1)
+    np.maximum.accumulate(idx, out=idx)
+    filled = values[np.maximum(idx, 0)]
+    filled[idx < 0] = initial
+    return filled
+
+
+def _parse_numbers_loop(buf, pos, limit):
+    # parse character by character, used for numbers the fast path can not
+    # handle
+    count = len(pos)
+    mantissa = np.zeros(count, dtype=np.int64)
+    places = np.zeros(count, dtype=np.int64)
+    ndigits = np.zeros(count, dtype=np.int64)
+    negative = np.zeros(count, dtype=bool)
+    seen_dot = np.zeros(count, dtype=bool)
+    active = pos < limit
+    size = len(buf)
+    for k in range(MAX_NUMBER_LENGTH):
+        idx = pos + k
+        active &= idx < limit
+        if not active.any():
+            break
+        c = buf[np.minimum(idx, size - 1)].astype(np.int64)
+        digit = active & (c >= 48) & (c <= 57)
+        mantissa = np.where(digit, mantissa * 10 + (c - 48), mantissa)
+        places += digit & seen_dot
+        ndigits += digit
+        dot = active & (c == 46) & ~seen_dot
+        seen_dot |= dot
+        if k == 0:
+            negative = active & (c == 45)
+            active &= digit | dot | (c == 45) | (c == 43)
+        else:
+            active &= digit | dot
+    # dividing the exact integer mantissa by an exact power of ten rounds
+    # the same way as parsing the decimal string
+    values = mantissa / np.power(10.0, places)
+    values[negative] *= -1.0
+    return values, ndigits > 0
+
+
+def _uint64_view(buf):
+    # overlapping, unaligned uint64 view of the 8 bytes starting at every
+    # position
+    return np.ndarray((len(buf) - 7,), dtype='<u8', buffer=buf, strides=(1,))
+
+
+def _byte_index(flag):
+    # index of the lowest byte with a set flag bit (8 if there is none), the
+    # bytes below are summed up by multiplication
+    below = (flag & (~flag + np.uint64(1))) - np.uint64(1)
+    return ((below & _LOW_BITS) * _LOW_BITS) >> np.uint64(56)
+
+
+def _swar_digits(words, ndigits):
+    """
+    Combine the first ``ndigits`` (at most 8) ascii digits of uint64 text
+    words, padded with zeros to 8 digits (i.e. ``12`` is ``12000000``).
+    """
+    # the digits are below any non-digit, so subtracting the ascii zeros
+    # does not borrow from them
+    words = (words - _ZEROS) & np.take(_MASK_BELOW, ndigits)
+    # combine the digits pairwise, the first digit is the lowest byte
+    words = (words * np.uint64(10) + (words >> np.uint64(8))) & \
+        np.uint64(0x00FF00FF00FF00FF)
+    words = (words * np.uint64(100) + (words >> np.uint64(16))) & \
+        np.uint64(0x0000FFFF0000FFFF)
+    return (words * np.uint64(10000) + (words >> np.uint64(32))) & \
+        np.uint64(0xFFFFFFFF)
+
+
+def _parse_numbers(buf, pos, limit, classes=None):
+    """
+    Parse the decimal numbers starting at the byte positions ``pos`` of
+    ``buf``, not reading beyond ``limit`` (per number). Parsing stops at
+    the first character which is not part of the number.
+
+    Numbers with less than 8 integer and fractional digits are parsed using
+    SWAR arithmetic: 8 bytes of the text and of the character classes are
+    read at once as little endian uint64 words. All others are parsed
+    character by character.
+
+    Args:
+        buf: uint8 array of the text
+        pos: Start positions of the numbers
+        limit: End positions (exclusive) the numbers may extend to
+        classes: ``_CLASS_LUT[buf]``, computed if missing
+
+    Returns:
+        tuple: (values, valid) float64 and bool arrays
+    """
+    count = len(pos)
+    size = len(buf)
+    values = np.zeros(count, dtype=np.float64)
+    valid = np.zeros(count, dtype=bool)
+    if not count:
+        return values, valid
+    pos = np.asarray(pos, dtype=np.int64)
+    limit = np.asarray(limit, dtype=np.int64)
+    fast = np.zeros(count, dtype=bool)
+    if size >= 24:
+        if classes is None:
+            classes = _CLASS_LUT[buf]
+        text_view = _uint64_view(buf)
+        class_view = _uint64_view(classes)
+        last = size - 24
+        first = buf[np.minimum(pos, size - 1)]
+        negative = first == 45
+        start = pos + (negative | (first == 43))
+        inside = start <= last
+        start = np.minimum(start, last)
+        # integer digits up to the first non-digit
+        nondigit = ~class_view[start] & _LOW_BITS
+        nint = _byte_index(nondigit).astype(np.int64)
+        # fractional digits if the integer digits end at a dot
+        dot = start + nint
+        has_dot = buf[dot] == 46
+        nondigit = ~class_view[dot + 1] & _LOW_BITS
+        nfrac = np.where(has_dot, _byte_index(nondigit).astype(np.int64), 0)
+        end = dot + has_dot + nfrac
+        fast = (inside & (nint < 8) & (nfrac < 8) &
+                (end <= limit))
+        # usually all numbers take the fast path
+        rows = slice(None) if fast.all() else np.flatnonzero(fast)
+        start = start[rows]
+        nint = nint[rows]
+        nfrac = nfrac[rows]
+        integer = _swar_digits(text_view[start], nint)
+        fraction = _swar_digits(text_view[start + nint + 1], nfrac)
+        # both parts are padded to 8 digits, so the mantissa is scaled by
+        # 1e8 and dividing the exact integer by the exact power of ten
+        # rounds the same way as parsing the decimal string
+        mantissa = integer * np.take(_POW10_INT, nint) + fraction
+        mantissa = mantissa / 1e8
+        np.negative(mantissa, out=mantissa, where=negative[rows])
+        values[rows] = mantissa
+        valid[rows] = nint + nfrac > 0
+    rows = np.flatnonzero(~fast)
+    if len(rows):
+        values[rows], valid[rows] = _parse_numbers_loop(buf, pos[rows],
+                                                        limit[rows])
+    return values, valid
+
+
+class _Chunk(object):
+    """Parsed rows and layer comments of a chunk of lines."""
+
+    def __init__(self, command, values, offset, layer_rows, layer_numbers,
+                 layer_offsets):
+        self.command = command
+        self.values = values
+        self.offset = offset
+        self.layer_rows = layer_rows
+        self.layer_numbers = layer_numbers
+        self.layer_offsets = layer_offsets
+
+
+def _parse_chunk(buf, base=0):
+    """
+    Parse a buffer of whole lines, ``base`` is the byte offset of the
+    buffer in the file.
+    """
+    size = len(buf)
+    nl = np.flatnonzero(buf == _NEWLINE)
+    starts = np.concatenate([[0], nl + 1])
+    ends = np.concatenate([nl, [size]])
+    if starts[-1] >= size:
+        starts = starts[:-1]
+        ends = ends[:-1]
+    first = buf[np.minimum(starts, size - 1)] if size else starts
+    # the code part of every line ends at the first semicolon
+    cut = ends.copy()
+    semi = np.flatnonzero(buf == _SEMICOLON)
+    if len(semi):
+        semi_line = np.searchsorted(starts, semi, side='right') - 1
+        head = np.ones(len(semi), dtype=bool)
+        head[1:] = semi_line[1:] != semi_line[:-1]
+        cut[semi_line[head]] = semi[head]
+    is_g = first == _G
+    g_lines = np.flatnonzero(is_g)
+    rows = len(g_lines)
+    row_of_line = np.cumsum(is_g) - 1
+    # command numbers
+    classes = _CLASS_LUT[buf]
+    command, _ = _parse_numbers(buf, starts[g_lines] + 1, cut[g_lines],
+                                classes)
+    command = command.astype(np.int16)
+    # axis words, a letter following whitespace on the code part of a line
+    values = np.full((len(AXES), rows), np.nan)
+    words = np.flatnonzero((classes[1:] & _LETTER).astype(bool) &
+                           (classes[:-1] == _SPACE)) + 1
+    if len(words):
+        word_line = np.searchsorted(starts, words, side='right') - 1
+        keep = is_g[word_line] & (words < cut[word_line])
+        words = words[keep]
+        word_line = word_line[keep]
+        numbers, valid = _parse_numbers(buf, words + 1, cut[word_line],
+                                        classes)
+        values[(classes[words[valid]] >> _AXIS_SHIFT).astype(np.intp),
+               row_of_line[word_line[valid]]] = numbers[valid]
+    # layer comments
+    prefix = np.frombuffer(LAYER_PREFIX, dtype=np.uint8)
+    cand = np.flatnonzero((first == _SEMICOLON) &
+                          (ends - starts > len(prefix)))
+    for k in range(1, len(prefix)):
+        if not len(cand):
+            break
+        cand = cand[buf[starts[cand] + k] == prefix[k]]
+    layer_numbers, valid = _parse_numbers(buf, starts[cand] + len(prefix),
+                                          ends[cand], classes)
+    cand = cand[valid]
+    return _Chunk(command,
+                  values,
+                  starts[g_lines] + base,
+                  # rows before the layer comment
+                  row_of_line[cand] + 1,
+                  layer_numbers[valid].astype(np.int64),
+                  starts[cand] + base)
+
+
+def _iter_chunks(data, lo, hi, chunk_bytes):
+    # yield (start, stop) byte ranges of whole lines
+    while lo < hi:
+        stop = min(lo + chunk_bytes, hi)
+        if stop < hi:
+            nl = data.rfind(b'\n', lo, stop)
+            if nl < 0:
+                nl = data.find(b'\n', stop, hi)
+            stop = hi if nl < 0 else nl + 1
+        yield lo, stop
+        lo = stop
+
+
+def _parse_range(data, lo, hi, chunk_bytes):
+    # parse the byte range of a buffer, returns the concatenated chunks
+    chunks = []
+    row_base = 0
+    for start, stop in _iter_chunks(data, lo, hi, chunk_bytes):
+        buf = np.frombuffer(data, dtype=np.uint8, count=stop - start,
+                            offset=start)
+        chunk = _parse_chunk(buf, start)
+        chunk.layer_rows += row_base
+        row_base += len(chunk.command)
+        chunks.append(chunk)
+    if not chunks:
+        return _parse_chunk(np.zeros(0, dtype=np.uint8))
+    if len(chunks) == 1:
+        return chunks[0]
+    return _Chunk(np.concatenate([c.command for c in chunks]),
+                  np.concatenate([c.values for c in chunks], axis=1),
+                  np.concatenate([c.offset for c in chunks]),
+                  np.concatenate([c.layer_rows for c in chunks]),
+                  np.concatenate([c.layer_numbers for c in chunks]),
+                  np.concatenate([c.layer_offsets for c in chunks]))
+
+
+class _MappedFile(object):
+    """Read-only memory map of a file, empty files map to empty bytes."""
+
+    def __init__(self, path):
+        if format_from_path(path) != TEXT:
+            raise ValueError('Only plain text G-code files can be parsed, '
+                             'got "{0}"!'.format(path))
+        self._file = open(path, 'rb')
+        st = os.fstat(self._file.fileno())
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        if self.size:
+            self.data = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            self.data = b''
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# LAYER INDEX ------------------------------------------------------------------
+
+def _z_layer_starts(command, values, tolerance):
+    # rows where the z of the extruding moves changes
+    e = _forward_fill(values[3])
+    delta = np.diff(e, prepend=np.nan)
+    extruding = np.flatnonzero((command == 1) & (delta > 0))
+    if not len(extruding):
+        return extruding
+    z = _forward_fill(values[2])[extruding]
+    change = np.ones(len(extruding), dtype=bool)
+    change[1:] = ~(np.abs(np.diff(z)) <= tolerance)
+    return extruding[change]
+
+
+def _layer_state(values, starts):
+    # modal values of all axes before the given rows
+    state = np.full((len(starts), len(AXES)), np.nan)
+    if not len(starts):
+        return state
+    before = np.asarray(starts) - 1
+    has_before = before >= 0
+    for axis in range(len(AXES)):
+        valid = ~np.isnan(values[axis])
+        idx = np.where(valid, np.arange(values.shape[1]), -1)
+        np.maximum.accumulate(idx, out=idx)
+        last = idx[np.maximum(before, 0)]
+        ok = has_before & (last >= 0)
+        state[ok, axis] = values[axis, last[ok]]
+    return state
+
+
+def _build_index(path, mapped, chunk, layers, z_tolerance):
+    rows = len(chunk.command)
+    if layers == 'auto':
+        layers = 'comments' if len(chunk.layer_rows) else 'z'
+    if layers == 'comments':
+        starts = chunk.layer_rows
+        byte_offsets = chunk.layer_offsets
+        numbers = chunk.layer_numbers
+    elif layers == 'z':
+        starts = _z_layer_starts(chunk.command, chunk.values, z_tolerance)
+        byte_offsets = chunk.offset[starts]
+        numbers = np.arange(1, len(starts) + 1, dtype=np.int64)
+    else:
+        raise ValueError('Unknown layer mode "{0}"!'.format(layers))
+    return GCodeIndex(path,
+                      mapped.size,
+                      mapped.mtime,
+                      np.append(starts, rows),
+                      np.append(byte_offsets, mapped.size),
+                      numbers,
+                      _layer_state(chunk.values, starts))
+
+
+def _row_layers(starts, rows, first_layer=0):
+    # layer index of every row, -1 before the first layer
+    layer = np.searchsorted(starts[:-1], np.arange(rows), side='right') - 1
+    layer = layer.astype(np.int32)
+    if first_layer:
+        layer += first_layer
+    return layer
+
+
+def parse_gcode(path, layers='auto', z_tolerance=1e-6,
+                chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Parse a whole G-code file into columns and build its layer index.
+
+    Args:
+        path: Path of a plain text G-code file
+        layers: Layer detection, 'comments' (layer comments), 'z' (Z
+                changes of the extruding moves) or 'auto' (comments if the
+                file contains any, otherwise z)
+        z_tolerance: Z changes below this tolerance do not start a new
+                     layer ('z' mode only)
+        chunk_bytes: Approximate number of bytes parsed at once
+
+    Returns:
+        tuple: (GCodeColumns, GCodeIndex)
+    """
+    with _MappedFile(path) as mapped:
+        chunk = _parse_range(mapped.data, 0, mapped.size, chunk_bytes)
+        index = _build_index(path, mapped, chunk, layers, z_tolerance)
+    columns = GCodeColumns(chunk.command, chunk.values, chunk.offset,
+                           _row_layers(index.starts, len(chunk.command)))
+    return columns, index
+
+
+def index_gcode(path, layers='auto', z_tolerance=1e-6,
+                chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Build the layer index of a G-code file, see ``parse_gcode``."""
+    return parse_gcode(path, layers, z_tolerance, chunk_bytes)[1]
+
+
+def read_layers(index, start, stop=None, path=None,
+                chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Parse only the layers ``start:stop`` of an indexed G-code file.
+
+    Args:
+        index: The GCodeIndex of the file
+        start: First layer
+        stop: End layer (exclusive), defaults to ``start + 1``
+        path: Path of the file, defaults to the indexed path
+
+    Returns:
+        GCodeColumns: The rows of the layers, ``layer`` holds the layer
+                      indices of the whole file and the modal values are
+                      initialized from the index
+    """
+    path = path or index.path
+    count = index.layer_count
+    stop = start + 1 if stop is None else stop
+    start, stop, _ = slice(start, stop).indices(count)
+    stop = max(start, stop)
+    if not index.is_current(path):
+        raise ValueError('{0} changed since it was indexed!'.format(path))
+    with _MappedFile(path) as mapped:
+        chunk = _parse_range(mapped.data,
+                             int(index.byte_offsets[start]),
+                             int(index.byte_offsets[stop]),
+                             chunk_bytes)
+    rows = len(chunk.command)
+    starts = index.starts[start:stop + 1] - index.starts[start]
+    if rows != starts[-1]:
+        raise ValueError('Layers {0}:{1} do not match the index of '
+                         '{2}!'.format(start, stop, path))
+    initial = index.state[start] if start < count else None
+    return GCodeColumns(chunk.command, chunk.values, chunk.offset,
+                        _row_layers(starts, rows, start), initial)
+
+
+def parse_lines(lines):
+    """
+    Parse in-memory G-code lines (i.e. the GCODE output of GenerateGCODE).
+    Byte offsets refer to the lines joined by newlines.
+    """
+    data = ('\n'.join(lines) + '\n').encode('ascii')
+    chunk = _parse_chunk(np.frombuffer(data, dtype=np.uint8))
+    starts = np.append(chunk.layer_rows, len(chunk.command))
+    return GCodeColumns(chunk.command, chunk.values, chunk.offset,
+                        _row_layers(starts, len(chunk.command)))
+
+
+# REFERENCE --------------------------------------------------------------------
+
+def reference_parse(lines):
+    """
+    Pure Python reference implementation of the row parsing, line by line.
+
+    Returns:
+        tuple: (command, values) arrays as in ``GCodeColumns``
+    """
+    command = []
+    values = []
+    for line in lines:
+        if not line.startswith('G'):
+            continue
+        words = line.split(';', 1)[0].split()
+        command.append(int(words[0][1:]))
+        row = [np.nan] * len(AXES)
+        for word in words[1:]:
+            if word[0] in AXES:
+                row[AXES.index(word[0])] = float(word[1:])
+        values.append(row)
+    return (np.array(command, dtype=np.int16),
+            np.array(values, dtype=np.float64).reshape(-1, len(AXES)).T)
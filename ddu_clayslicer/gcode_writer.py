@@ -0,0 +1,158 @@
+"""
+Streaming, buffered G-code writer.
+
+Writes any iterable (or generator) of G-code lines to a file by batching the
+lines into large joined chunks which are written through a single buffered
+file handle. This avoids one string allocation and one write call per line
+and allows the lines to be produced lazily. All output formats of
+``gcode_codecs`` (plain text, gzip, zstd and binary) are supported.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import os
+import time
+from itertools import islice
+
+# LOCAL IMPORTS
+from .gcode_codecs import (GCodeBlock, format_from_path, get_encoder,
+                           open_output)
+
+# number of lines joined into one chunk before it is written
+DEFAULT_CHUNK_LINES = 65536
+# size of the file handle buffer in bytes
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class GCodeWriteCancelled(Exception):
+    """
+    Raised by ``write_gcode`` if the write operation has been cancelled.
+    """
+    pass
+
+
+class GCodeWriteStats(object):
+    """
+    Statistics of a finished G-code write operation.
+    """
+
+    def __init__(self, path='', lines=0, bytes_written=0, seconds=0.0,
+                 file_size=0):
+        self.path = path
+        self.lines = lines
+        # number of encoded (uncompressed) bytes
+        self.bytes_written = bytes_written
+        # size of the written file on disk
+        self.file_size = file_size
+        self.seconds = seconds
+
+    @property
+    def lines_per_second(self):
+        """Throughput of the write operation in lines per second."""
+        if self.seconds <= 0.0:
+            return float(self.lines)
+        return self.lines / self.seconds
+
+    @property
+    def megabytes(self):
+        """Size of the written file, expressed in megabytes."""
+        return self.file_size / (1024.0 * 1024.0)
+
+    def summary(self):
+        """Return a short human-readable summary string."""
+        return '{0} lines, {1:.2f} MB in {2:.3f} s ({3:,.0f} lines/s)'.format(
+            self.lines,
+            self.megabytes,
+            self.seconds,
+            self.lines_per_second)
+
+    def __repr__(self):
+        return 'GCodeWriteStats({0})'.format(self.summary())
+
+
+def iter_chunks(lines, chunk_lines=DEFAULT_CHUNK_LINES):
+    """
+    Yield lists of at most ``chunk_lines`` lines from any iterable of lines.
+    """
+    if chunk_lines < 1:
+        raise ValueError('chunk_lines has to be a positive integer!')
+    it = iter(lines)
+    while True:
+        chunk = list(islice(it, chunk_lines))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_gcode(path,
+                lines,
+                chunk_lines=DEFAULT_CHUNK_LINES,
+                buffer_size=DEFAULT_BUFFER_SIZE,
+                newline='\n',
+                encoding='utf-8',
+                progress=None,
+                cancel=None,
+                fmt=None,
+                level=None,
+                chunks=False):
+    """
+    Write G-code lines to a file in large chunks.
+
+    Args:
+        path: Path of the file to write
+        lines: Any iterable or generator of G-code lines (without newlines)
+        chunk_lines: Number of lines joined into one write call
+        buffer_size: Size of the file handle buffer in bytes
+        newline: Line terminator appended to every line
+        encoding: Text encoding of the written file
+        progress: Optional callable, called as ``progress(stats)`` after
+                  every written chunk
+        cancel: Optional event-like object; if ``cancel.is_set()`` returns
+                True between two chunks, the partially written file is
+                removed and ``GCodeWriteCancelled`` is raised
+        fmt: Output format (see ``gcode_codecs``), guessed from the path if
+             not supplied
+        level: Optional compression level for compressed formats
+        chunks: If True, ``lines`` is an iterable of line lists or
+                ``GCodeBlock`` objects which are written as they are (i.e.
+                ``GCodeFormatter.iter_chunks``)
+
+    Returns:
+        GCodeWriteStats: Number of lines and bytes written and timing
+    """
+    fmt = fmt or format_from_path(path)
+    encoder = get_encoder(fmt, newline, encoding)
+    stats = GCodeWriteStats(path)
+    t0 = time.perf_counter()
+    try:
+        with open_output(path, fmt, level, buffer_size) as f:
+            header = encoder.header()
+            if header:
+                f.write(header)
+                stats.bytes_written += len(header)
+            source = lines if chunks else iter_chunks(lines, chunk_lines)
+            for chunk in source:
+                if cancel is not None and cancel.is_set():
+                    raise GCodeWriteCancelled(
+                        'Writing {0} was cancelled!'.format(path))
+                if isinstance(chunk, GCodeBlock):
+                    data = encoder.encode_block(chunk)
+                else:
+                    data = encoder.encode(chunk)
+                f.write(data)
+                stats.lines += len(chunk)
+                stats.bytes_written += len(data)
+                if progress is not None:
+                    stats.seconds = time.perf_counter() - t0
+                    progress(stats)
+    except GCodeWriteCancelled:
+        # do not leave truncated gcode files behind
+        if os.path.isfile(path):
+            os.remove(path)
+        raise
+    stats.seconds = time.perf_counter() - t0
+    stats.file_size = os.path.getsize(path)
+    return stats
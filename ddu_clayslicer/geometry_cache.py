@@ -0,0 +1,123 @@
+"""
+Per-layer incremental geometry cache.
+
+Used by the PipelineController component to avoid re-coercing every object
+of every referenced layer on every solution. The cache stores
+
+    - per layer: the object ids and converted geometry of its last query
+    - per object: the converted geometry, keyed by a stamp which changes
+      whenever the object changes (i.e. the Rhino runtime serial number)
+
+If the cache is ``tracking`` (i.e. it is kept up to date from document
+events using ``invalidate_layers`` and ``invalidate_object``), layers which
+have not been invalidated are returned without querying the document at
+all. Otherwise every layer is queried, but only objects with a changed
+stamp are converted again.
+
+This module does not depend on Rhino or Grasshopper.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+
+class LayerGeometryCache(object):
+    """
+    Cache of converted layer geometry with hit/miss counters.
+    """
+
+    def __init__(self):
+        self.tracking = False
+        self.hits = 0
+        self.misses = 0
+        # layer key -> (object ids, geometry)
+        self._layers = {}
+        # object id -> (stamp, geometry)
+        self._objects = {}
+        # layers which changed since their last query
+        self._dirty = set()
+
+    def track(self, enabled):
+        """
+        Enable or disable tracking. Layer entries recorded while not
+        tracking may be stale and are queried again when tracking starts.
+        """
+        if enabled and not self.tracking:
+            self._dirty.update(self._layers)
+        self.tracking = bool(enabled)
+
+    def invalidate_layers(self, layer_keys):
+        """Mark layers as changed, their objects are queried again."""
+        self._dirty.update(layer_keys)
+
+    def invalidate_object(self, object_id):
+        """Forget the converted geometry of a single object."""
+        self._objects.pop(object_id, None)
+
+    def clear(self):
+        """Forget everything, i.e. if the document has been closed."""
+        self._layers.clear()
+        self._objects.clear()
+        self._dirty.clear()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def is_current(self, layer_key):
+        """
+        True if the cached geometry of a layer can be returned without
+        querying the document.
+        """
+        return (self.tracking and layer_key in self._layers and
+                layer_key not in self._dirty)
+
+    def get_layer(self, layer_key, list_objects, convert):
+        """
+        Return the converted geometry of all objects of a layer.
+
+        Args:
+            layer_key: Hashable key of the layer (i.e. the layer index)
+            list_objects: Callable returning an iterable of
+                          ``(object_id, stamp, source)`` for the layer
+            convert: Callable converting ``source`` into the cached geometry
+
+        Returns:
+            list: The converted geometry in layer order
+        """
+        cached = self._layers.get(layer_key)
+        if self.is_current(layer_key):
+            self.hits += len(cached[1])
+            return list(cached[1])
+        objects = self._objects
+        ids = []
+        geometry = []
+        for object_id, stamp, source in list_objects():
+            entry = objects.get(object_id)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                geo = entry[1]
+            else:
+                self.misses += 1
+                geo = convert(source)
+                objects[object_id] = (stamp, geo)
+            ids.append(object_id)
+            geometry.append(geo)
+        # forget objects which are no longer on the layer
+        if cached is not None:
+            for object_id in set(cached[0]).difference(ids):
+                objects.pop(object_id, None)
+        self._layers[layer_key] = (ids, geometry)
+        self._dirty.discard(layer_key)
+        return list(geometry)
+
+    @property
+    def stats(self):
+        """Counters and sizes of the cache as a dict."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'layers': len(self._layers),
+            'objects': len(self._objects),
+        }
@@ -0,0 +1,378 @@
+"""
+Cached heat method solver for non-planar slicing.
+
+Computes geodesic distances and hot/cold scalar fields on triangle meshes
+with the heat method (Crane et al. 2013) using the cotan Laplacian ``L`` and
+the lumped mass matrix ``M``:
+
+    1. Solve (M - tL) u = delta of the sources (heat diffusion)
+    2. Normalize the negative gradient of u per face (X = -grad u / |grad u|)
+    3. Solve L phi = div X (Poisson equation), phi are the distances
+
+Both systems only depend on the mesh (and the time step t), so their sparse
+factorizations are computed once per mesh and kept in a ``SolverCache``,
+keyed by a hash of the vertex and face arrays. Changing the sources (or
+anything downstream, like the number of iso-contours) then only costs two
+back-substitutions. The cache evicts the least recently used solvers when
+it holds more than ``max_entries`` solvers or more than ``max_bytes`` of
+matrices and factorizations.
+
+Requires SciPy. If scikit-sparse is installed, CHOLMOD Cholesky
+factorizations are used, otherwise SuperLU.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import hashlib
+from collections import OrderedDict
+
+# THIRD PARTY IMPORTS
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+try:
+    from sksparse.cholmod import cholesky
+except ImportError:
+    cholesky = None
+
+# key of the solver cache in the store (i.e. the scriptcontext sticky)
+STICKY_KEY = 'ddu_clayslicer___HEATSOLVERS'
+# default limits of the solver cache
+DEFAULT_MAX_ENTRIES = 8
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# fallback store if no store is supplied
+_DEFAULT_STORE = {}
+
+
+def mesh_hash(vertices, faces):
+    """Return a SHA-1 hex digest of the vertex and face arrays."""
+    digest = hashlib.sha1()
+    for arr, dtype in ((vertices, np.float64), (faces, np.int64)):
+        arr = np.ascontiguousarray(arr, dtype=dtype)
+        digest.update(str(arr.shape).encode('ascii'))
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+# OPERATORS --------------------------------------------------------------------
+
+def _face_geometry(vertices, faces):
+    # edge vectors opposite to every corner, counter-clockwise
+    p = vertices[faces]
+    edges = np.stack([p[:, 2] - p[:, 1], p[:, 0] - p[:, 2],
+                      p[:, 1] - p[:, 0]], axis=1)
+    normals = np.cross(edges[:, 0], edges[:, 1])
+    double_areas = np.sqrt((normals ** 2).sum(axis=1))
+    # cotangents of the corner angles
+    dots = np.stack([-(edges[:, 1] * edges[:, 2]).sum(axis=1),
+                     -(edges[:, 2] * edges[:, 0]).sum(axis=1),
+                     -(edges[:, 0] * edges[:, 1]).sum(axis=1)], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cots = dots / double_areas[:, None]
+        normals = normals / double_areas[:, None]
+    cots[~np.isfinite(cots)] = 0.0
+    normals[~np.isfinite(normals)] = 0.0
+    return edges, normals, double_areas, cots
+
+
+def cotan_laplacian(vertices, faces, cots=None):
+    """
+    Return the (negative semi-definite) cotan Laplacian as a CSC matrix,
+    ``(L u)_i = 1/2 sum (cot a + cot b)(u_j - u_i)``.
+    """
+    if cots is None:
+        cots = _face_geometry(vertices, faces)[3]
+    n = len(vertices)
+    # the corner k is opposite to the edge (k + 1, k + 2)
+    i = faces[:, [1, 2, 0]].ravel()
+    j = faces[:, [2, 0, 1]].ravel()
+    w = 0.5 * cots.ravel()
+    off = sp.coo_matrix((np.r_[w, w], (np.r_[i, j], np.r_[j, i])),
+                        shape=(n, n)).tocsc()
+    return (off - sp.diags(np.asarray(off.sum(axis=1)).ravel())).tocsc()
+
+
+def mass_matrix(vertices, faces, double_areas=None):
+    """Return the lumped (barycentric) mass matrix as a CSC matrix."""
+    if double_areas is None:
+        double_areas = _face_geometry(vertices, faces)[2]
+    areas = np.bincount(faces.ravel(), weights=np.repeat(double_areas / 6.0,
+                                                         3),
+                        minlength=len(vertices))
+    return sp.diags(areas).tocsc()
+
+
+class _Factor(object):
+    """Sparse factorization of a symmetric positive definite matrix."""
+
+    def __init__(self, matrix):
+        matrix = matrix.tocsc()
+        if cholesky is not None:
+            self._factor = cholesky(matrix)
+            self.solve = self._factor
+            nnz = self._factor.L().nnz
+            self.nbytes = nnz * 12 + matrix.shape[0] * 8
+        else:
+            # symmetric positive definite: no pivoting, symmetric ordering
+            self._factor = splu(matrix, permc_spec='MMD_AT_PLUS_A',
+                                diag_pivot_thresh=0.0,
+                                options=dict(SymmetricMode=True))
+            self.solve = self._factor.solve
+            nnz = self._factor.L.nnz + self._factor.U.nnz
+            self.nbytes = nnz * 12 + matrix.shape[0] * 16
+
+
+def _matrix_bytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+# SOLVER -----------------------------------------------------------------------
+
+class HeatSolver(object):
+    """
+    Heat method solver of one mesh, the factorizations are computed on first
+    use.
+
+    Args:
+        vertices: Array of shape (n, 3) of the mesh vertices
+        faces: Array of shape (m, 3) of the vertex indices of the triangles
+        t: Time step of the heat diffusion, defaults to the squared mean
+           edge length
+    """
+
+    def __init__(self, vertices, faces, t=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+        self.faces = np.ascontiguousarray(faces, dtype=np.int64)
+        edges, normals, double_areas, cots = _face_geometry(self.vertices,
+                                                            self.faces)
+        self._edges = edges
+        self._normals = normals
+        self._double_areas = double_areas
+        self._cots = cots
+        self.L = cotan_laplacian(self.vertices, self.faces, cots)
+        self.M = mass_matrix(self.vertices, self.faces, double_areas)
+        if t is None:
+            lengths = np.sqrt((edges ** 2).sum(axis=2))
+            t = float(lengths.mean()) ** 2
+        self.t = t
+        self._heat = None
+        self._poisson = None
+
+    @property
+    def factorized(self):
+        """True if both systems have been factorized."""
+        return self._heat is not None and self._poisson is not None
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the matrices and factorizations."""
+        size = _matrix_bytes(self.L) + _matrix_bytes(self.M)
+        size += self._edges.nbytes + self._normals.nbytes
+        size += self._double_areas.nbytes + self._cots.nbytes
+        for factor in (self._heat, self._poisson):
+            if factor is not None:
+                size += factor.nbytes
+        return size
+
+    def factorize(self):
+        """Factorize both systems (if not done yet)."""
+        if self._heat is None:
+            self._heat = _Factor(self.M - self.t * self.L)
+        if self._poisson is None:
+            # L is singular, a tiny (scale independent) mass shift makes it
+            # definite without changing the distances noticeably
+            diag_l = -self.L.diagonal().mean()
+            diag_m = self.M.diagonal().mean()
+            eps = 1e-8 * diag_l / max(diag_m, 1e-300)
+            self._poisson = _Factor(-self.L + eps * self.M)
+        return self
+
+    def _sources(self, sources):
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        if not len(sources):
+            raise ValueError('No source vertices given!')
+        if sources.min() < 0 or sources.max() >= len(self.vertices):
+            raise ValueError('Source vertex index out of range!')
+        return sources
+
+    def heat(self, sources):
+        """Return the diffused heat of the source vertices."""
+        self.factorize()
+        delta = np.zeros(len(self.vertices))
+        delta[self._sources(sources)] = 1.0
+        return self._heat.solve(delta)
+
+    def gradient(self, values):
+        """Return the gradient of per vertex values per face."""
+        grad = np.einsum('fk,fkc->fc', values[self.faces],
+                         np.cross(self._normals[:, None, :], self._edges))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            grad /= self._double_areas[:, None]
+        grad[~np.isfinite(grad)] = 0.0
+        return grad
+
+    def vertex_gradient(self, values):
+        """Return the area weighted mean of the face gradients per vertex."""
+        grad = self.gradient(values) * self._double_areas[:, None]
+        weights = np.bincount(self.faces.ravel(),
+                              weights=np.repeat(self._double_areas, 3),
+                              minlength=len(self.vertices))
+        out = np.stack([np.bincount(self.faces.ravel(),
+                                    weights=np.repeat(grad[:, c], 3),
+                                    minlength=len(self.vertices))
+                        for c in range(3)], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out /= weights[:, None]
+        out[~np.isfinite(out)] = 0.0
+        return out
+
+    def divergence(self, field):
+        """Return the integrated divergence of a per face vector field."""
+        edges, cots = self._edges, self._cots
+        # dot products of the field with the edges opposite to each corner
+        dots = (edges * field[:, None, :]).sum(axis=2)
+        # corner k: 1/2 (cot(k + 2) e(k + 2) . X - cot(k + 1) e(k + 1) . X)
+        contrib = 0.5 * (cots[:, [2, 0, 1]] * dots[:, [2, 0, 1]] -
+                         cots[:, [1, 2, 0]] * dots[:, [1, 2, 0]])
+        return np.bincount(self.faces.ravel(), weights=contrib.ravel(),
+                           minlength=len(self.vertices))
+
+    def distance(self, sources):
+        """
+        Return the geodesic distances of all vertices to the nearest of the
+        source vertices.
+        """
+        sources = self._sources(sources)
+        u = self.heat(sources)
+        grad = self.gradient(u)
+        norm = np.sqrt((grad ** 2).sum(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            field = -grad / norm[:, None]
+        field[~np.isfinite(field)] = 0.0
+        phi = self._poisson.solve(-self.divergence(field))
+        return phi - phi.min()
+
+    def scalar_field(self, hot, cold=None):
+        """
+        Return a scalar field like HeatMethodStatic, 1 at the ``hot`` and 0
+        at the ``cold`` vertices, normalized to [0, 1]. Without cold
+        vertices, the field decreases with the distance to the hot ones.
+        """
+        d_hot = self.distance(hot)
+        if cold is None or not len(np.atleast_1d(cold)):
+            values = -d_hot
+        else:
+            d_cold = self.distance(cold)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = d_cold / (d_hot + d_cold)
+            values[~np.isfinite(values)] = 0.5
+        lo, hi = values.min(), values.max()
+        return (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+
+
+# CACHE ------------------------------------------------------------------------
+
+class SolverCache(object):
+    """
+    Least recently used cache of heat solvers with a memory ceiling.
+
+    The most recently used solver is never evicted, even if it exceeds
+    ``max_bytes`` on its own.
+
+    Args:
+        max_entries: Maximum number of cached solvers
+        max_bytes: Maximum memory of all cached solvers (see
+                   ``HeatSolver.nbytes``)
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._solvers = OrderedDict()
+
+    def __len__(self):
+        return len(self._solvers)
+
+    def __contains__(self, key):
+        return key in self._solvers
+
+    @property
+    def nbytes(self):
+        return sum(s.nbytes for s in self._solvers.values())
+
+    def get(self, vertices, faces, t=None, key=None):
+        """
+        Return the factorized solver of a mesh, creating it on a miss.
+
+        Args:
+            key: Optional precomputed ``mesh_hash`` of the mesh
+        """
+        key = (key or mesh_hash(vertices, faces), t)
+        solver = self._solvers.get(key)
+        if solver is not None:
+            self.hits += 1
+            self._solvers.move_to_end(key)
+            return solver
+        self.misses += 1
+        solver = HeatSolver(vertices, faces, t).factorize()
+        self._solvers[key] = solver
+        self.evict()
+        return solver
+
+    def evict(self):
+        """Evict least recently used solvers until the limits are met."""
+        total = self.nbytes
+        while len(self._solvers) > 1 and (
+                len(self._solvers) > self.max_entries or
+                total > self.max_bytes):
+            key, solver = self._solvers.popitem(last=False)
+            total -= solver.nbytes
+            self.evictions += 1
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """Change the limits, evicting solvers if necessary."""
+        if max_entries:
+            self.max_entries = max_entries
+        if max_bytes:
+            self.max_bytes = max_bytes
+        self.evict()
+
+    def clear(self):
+        self._solvers.clear()
+
+    @property
+    def stats(self):
+        """Counters and sizes of the cache as a dict."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._solvers),
+            'megabytes': round(self.nbytes / 1e6, 1),
+        }
+
+
+def get_cache(store=None, max_entries=None, max_bytes=None):
+    """
+    Return the solver cache kept in ``store`` (i.e. the scriptcontext
+    sticky), creating it if necessary.
+    """
+    if store is None:
+        store = _DEFAULT_STORE
+    cache = store.get(STICKY_KEY, None)
+    if cache is None:
+        cache = SolverCache(max_entries or DEFAULT_MAX_ENTRIES,
+                            max_bytes or DEFAULT_MAX_BYTES)
+        store[STICKY_KEY] = cache
+    elif max_entries or max_bytes:
+        cache.resize(max_entries, max_bytes)
+    return cache
@@ -0,0 +1,286 @@
+"""
+Timing and profiling instrumentation for the slicer UserObjects.
+
+Usage in a component:
+
+    from ddu_clayslicer.instrumentation import timed
+
+    class MyComponent(Grasshopper.Kernel.GH_ScriptInstance):
+
+        @timed('MyComponent', store=st)
+        def RunScript(self, ...):
+            ...
+
+or for parts of a component:
+
+    with timer('MyComponent.trim', size=len(curves), store=st):
+        ...
+
+Every timed call appends a record (component, seconds, input size, ...) to a
+``MetricsBuffer`` ring buffer which is kept in ``store`` (i.e. the
+scriptcontext sticky), so all components of a Rhino session share it.
+Optionally every ``timed`` call is run under ``cProfile``.
+
+Instrumentation is disabled by default. While disabled, ``timer`` returns a
+shared no-op context manager and ``timed`` calls the wrapped function
+directly after a single flag check, so nothing is recorded or allocated.
+
+This module does not depend on Rhino or Grasshopper.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import cProfile
+import csv
+import functools
+import io
+import json
+import pstats
+import time
+from collections import deque
+
+# key of the metrics buffer in the store (i.e. the scriptcontext sticky)
+STICKY_KEY = 'ddu_clayslicer___METRICS'
+# default number of records kept in the ring buffer
+DEFAULT_CAPACITY = 10000
+# number of functions kept in the profile summary of a record
+PROFILE_LINES = 25
+
+# record fields, in CSV column order
+FIELDS = ('timestamp', 'component', 'seconds', 'size', 'profile')
+
+# module wide settings, shared by all components of a session
+_ENABLED = False
+_PROFILE = False
+
+# fallback store if no store is supplied
+_DEFAULT_STORE = {}
+
+
+def enable(profile=False):
+    """Enable timing (and optionally cProfile capture of timed calls)."""
+    global _ENABLED, _PROFILE
+    _ENABLED = True
+    _PROFILE = bool(profile)
+
+
+def disable():
+    """Disable all instrumentation."""
+    global _ENABLED, _PROFILE
+    _ENABLED = False
+    _PROFILE = False
+
+
+def is_enabled():
+    return _ENABLED
+
+
+def is_profiling():
+    return _ENABLED and _PROFILE
+
+
+class MetricsBuffer(object):
+    """
+    Ring buffer of metrics records. Every record is a dict with the keys of
+    ``FIELDS``.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.records = deque(maxlen=capacity)
+
+    @property
+    def capacity(self):
+        return self.records.maxlen
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the most recent records."""
+        if capacity != self.records.maxlen:
+            self.records = deque(self.records, maxlen=capacity)
+
+    def add(self, component, seconds, size=None, profile=''):
+        self.records.append({
+            'timestamp': time.time(),
+            'component': component,
+            'seconds': seconds,
+            'size': size,
+            'profile': profile,
+        })
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(list(self.records))
+
+    def summary(self):
+        """
+        Aggregate the records per component.
+
+        Returns:
+            list: [{'component', 'calls', 'total_s', 'mean_s', 'max_s',
+                    'mean_size'}] sorted by descending total time
+        """
+        groups = {}
+        for rec in self.records:
+            groups.setdefault(rec['component'], []).append(rec)
+        rows = []
+        for component, recs in groups.items():
+            seconds = [r['seconds'] for r in recs]
+            sizes = [r['size'] for r in recs if r['size'] is not None]
+            rows.append({
+                'component': component,
+                'calls': len(recs),
+                'total_s': sum(seconds),
+                'mean_s': sum(seconds) / len(seconds),
+                'max_s': max(seconds),
+                'mean_size': sum(sizes) / len(sizes) if sizes else None,
+            })
+        rows.sort(key=lambda r: r['total_s'], reverse=True)
+        return rows
+
+
+def get_buffer(store=None, capacity=None):
+    """
+    Return the metrics buffer kept in ``store`` (i.e. the scriptcontext
+    sticky), creating it if necessary.
+    """
+    if store is None:
+        store = _DEFAULT_STORE
+    buf = store.get(STICKY_KEY, None)
+    if buf is None:
+        buf = MetricsBuffer(capacity or DEFAULT_CAPACITY)
+        store[STICKY_KEY] = buf
+    elif capacity:
+        buf.resize(capacity)
+    return buf
+
+
+def input_size(args):
+    """
+    Estimate the input size of a call as the total number of items of all
+    collection arguments (DataTrees are counted by their ``DataCount``).
+    """
+    size = 0
+    for arg in args:
+        if arg is None or isinstance(arg, (str, bytes)):
+            continue
+        count = getattr(arg, 'DataCount', None)
+        if count is not None:
+            size += count
+            continue
+        try:
+            size += len(arg)
+        except TypeError:
+            pass
+    return size
+
+
+class _NullTimer(object):
+    """No-op timer returned while instrumentation is disabled."""
+
+    seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer(object):
+
+    def __init__(self, component, size, store):
+        self.component = component
+        self.size = size
+        self.store = store
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.seconds = time.perf_counter() - self._t0
+        get_buffer(self.store).add(self.component, self.seconds, self.size)
+        return False
+
+
+def timer(component, size=None, store=None):
+    """
+    Context manager timing a block of code and recording it under
+    ``component``.
+    """
+    if not _ENABLED:
+        return _NULL_TIMER
+    return _Timer(component, size, store)
+
+
+def _profile_text(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+def timed(component=None, size=input_size, store=None):
+    """
+    Decorator timing every call of a function (i.e. ``RunScript``) and
+    recording it under ``component`` (defaults to the qualified function
+    name). ``size`` is called with the positional arguments (without
+    ``self`` for methods) to compute the input size of the call.
+    """
+    def decorator(func):
+        name = component or func.__qualname__
+        is_method = func.__qualname__ != func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            profile = ''
+            t0 = time.perf_counter()
+            if _PROFILE:
+                profiler = cProfile.Profile()
+                try:
+                    result = profiler.runcall(func, *args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - t0
+                    profile = _profile_text(profiler)
+            else:
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - t0
+            count = None
+            if size is not None:
+                count = size(args[1:] if is_method else args)
+            get_buffer(store).add(name, seconds, count, profile)
+            return result
+        return wrapper
+    return decorator
+
+
+# EXPORT -----------------------------------------------------------------------
+
+def dump_csv(records, path):
+    """Write metrics records to a CSV file."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for rec in records:
+            writer.writerow(rec)
+
+
+def dump_json(records, path):
+    """Write metrics records to a JSON file."""
+    with open(path, 'w') as f:
+        json.dump(list(records), f, indent=2)
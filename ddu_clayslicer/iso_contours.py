@@ -0,0 +1,94 @@
+"""
+Headless multi-level iso-contours of per-vertex scalar fields.
+
+Extracts the level sets of a scalar field given per mesh vertex (e.g. the
+values of the heat method or any other texture coordinate used by
+IsoContourMeshCount) for many levels in one vectorized sweep over the
+faces, using the same engine as the planar slicer:
+
+    1. Every face is assigned the range of levels between its smallest and
+       largest vertex value (a binary search on the sorted levels), so no
+       face/level pair outside the value range of a face is created.
+    2. All face/level pairs are intersected at once and the segments are
+       chained into polylines by their exact (level, mesh edge) keys.
+
+Segments are oriented consistently along the cross product of the field
+gradient and the face normal, for ``values`` equal to the vertex heights of
+a closed outward facing mesh the outer contours are counter-clockwise seen
+from above. ``ensure_ccw`` orients all closed contours counter-clockwise
+with respect to a plane normal like CrvEnsureCCW.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# LOCAL IMPORTS
+from .planar_slicer import SliceResult, slice_mesh
+
+
+def iso_levels(values, count):
+    """
+    Return the levels of ``count`` evenly spaced contours over the range of
+    ``values`` like IsoContourMeshCount, without the minimum and maximum
+    (which only touch the mesh), i.e. ``count - 2`` interior levels.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if count < 3 or not len(values):
+        return np.zeros(0)
+    vmin = float(values.min())
+    step = (float(values.max()) - vmin) / (count - 1)
+    return vmin + step * np.arange(1, count - 1)
+
+
+def ensure_ccw(result, normal=(0.0, 0.0, 1.0)):
+    """
+    Return a copy of the result with all clockwise closed polylines (with
+    respect to a plane with ``normal``) reversed. Reversed polylines keep
+    their first point, so seams are not moved. Open polylines are left
+    unchanged.
+
+    Returns:
+        tuple: (result, reversed) the oriented SliceResult and a boolean
+               array which is True for every reversed polyline
+    """
+    flip = result.closed & (result.signed_areas(normal) < 0.0)
+    counts = np.diff(result.offsets)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    start = result.offsets[:-1][owner]
+    local = np.arange(len(result.points)) - start
+    # point k of a reversed polyline with n points is its point (n - k) % n
+    index = np.where(flip[owner],
+                     start + (counts[owner] - local) % np.maximum(
+                         counts[owner], 1),
+                     start + local)
+    oriented = SliceResult(result.points[index], result.offsets.copy(),
+                           result.planes.copy(), result.closed.copy(),
+                           result.heights)
+    return oriented, flip
+
+
+def iso_contours(vertices, faces, values, levels, normal=None):
+    """
+    Extract the iso-contours of a per-vertex scalar field.
+
+    Args:
+        vertices: Array of shape (n, 3) of the mesh vertices
+        faces: Array of shape (m, 3) of the vertex indices of the triangles
+        values: Array of shape (n,) of the field value of every vertex
+        levels: Sorted levels (see ``iso_levels``)
+        normal: If given, closed contours are oriented counter-clockwise
+                with respect to a plane with this normal (see
+                ``ensure_ccw``)
+
+    Returns:
+        SliceResult: Polylines grouped by level, ``planes`` holds the level
+                     index and ``heights`` the levels of the polylines
+    """
+    result = slice_mesh(vertices, faces, levels, values=values)
+    if normal is not None:
+        result = ensure_ccw(result, normal)[0]
+    return result
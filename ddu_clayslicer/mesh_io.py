@@ -0,0 +1,260 @@
+"""
+Minimal triangle mesh readers for headless slicing.
+
+Reads OBJ, STL (ASCII and binary) and PLY (ASCII and binary) files into
+NumPy vertex and face arrays. Polygons are triangulated as fans. Vertices of
+STL files (which store every triangle with its own corners) are welded by
+exact coordinates, so the faces share their vertex indices like the faces of
+the other formats (the planar slicer chains its segments using them).
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import os
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# supported file extensions
+MESH_EXTENSIONS = ('.obj', '.stl', '.ply')
+
+# PLY property types
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+def _fan(polygons):
+    """Triangulate a list of vertex index lists as fans."""
+    tris = []
+    for poly in polygons:
+        for i in range(1, len(poly) - 1):
+            tris.append((poly[0], poly[i], poly[i + 1]))
+    return np.array(tris, dtype=np.int64).reshape(-1, 3)
+
+
+def weld_vertices(vertices, faces):
+    """
+    Merge vertices with identical coordinates and return the new vertices
+    and faces.
+    """
+    # sorting the columns is much faster than np.unique(..., axis=0)
+    order = np.lexsort(vertices.T[::-1])
+    ordered = vertices[order]
+    new = np.ones(len(ordered), dtype=bool)
+    new[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+    inverse = np.empty(len(vertices), dtype=np.int64)
+    inverse[order] = np.cumsum(new) - 1
+    return ordered[new], inverse[faces]
+
+
+def remove_degenerate_faces(faces):
+    """Remove faces which reference the same vertex more than once."""
+    ok = ((faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) &
+          (faces[:, 2] != faces[:, 0]))
+    return faces[ok]
+
+
+# OBJ --------------------------------------------------------------------------
+
+def read_obj(path):
+    """Read the vertices and (triangulated) faces of an OBJ file."""
+    vertices = []
+    polygons = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith('v '):
+                vertices.append([float(v) for v in line.split()[1:4]])
+            elif line.startswith('f '):
+                # v, v/vt, v//vn or v/vt/vn, negative indices are relative
+                idx = [int(w.split('/')[0]) for w in line.split()[1:]]
+                count = len(vertices)
+                polygons.append([i - 1 if i > 0 else count + i for i in idx])
+    return (np.array(vertices, dtype=np.float64).reshape(-1, 3),
+            _fan(polygons))
+
+
+# STL --------------------------------------------------------------------------
+
+def _is_binary_stl(path):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(84)
+    if len(head) < 84:
+        return False
+    count = int(np.frombuffer(head[80:84], dtype='<u4')[0])
+    # ASCII files may start with 'solid' too, the size is decisive
+    return size == 84 + 50 * count
+
+
+def read_stl(path):
+    """Read an ASCII or binary STL file, welding identical vertices."""
+    if _is_binary_stl(path):
+        dtype = np.dtype([('normal', '<f4', 3), ('corners', '<f4', (3, 3)),
+                          ('attributes', '<u2')])
+        data = np.fromfile(path, dtype=dtype, offset=84)
+        corners = data['corners'].astype(np.float64).reshape(-1, 3)
+    else:
+        corners = []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                words = line.split()
+                if words and words[0] == 'vertex':
+                    corners.append([float(v) for v in words[1:4]])
+        corners = np.array(corners, dtype=np.float64).reshape(-1, 3)
+    faces = np.arange(len(corners) - len(corners) % 3).reshape(-1, 3)
+    vertices, faces = weld_vertices(corners, faces)
+    return vertices, remove_degenerate_faces(faces)
+
+
+# PLY --------------------------------------------------------------------------
+
+def _read_ply_header(f):
+    if f.readline().strip() != b'ply':
+        raise ValueError('Not a PLY file!')
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError('Unexpected end of PLY header!')
+        words = line.decode('ascii', 'replace').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            break
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            if words[1] == 'list':
+                prop = (words[4], _PLY_TYPES[words[2]], _PLY_TYPES[words[3]])
+            else:
+                prop = (words[2], _PLY_TYPES[words[1]], None)
+            elements[-1][2].append(prop)
+    return fmt, elements
+
+
+def read_ply(path):
+    """Read the vertices and (triangulated) faces of a PLY file."""
+    with open(path, 'rb') as f:
+        fmt, elements = _read_ply_header(f)
+        if fmt == 'ascii':
+            tokens = iter(f.read().split())
+            data = None
+        elif fmt in ('binary_little_endian', 'binary_big_endian'):
+            order = '<' if fmt == 'binary_little_endian' else '>'
+            data = f.read()
+            offset = 0
+        else:
+            raise ValueError('Unsupported PLY format "{0}"!'.format(fmt))
+
+    vertices = np.zeros((0, 3))
+    faces = np.zeros((0, 3), dtype=np.int64)
+    for name, count, props in elements:
+        if data is None:
+            rows = [_read_ply_ascii_row(tokens, props) for _ in range(count)]
+            if name == 'vertex':
+                cols = [p[0] for p in props]
+                vertices = np.array(
+                    [[r[cols.index(ax)] for ax in 'xyz'] for r in rows],
+                    dtype=np.float64).reshape(-1, 3)
+            elif name == 'face':
+                key = [i for i, p in enumerate(props) if p[2] is not None][0]
+                faces = _fan([r[key] for r in rows])
+            continue
+        rows, offset = _read_ply_binary(data, offset, order, count, props)
+        if name == 'vertex':
+            vertices = np.stack([rows[ax].astype(np.float64)
+                                 for ax in 'xyz'], axis=1)
+        elif name == 'face':
+            key = [p[0] for p in props if p[2] is not None][0]
+            faces = rows[key]
+            if not isinstance(faces, np.ndarray):
+                faces = _fan(faces)
+    return vertices, faces
+
+
+def _read_ply_ascii_row(tokens, props):
+    row = []
+    for pname, ptype, itype in props:
+        if itype is None:
+            row.append(float(next(tokens)))
+        else:
+            n = int(next(tokens))
+            row.append([int(next(tokens)) for _ in range(n)])
+    return row
+
+
+def _read_ply_binary(data, offset, order, count, props):
+    """
+    Read ``count`` rows of a binary PLY element starting at ``offset``.
+
+    Returns:
+        tuple: (columns, offset) the property arrays (list properties of
+               triangles as (count, 3) arrays, otherwise lists of lists) and
+               the offset after the element
+    """
+    if all(p[2] is None for p in props):
+        dtype = np.dtype([(p[0], order + p[1]) for p in props])
+        rows = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        return rows, offset + dtype.itemsize * count
+    # fast path: all lists hold three items, i.e. triangle faces
+    fields = []
+    for pname, ptype, itype in props:
+        if itype is None:
+            fields.append((pname, order + ptype))
+        else:
+            fields.append((pname + '__count', order + ptype))
+            fields.append((pname, order + itype, 3))
+    dtype = np.dtype(fields)
+    if len(data) - offset >= dtype.itemsize * count:
+        rows = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        if all((rows[p[0] + '__count'] == 3).all()
+               for p in props if p[2] is not None):
+            columns = dict((p[0], rows[p[0]].astype(np.int64)
+                            if p[2] is not None else rows[p[0]])
+                           for p in props)
+            return columns, offset + dtype.itemsize * count
+    # general polygons are read row by row
+    columns = dict((p[0], []) for p in props)
+    for _ in range(count):
+        for pname, ptype, itype in props:
+            size = np.dtype(ptype).itemsize
+            value = np.frombuffer(data, dtype=order + ptype, count=1,
+                                  offset=offset)[0]
+            offset += size
+            if itype is not None:
+                isize = np.dtype(itype).itemsize
+                value = np.frombuffer(data, dtype=order + itype,
+                                      count=int(value), offset=offset)
+                offset += isize * len(value)
+                value = value.tolist()
+            columns[pname].append(value)
+    return columns, offset
+
+
+# DISPATCH ---------------------------------------------------------------------
+
+def read_mesh(path):
+    """
+    Read a mesh file (by its extension) into vertex and face arrays.
+
+    Returns:
+        tuple: (vertices, faces) arrays of shape (n, 3) and (m, 3)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.obj':
+        return read_obj(path)
+    if ext == '.stl':
+        return read_stl(path)
+    if ext == '.ply':
+        return read_ply(path)
+    raise ValueError('Unsupported mesh format "{0}"!'.format(ext))
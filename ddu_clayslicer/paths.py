@@ -0,0 +1,40 @@
+"""
+Path resolution of the file inputs of the UserObjects.
+
+Relative paths are resolved against the folder of the Grasshopper
+definition (like the initial folder of the SaveGCODE file dialog) instead
+of the working directory of Rhino, so definitions can reference files next
+to them.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import os
+
+
+def resolve_path(path, document_path):
+    """
+    Resolve a file path relative to the folder of a Grasshopper definition.
+
+    Args:
+        path: Absolute path or path relative to the definition folder
+        document_path: File path of the definition, None or empty if the
+                       definition has not been saved yet
+
+    Returns:
+        str: The normalized absolute path
+
+    Raises:
+        ValueError: If ``path`` is relative and the definition has not been
+                    saved yet
+    """
+    if os.path.isabs(path):
+        return os.path.normpath(path)
+    if not document_path:
+        raise ValueError('Relative Path requires a saved Grasshopper '
+                         'definition!')
+    return os.path.normpath(os.path.join(os.path.dirname(document_path),
+                                         path))
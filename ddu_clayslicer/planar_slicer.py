@@ -0,0 +1,385 @@
+"""
+Headless planar slicing of triangle meshes.
+
+Slices a mesh given as vertex and face arrays with many horizontal planes
+in one vectorized sweep:
+
+    1. Every face is assigned the range of planes its z-range crosses
+       (using a binary search on the sorted plane heights), so each plane
+       only tests its candidate faces and no plane/face pair outside the
+       z-range of a face is ever created.
+    2. All face/plane pairs are intersected at once. Vertices lying exactly
+       on a plane count as above it, so every crossing face yields exactly
+       one segment between two of its edges, oriented so that closed
+       outward-facing meshes produce counter-clockwise outer contours (seen
+       from above), like CrvEnsureCCW.
+    3. Segment endpoints are keyed by their (plane, mesh edge) pair instead
+       of their coordinates. The keys are exact, so segments are joined
+       into polylines by matching end keys to start keys without any
+       tolerance. Chains are then ordered using pointer jumping.
+
+
+Open meshes produce open polylines where a contour leaves the mesh.
+
+The same sweep extracts the level sets of any per-vertex scalar field when
+``values`` are passed instead of using the vertex heights (see
+``iso_contours``), the planes are then levels of the field.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+
+class SliceResult(object):
+    """
+    Polylines of a sliced mesh in a CSR layout.
+
+    Polyline ``i`` consists of the points ``points[offsets[i]:offsets[i +
+    1]]`` and lies on the plane ``planes[i]`` at the height
+    ``heights[planes[i]]``. Closed polylines do not repeat their first
+    point.
+
+    Args:
+        points: Array of shape (n, 3) of all polyline points
+        offsets: CSR offsets of the polylines
+        planes: Plane index of every polyline
+        closed: Boolean array, True for closed polylines
+        heights: Heights of all planes
+    """
+
+    def __init__(self, points, offsets, planes, closed, heights):
+        self.points = points
+        self.offsets = offsets
+        self.planes = planes
+        self.closed = closed
+        self.heights = heights
+
+    def __len__(self):
+        return len(self.planes)
+
+    def __repr__(self):
+        return 'SliceResult({0} polylines on {1} planes, {2} points)'.format(
+            len(self), len(self.heights), len(self.points))
+
+    def polyline(self, index):
+        """Return the points of polyline ``index``."""
+        return self.points[self.offsets[index]:self.offsets[index + 1]]
+
+    def plane_polylines(self, plane):
+        """Return the indices of all polylines of ``plane``."""
+        return np.flatnonzero(self.planes == plane)
+
+    def signed_areas(self, normal=None):
+        """
+        Signed areas of all polylines projected to the XY plane, positive
+        for counter-clockwise polylines. With a ``normal`` the (Newell)
+        areas are measured in the plane with this normal instead.
+        """
+        points = self.points
+        counts = np.diff(self.offsets)
+        # the next point of every point, wrapping around per polyline
+        nxt = np.arange(1, len(points) + 1)
+        nxt[self.offsets[1:][counts > 0] - 1] = self.offsets[:-1][counts > 0]
+        if normal is None:
+            cross = (points[:, 0] * points[nxt, 1] -
+                     points[nxt, 0] * points[:, 1])
+        else:
+            normal = np.asarray(normal, dtype=np.float64)
+            cross = np.cross(points, points[nxt]).dot(
+                normal / np.linalg.norm(normal))
+        polyline = np.repeat(np.arange(len(counts)), counts)
+        return 0.5 * np.bincount(polyline, weights=cross,
+                                 minlength=len(counts))
+
+
+def layer_heights(vertices, layer_height, first=None):
+    """
+    Return the plane heights of layers with ``layer_height`` over the z-range
+    of the vertices, the first plane is at ``first`` (defaults to half a
+    layer above the lowest vertex).
+    """
+    z = np.asarray(vertices, dtype=np.float64)[:, 2]
+    if not len(z):
+        return np.zeros(0)
+    zmin = float(z.min())
+    first = zmin + 0.5 * layer_height if first is None else first
+    count = int(np.floor((float(z.max()) - first) / layer_height)) + 1
+    return first + layer_height * np.arange(max(count, 0))
+
+
+# SWEEP ------------------------------------------------------------------------
+
+def face_plane_pairs(vertices, faces, heights, values=None):
+    """
+    Return all (face, plane) pairs where the plane lies within the z-range
+    (or the range of the per-vertex ``values``) of the face.
+
+    Returns:
+        tuple: (face_indices, plane_indices) arrays, grouped by plane
+    """
+    heights = np.asarray(heights, dtype=np.float64)
+    fz = (vertices[:, 2] if values is None else values)[faces]
+    zmin = fz.min(axis=1)
+    zmax = fz.max(axis=1)
+    # plane range of every face, vertices on a plane count as above it so a
+    # face crosses the planes with zmin < height <= zmax
+    lo = np.searchsorted(heights, zmin, side='right')
+    hi = np.searchsorted(heights, zmax, side='right')
+    counts = np.maximum(hi - lo, 0)
+    # sorting the faces by their first plane groups all pairs by plane
+    order = np.argsort(lo, kind='stable')
+    order = order[counts[order] > 0]
+    counts = counts[order]
+    total = int(counts.sum())
+    face_idx = np.repeat(order, counts)
+    # plane index: first plane of the face plus the position in its range
+    starts = np.cumsum(counts) - counts
+    plane_idx = (np.repeat(lo[order] - starts, counts) +
+                 np.arange(total, dtype=np.int64))
+    plane_order = np.argsort(plane_idx, kind='stable')
+    return face_idx[plane_order], plane_idx[plane_order]
+
+
+def intersect_pairs(vertices, faces, heights, face_idx, plane_idx,
+                    values=None):
+    """
+    Intersect face/plane pairs (or face/level pairs of the per-vertex
+    ``values``).
+
+    Returns:
+        tuple: (keep, start_edges, end_edges, start_points) where ``keep``
+               selects the pairs which produce a segment, the edges are
+               given as (n, 2) arrays of sorted vertex indices and the start
+               points are the intersections with the start edges
+    """
+    tri = faces[face_idx]
+    field = vertices[:, 2] if values is None else values
+    d = field[tri] - heights[plane_idx][:, None]
+    above = d >= 0.0
+    # a face crosses the plane if its vertices are on both sides
+    count = above.sum(axis=1)
+    keep = (count == 1) | (count == 2)
+    tri = tri[keep]
+    above = above[keep]
+    single_above = count[keep] == 1
+    # the odd vertex is the one on its own side of the plane
+    odd = np.where(single_above, np.argmax(above, axis=1),
+                   np.argmin(above, axis=1))
+    prev = (odd + 2) % 3
+    nxt = (odd + 1) % 3
+    rows = np.arange(len(tri))
+    v_odd = tri[rows, odd]
+    v_prev = tri[rows, prev]
+    v_next = tri[rows, nxt]
+    # the segment runs from the edge (odd, next) to the edge (prev, odd) if
+    # the odd vertex is above the plane, the other way round if it is below
+    a = np.where(single_above, v_next, v_prev)
+    b = np.where(single_above, v_prev, v_next)
+    start_edges = np.sort(np.stack([a, v_odd], axis=1), axis=1)
+    end_edges = np.sort(np.stack([v_odd, b], axis=1), axis=1)
+    start_points = _edge_points(vertices, start_edges,
+                                heights[plane_idx[keep]], values)
+    return keep, start_edges, end_edges, start_points
+
+
+def _edge_points(vertices, edges, heights, values=None):
+    # intersections along the canonical (sorted) edge direction, so both
+    # faces of an edge compute bitwise identical points
+    p0 = vertices[edges[:, 0]]
+    p1 = vertices[edges[:, 1]]
+    field = vertices[:, 2] if values is None else values
+    f0 = field[edges[:, 0]]
+    dz = field[edges[:, 1]] - f0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(dz != 0.0, (heights - f0) / dz, 0.0)
+    points = p0 + (p1 - p0) * t[:, None]
+    if values is None:
+        points[:, 2] = heights
+    return points
+
+
+# CHAINING ---------------------------------------------------------------------
+
+def _endpoint_keys(plane_idx, start_edges, end_edges, vertex_count):
+    # exact integer keys of the (plane, edge) pairs of all endpoints
+    v = np.int64(vertex_count)
+    start = start_edges[:, 0] * v + start_edges[:, 1]
+    end = end_edges[:, 0] * v + end_edges[:, 1]
+    planes = int(plane_idx.max()) + 1 if len(plane_idx) else 1
+    if planes * vertex_count * vertex_count < 2 ** 62:
+        scale = v * v
+    else:
+        # renumber the edges so the combined key does not overflow
+        edges, inverse = np.unique(np.concatenate([start, end]),
+                                   return_inverse=True)
+        start, end = np.split(inverse.ravel(), 2)
+        scale = np.int64(len(edges))
+    return plane_idx * scale + start, plane_idx * scale + end
+
+
+def join_segments(start_keys, end_keys):
+    """
+    Find the successor of every segment, the segment whose start key equals
+    its end key (-1 if there is none).
+    """
+    if not len(start_keys):
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(start_keys, kind='stable')
+    sorted_keys = start_keys[order]
+    pos = np.searchsorted(sorted_keys, end_keys)
+    pos = np.minimum(pos, len(sorted_keys) - 1)
+    found = sorted_keys[pos] == end_keys
+    return np.where(found, order[pos], -1)
+
+
+def order_chains(successor):
+    """
+    Order segments into chains following their successors.
+
+    Returns:
+        tuple: (order, offsets, closed) the segment indices of all chains
+               in order, the CSR offsets of the chains and their closed
+               flags
+    """
+    n = len(successor)
+    idx = np.arange(n)
+    succ = np.asarray(successor).copy()
+    # find the cycles using pointer jumping: every segment collects the
+    # smallest index within 2^k steps and whether it reaches an open end
+    nxt = np.where(succ >= 0, succ, idx)
+    lowest = idx.copy()
+    open_end = succ < 0
+    while True:
+        new_lowest = np.minimum(lowest, lowest[nxt])
+        new_open = open_end | open_end[nxt]
+        nxt = nxt[nxt]
+        if (np.array_equal(new_lowest, lowest) and
+                np.array_equal(new_open, open_end)):
+            break
+        lowest, open_end = new_lowest, new_open
+    # break every cycle in front of its lowest segment
+    breaks = ~open_end & (succ == lowest)
+    succ[breaks] = -1
+    # list ranking: distance of every segment to the end of its chain
+    nxt = np.where(succ >= 0, succ, idx)
+    dist = (succ >= 0).astype(np.int64)
+    while True:
+        nn = nxt[nxt]
+        if np.array_equal(nn, nxt):
+            break
+        dist += dist[nxt]
+        nxt = nn
+    # nxt is now the last segment of every chain, which identifies it
+    order = np.lexsort((-dist, nxt))
+    tails = nxt[order]
+    first = np.flatnonzero(np.r_[True, tails[1:] != tails[:-1]]) if n else \
+        np.zeros(0, dtype=np.int64)
+    offsets = np.r_[first, n].astype(np.int64)
+    closed = breaks[tails[first]]
+    return order, offsets, closed
+
+
+# SLICING ----------------------------------------------------------------------
+
+def slice_mesh(vertices, faces, heights, values=None):
+    """
+    Slice a triangle mesh with horizontal planes.
+
+    Args:
+        vertices: Array of shape (n, 3) of the mesh vertices
+        faces: Array of shape (m, 3) of the vertex indices of the triangles
+        heights: Sorted plane heights (see ``layer_heights``)
+        values: Optional per-vertex scalar field, if given its level sets
+                at the (sorted) levels ``heights`` are extracted instead
+
+    Planes passing exactly through mesh vertices can produce repeated
+    points, planes through horizontal faces degenerate polylines.
+
+    Returns:
+        SliceResult: Polylines grouped by plane
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+    faces = np.ascontiguousarray(faces, dtype=np.int64).reshape(-1, 3)
+    heights = np.ascontiguousarray(heights, dtype=np.float64).ravel()
+    if len(heights) > 1 and np.any(np.diff(heights) < 0):
+        raise ValueError('Plane heights have to be sorted!')
+    if values is not None:
+        values = np.ascontiguousarray(values, dtype=np.float64).ravel()
+        if len(values) != len(vertices):
+            raise ValueError('Expected one value per vertex!')
+
+    face_idx, plane_idx = face_plane_pairs(vertices, faces, heights, values)
+    keep, start_edges, end_edges, points = intersect_pairs(
+        vertices, faces, heights, face_idx, plane_idx, values)
+    plane_idx = plane_idx[keep]
+    start_keys, end_keys = _endpoint_keys(plane_idx, start_edges, end_edges,
+                                          len(vertices))
+    order, offsets, closed = order_chains(join_segments(start_keys,
+                                                        end_keys))
+    points = points[order]
+    planes = plane_idx[order[offsets[:-1]]]
+
+    # open chains also need the end point of their last segment
+    if not closed.all():
+        ends = order[offsets[1:][~closed] - 1]
+        end_points = _edge_points(vertices, end_edges[ends],
+                                  heights[plane_idx[ends]], values)
+        points = np.insert(points, offsets[1:][~closed], end_points, axis=0)
+        offsets = offsets + np.r_[0, np.cumsum(~closed)]
+
+    return SliceResult(points, offsets, planes, closed, heights)
+
+
+# REFERENCE --------------------------------------------------------------------
+
+def reference_slice(vertices, faces, heights):
+    """
+    Pure Python reference of ``slice_mesh``, intersecting every face with
+    every plane and chaining the segments using a dictionary.
+
+    Returns:
+        list: (plane, points, closed) tuples, ordered by plane
+    """
+    vertices = [tuple(float(c) for c in v) for v in vertices]
+    faces = [tuple(int(i) for i in f) for f in faces]
+    result = []
+    for plane, h in enumerate(heights):
+        h = float(h)
+        segments = {}
+        for f in faces:
+            above = [vertices[i][2] - h >= 0.0 for i in f]
+            count = sum(above)
+            if count == 0 or count == 3:
+                continue
+            odd = above.index(True) if count == 1 else above.index(False)
+            v_odd, v_prev, v_next = f[odd], f[(odd + 2) % 3], f[(odd + 1) % 3]
+            a, b = (v_next, v_prev) if count == 1 else (v_prev, v_next)
+            start = (min(a, v_odd), max(a, v_odd))
+            segments[start] = (min(v_odd, b), max(v_odd, b))
+
+        def point(edge):
+            p0, p1 = vertices[edge[0]], vertices[edge[1]]
+            dz = p1[2] - p0[2]
+            t = (h - p0[2]) / dz if dz != 0.0 else 0.0
+            return (p0[0] + (p1[0] - p0[0]) * t,
+                    p0[1] + (p1[1] - p0[1]) * t, h)
+
+        # chains start at segments without a predecessor, then cycles
+        targets = set(segments.values())
+        heads = [e for e in segments if e not in targets]
+        for closed, starts in ((False, heads), (True, list(segments))):
+            for edge in starts:
+                if edge not in segments:
+                    continue
+                pts = []
+                while edge in segments:
+                    pts.append(point(edge))
+                    edge = segments.pop(edge)
+                if not closed:
+                    pts.append(point(edge))
+                result.append((plane, pts, closed))
+    return result
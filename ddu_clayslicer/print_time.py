@@ -0,0 +1,385 @@
+"""
+Vectorized print time and material estimation of toolpaths.
+
+A toolpath is a sequence of moves, move ``i`` goes from position ``i - 1``
+to position ``i`` with the feedrate of move ``i`` (the first position is the
+start position). This is the same layout as the rows of a parsed G-code
+file, so estimates can be computed from point arrays
+(``estimate_print``) or parsed G-code (``estimate_columns``).
+
+Move times follow a trapezoidal velocity profile with a constant
+acceleration. The speed at the junction of two moves is limited by the
+junction deviation (as in Grbl/Marlin), the toolpath starts and ends at
+rest. The maximum reachable junction speeds are computed using a forward
+and a backward pass, both of which are vectorized as min-plus scans over
+the squared speeds:
+
+    v[j]^2 = min over k <= j of (cap[k] + 2a * (s[j] - s[k]))
+           = 2a * s[j] + minimum.accumulate(cap - 2a * s)[j]
+
+where ``cap`` are the squared speed limits of the junctions and ``s`` is
+the cumulative length of the toolpath. To bound the cancellation error of
+the large cumulative lengths, ``s`` is restarted in every block of
+``SCAN_BLOCK`` nodes and the speeds are carried from block to block.
+Without acceleration every move takes ``length / feedrate``.
+
+The clay volume is estimated from the length of the extruding moves and
+the bead cross-section (line width times layer height).
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# default acceleration in mm/s^2
+DEFAULT_ACCELERATION = 500.0
+# default junction deviation in mm
+DEFAULT_JUNCTION_DEVIATION = 0.05
+# moves shorter than this length (mm) take no time
+MIN_LENGTH = 1e-9
+# number of nodes per block of the speed scans
+SCAN_BLOCK = 256
+
+
+class PrintEstimate(object):
+    """
+    Estimated print time and material of a toolpath.
+
+    Args:
+        move_times: Array of the times of all moves in seconds
+        lengths: Array of the lengths of all moves in mm
+        extruding: Boolean array of the extruding moves
+        layers: Array of the layer index of every move (-1 for none)
+        e_total: Sum of all positive E (extruder axis) increments
+        line_width: Bead width in mm used for the volume
+        layer_height: Bead height in mm used for the volume
+    """
+
+    def __init__(self, move_times, lengths, extruding, layers, e_total=0.0,
+                 line_width=None, layer_height=None):
+        self.move_times = move_times
+        self.lengths = lengths
+        self.extruding = extruding
+        self.layers = layers
+        self.e_total = float(e_total)
+        self.line_width = line_width
+        self.layer_height = layer_height
+
+    def __repr__(self):
+        return 'PrintEstimate({0})'.format(self.summary())
+
+    @property
+    def total_time(self):
+        """Total print time in seconds."""
+        return float(self.move_times.sum())
+
+    @property
+    def print_time(self):
+        """Time of all extruding moves in seconds."""
+        return float(self.move_times[self.extruding].sum())
+
+    @property
+    def travel_time(self):
+        """Time of all non-extruding moves in seconds."""
+        return self.total_time - self.print_time
+
+    @property
+    def extruded_length(self):
+        """Length of all extruding moves in mm."""
+        return float(self.lengths[self.extruding].sum())
+
+    @property
+    def volume(self):
+        """Clay volume in mm^3, None if the bead size is unknown."""
+        if not self.line_width or not self.layer_height:
+            return None
+        return self.extruded_length * self.line_width * self.layer_height
+
+    def layer_times(self):
+        """
+        Return the print time per layer.
+
+        Returns:
+            tuple: (layer_ids, seconds) arrays of all layers with moves,
+                   moves without a layer (-1) are not included
+        """
+        valid = self.layers >= 0
+        layers = self.layers[valid]
+        if not len(layers):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        times = np.bincount(layers, weights=self.move_times[valid])
+        ids = np.flatnonzero(np.bincount(layers))
+        return ids, times[ids]
+
+    def hours_minutes_seconds(self):
+        """Return the total time as integer (hours, minutes, seconds)."""
+        seconds = int(round(self.total_time))
+        return seconds // 3600, seconds // 60 % 60, seconds % 60
+
+    def summary(self):
+        """Return a short human-readable summary string."""
+        text = '{0} moves, {1:d}:{2:02d}:{3:02d} h, {4:.1f} m extruded'.format(
+            len(self.move_times), *(self.hours_minutes_seconds() +
+                                    (self.extruded_length / 1000.0,)))
+        if self.volume is not None:
+            text += ', {0:.3f} l clay'.format(self.volume / 1e6)
+        return text
+
+
+# KINEMATICS -------------------------------------------------------------------
+
+def _junction_caps(directions, speeds, acceleration, deviation):
+    # maximum squared speed at the junctions of consecutive moves
+    cos_theta = -(directions[:-1] * directions[1:]).sum(axis=1)
+    cos_theta = np.clip(cos_theta, -1.0, 1.0)
+    # sin(theta / 2) of the angle between the reversed incoming and the
+    # outgoing direction
+    sin_half = np.sqrt(0.5 * (1.0 - cos_theta))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cap = acceleration * deviation * sin_half / (1.0 - sin_half)
+    # straight junctions are not limited
+    cap[~(sin_half < 1.0 - 1e-12)] = np.inf
+    return np.minimum(cap, np.minimum(speeds[:-1], speeds[1:]) ** 2)
+
+
+def _scan_speeds(caps, lengths, acceleration, block=SCAN_BLOCK):
+    """
+    Maximum squared speeds at all nodes (move boundaries) reachable from
+    the squared speed caps of the nodes, accelerating forward.
+    """
+    count = len(caps)
+    blocks = -(-count // block)
+    # squared speed gained on the move into every node, padded to blocks
+    gain = np.zeros(blocks * block)
+    gain[1:count] = 2.0 * acceleration * lengths
+    gain = gain.reshape(blocks, block)
+    padded = np.full(blocks * block, np.inf)
+    padded[:count] = caps
+    padded = padded.reshape(blocks, block)
+    # scan every block on its own, cumulative gains restart at each block
+    s = gain.copy()
+    s[:, 0] = 0.0
+    np.cumsum(s, axis=1, out=s)
+    local = s + np.minimum.accumulate(padded - s, axis=1)
+    # carry the speed at the end of every block into the next one
+    last = local[:, -1].tolist()
+    total = s[:, -1].tolist()
+    entry = gain[:, 0].tolist()
+    carry = [np.inf] * blocks
+    for b in range(1, blocks):
+        carry[b] = min(last[b - 1], carry[b - 1] + total[b - 1]) + entry[b]
+    carry = np.array(carry)[:, None]
+    return np.minimum(local, carry + s).reshape(-1)[:count]
+
+
+def plan_speeds(lengths, speeds, directions, acceleration=DEFAULT_ACCELERATION,
+                deviation=DEFAULT_JUNCTION_DEVIATION):
+    """
+    Compute the speeds at all nodes of a toolpath of moves with non-zero
+    length.
+
+    Args:
+        lengths: Array of move lengths in mm
+        speeds: Array of nominal move speeds in mm/s
+        directions: Array of shape (moves, 3) of unit move directions
+        acceleration: Acceleration in mm/s^2
+        deviation: Junction deviation in mm
+
+    Returns:
+        array: Speeds at the ``moves + 1`` nodes, the first and last are 0
+    """
+    count = len(lengths)
+    caps = np.zeros(count + 1)
+    if count > 1:
+        caps[1:-1] = _junction_caps(directions, speeds, acceleration,
+                                    deviation)
+    forward = _scan_speeds(caps, lengths, acceleration)
+    backward = _scan_speeds(caps[::-1], lengths[::-1], acceleration)[::-1]
+    return np.sqrt(np.maximum(np.minimum(forward, backward), 0.0))
+
+
+def trapezoid_times(lengths, speeds, v0, v1, acceleration):
+    """
+    Times of moves with a trapezoidal (or triangular) velocity profile from
+    the entry speeds ``v0`` to the exit speeds ``v1``.
+    """
+    a = acceleration
+    v0 = np.minimum(v0, speeds)
+    v1 = np.minimum(v1, speeds)
+    # peak speed if the move only accelerates and decelerates
+    peak = np.sqrt(np.maximum(a * lengths + 0.5 * (v0 ** 2 + v1 ** 2), 0.0))
+    cruise = peak >= speeds
+    ramp = (2.0 * speeds ** 2 - v0 ** 2 - v1 ** 2) / (2.0 * a)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_cruise = ((2.0 * speeds - v0 - v1) / a +
+                    (lengths - ramp) / speeds)
+    t_triangle = (2.0 * peak - v0 - v1) / a
+    return np.where(cruise, t_cruise, t_triangle)
+
+
+# ESTIMATION -------------------------------------------------------------------
+
+def estimate_print(points, feedrates, extruding=None, layers=None,
+                   acceleration=DEFAULT_ACCELERATION,
+                   deviation=DEFAULT_JUNCTION_DEVIATION, e_total=0.0,
+                   line_width=None, layer_height=None):
+    """
+    Estimate the print time and material of a toolpath.
+
+    Args:
+        points: Array of shape (n, 3), the start position followed by the
+                target positions of all moves
+        feedrates: Feedrates of the moves to points ``1..n-1`` in mm/min,
+                   a single value or one per point (the first is ignored)
+        extruding: Boolean array of extruding moves per point, defaults to
+                   all moves
+        layers: Layer index per point, defaults to -1 (no layer)
+        acceleration: Acceleration in mm/s^2, None for constant speeds
+        deviation: Junction deviation in mm
+        e_total: Sum of the E increments, only reported
+        line_width: Bead width in mm for the clay volume
+        layer_height: Bead height in mm for the clay volume
+
+    Returns:
+        PrintEstimate: The estimate, all arrays are per move (n - 1)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    count = max(len(points) - 1, 0)
+    feedrates = np.broadcast_to(np.asarray(feedrates, dtype=np.float64),
+                                (len(points),))
+    speeds = feedrates[1:] / 60.0
+    delta = np.diff(points, axis=0)
+    lengths = np.sqrt((delta ** 2).sum(axis=1))
+    if extruding is None:
+        extruding = np.ones(count, dtype=bool)
+    else:
+        extruding = np.asarray(extruding, dtype=bool)[1:]
+    if layers is None:
+        layers = np.full(count, -1, dtype=np.int64)
+    else:
+        layers = np.asarray(layers, dtype=np.int64)[1:]
+    times = np.zeros(count)
+    # moves without length or speed take no time
+    moving = np.flatnonzero((lengths > MIN_LENGTH) & (speeds > 0.0))
+    lengths_m = lengths[moving]
+    speeds_m = speeds[moving]
+    if acceleration is None or acceleration <= 0.0:
+        times[moving] = lengths_m / speeds_m
+    elif len(moving):
+        directions = delta[moving] / lengths_m[:, None]
+        nodes = plan_speeds(lengths_m, speeds_m, directions, acceleration,
+                            deviation)
+        times[moving] = trapezoid_times(lengths_m, speeds_m, nodes[:-1],
+                                        nodes[1:], acceleration)
+    return PrintEstimate(times, lengths, extruding, layers, e_total,
+                         line_width, layer_height)
+
+
+def estimate_columns(columns, acceleration=DEFAULT_ACCELERATION,
+                     deviation=DEFAULT_JUNCTION_DEVIATION, line_width=None,
+                     layer_height=None, start=(0.0, 0.0, 0.0)):
+    """
+    Estimate the print time and material of parsed G-code (see
+    ``gcode_parser``). G0/G1 moves are estimated, a move extrudes if E
+    increases (``G92`` resets of E are taken into account).
+
+    Args:
+        columns: GCodeColumns of the file or of a range of layers
+        start: Start position if it is not known from the columns
+
+    Returns:
+        PrintEstimate: The estimate, all arrays are per G0/G1 move
+    """
+    moves = (columns.command == 0) | (columns.command == 1)
+    position = np.stack([columns.filled(ax) for ax in 'XYZ'], axis=1)
+    for axis in range(3):
+        unknown = np.isnan(position[:, axis])
+        position[unknown, axis] = start[axis]
+    e = columns.filled('E')
+    e = np.where(np.isnan(e), 0.0, e)
+    e0 = columns.initial[3]
+    if np.isnan(e0):
+        e0 = e[0] if len(e) else 0.0
+    de = np.diff(e, prepend=e0)
+    # G92 sets E without moving
+    de[columns.command == 92] = 0.0
+    f = columns.filled('F')
+    f = np.where(np.isnan(f), 0.0, f)
+    rows = np.flatnonzero(moves)
+    # the position before the first move is the start position
+    first = rows[0] if len(rows) else 0
+    origin = position[first - 1] if first > 0 else np.asarray(
+        [start[i] if np.isnan(columns.initial[i]) else columns.initial[i]
+         for i in range(3)])
+    points = np.concatenate([origin[None, :], position[rows]])
+    extruding = np.concatenate([[False], de[rows] > 0.0])
+    layers = np.concatenate([[-1], columns.layer[rows]])
+    return estimate_print(points,
+                          np.concatenate([[0.0], f[rows]]),
+                          extruding=extruding,
+                          layers=layers,
+                          acceleration=acceleration,
+                          deviation=deviation,
+                          e_total=float(de[rows][de[rows] > 0.0].sum()),
+                          line_width=line_width,
+                          layer_height=layer_height)
+
+
+# REFERENCE --------------------------------------------------------------------
+
+def reference_times(points, feedrates, acceleration=DEFAULT_ACCELERATION,
+                    deviation=DEFAULT_JUNCTION_DEVIATION):
+    """
+    Pure Python reference implementation of the move times of
+    ``estimate_print``, using explicit forward and backward passes.
+
+    Returns:
+        list: The time of every move
+    """
+    import math
+    moves = []
+    for i in range(1, len(points)):
+        d = [points[i][k] - points[i - 1][k] for k in range(3)]
+        length = math.sqrt(sum(c * c for c in d))
+        speed = feedrates[i] / 60.0
+        moves.append((length, speed, d))
+    active = [m for m in moves if m[0] > MIN_LENGTH and m[1] > 0.0]
+    count = len(active)
+    caps = [0.0] * (count + 1)
+    for i in range(1, count):
+        l0, s0, d0 = active[i - 1]
+        l1, s1, d1 = active[i]
+        cos_theta = -sum(d0[k] * d1[k] for k in range(3)) / (l0 * l1)
+        cos_theta = min(max(cos_theta, -1.0), 1.0)
+        sin_half = math.sqrt(0.5 * (1.0 - cos_theta))
+        if sin_half < 1.0 - 1e-12:
+            cap = acceleration * deviation * sin_half / (1.0 - sin_half)
+        else:
+            cap = float('inf')
+        caps[i] = min(cap, min(s0, s1) ** 2)
+    v2 = list(caps)
+    for i in range(count):
+        v2[i + 1] = min(v2[i + 1], v2[i] + 2.0 * acceleration * active[i][0])
+    for i in range(count - 1, -1, -1):
+        v2[i] = min(v2[i], v2[i + 1] + 2.0 * acceleration * active[i][0])
+    times = []
+    k = 0
+    for length, speed, _ in moves:
+        if not (length > MIN_LENGTH and speed > 0.0):
+            times.append(0.0)
+            continue
+        a = acceleration
+        v0 = min(math.sqrt(max(v2[k], 0.0)), speed)
+        v1 = min(math.sqrt(max(v2[k + 1], 0.0)), speed)
+        peak = math.sqrt(max(a * length + 0.5 * (v0 ** 2 + v1 ** 2), 0.0))
+        if peak >= speed:
+            ramp = (2.0 * speed ** 2 - v0 ** 2 - v1 ** 2) / (2.0 * a)
+            times.append((2.0 * speed - v0 - v1) / a +
+                         (length - ramp) / speed)
+        else:
+            times.append((2.0 * peak - v0 - v1) / a)
+        k += 1
+    return times
@@ -0,0 +1,134 @@
+"""
+Vectorized rounding and fixed-decimal formatting of the RoundToDecimal
+component.
+
+Decimal places are broadcast over the values the same way the component
+always did: value ``i`` uses decimal place ``i``, values beyond the last
+decimal place use the last one (so a single decimal place applies to all
+values). Trees are processed as a list of branches in one pass, where
+branch ``k`` of the values uses branch ``k`` of the decimal places, or the
+last branch if there are fewer (Grasshopper longest list matching). None
+values (empty items) are passed through at their positions and keep their
+decimal place, so the following values are not shifted.
+
+Values are rounded by formatting them once with ``'%.{d}f'`` (which is
+correctly rounded like the built-in ``round``) and parsing the strings, so
+the rounded values and the strings are identical to the ones of the
+built-in fallback of the component.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+
+def broadcast_decimals(decimals, count):
+    """
+    Broadcast decimal places to ``count`` values, repeating the last
+    decimal place. No decimal places default to 0.
+    """
+    decimals = np.asarray(decimals if len(decimals) else [0],
+                          dtype=np.int64).ravel()
+    if len(decimals) >= count:
+        return decimals[:count]
+    return np.concatenate(
+        [decimals, np.full(count - len(decimals), decimals[-1],
+                           dtype=np.int64)])
+
+
+def _format_uniform(values, decimals):
+    # a single printf call for all values is faster than formatting every
+    # value separately
+    if not values:
+        return []
+    fmt = '%.{0}f\n'.format(decimals)
+    return ((fmt * len(values)) % tuple(values)).split('\n')[:-1]
+
+
+def format_fixed(values, decimals):
+    """
+    Format ``values`` as fixed-decimal strings (i.e. for G-code) with the
+    given per-value ``decimals``. Negative decimal places format without a
+    decimal point.
+
+    Returns:
+        list: The formatted strings
+    """
+    values = np.asarray(values, dtype=np.float64)
+    decimals = np.maximum(np.asarray(decimals, dtype=np.int64), 0)
+    unique = np.unique(decimals)
+    if len(unique) <= 1:
+        return _format_uniform(values.tolist(),
+                               int(unique[0]) if len(unique) else 0)
+    strings = [None] * len(values)
+    for d in unique.tolist():
+        index = np.flatnonzero(decimals == d)
+        for i, text in zip(index.tolist(),
+                           _format_uniform(values[index].tolist(), d)):
+            strings[i] = text
+    return strings
+
+
+def round_values(values, decimals):
+    """
+    Round ``values`` to the broadcast ``decimals`` exactly like the
+    built-in ``round``, formatting them only once.
+
+    Returns:
+        tuple: (rounded, strings, decimals) the float64 array of the rounded
+               values, their fixed-decimal strings and the int64 array of
+               the decimal places
+    """
+    values = np.asarray(values, dtype=np.float64)
+    decimals = broadcast_decimals(decimals, len(values))
+    strings = format_fixed(values, decimals)
+    rounded = np.array(strings, dtype=np.float64).reshape(-1)
+    # negative decimal places round to tens, hundreds, ... (rarely used)
+    for i in np.flatnonzero(decimals < 0).tolist():
+        rounded[i] = round(float(values[i]), int(decimals[i]))
+        strings[i] = '%.0f' % rounded[i]
+    return rounded, strings, decimals
+
+
+def round_branches(branches, decimal_branches, strings=False):
+    """
+    Round all branches of a tree in one vectorized pass.
+
+    Args:
+        branches: Sequence of value sequences (the branches of the tree)
+        decimal_branches: Sequence of decimal place sequences, matched to
+                          the branches by longest list
+        strings: Also return the fixed-decimal strings of the values
+
+    Returns:
+        tuple: (rounded, strings) lists of lists with None at the positions
+               of None values, strings is None if not requested
+    """
+    branches = [list(br) for br in branches]
+    decimal_branches = [list(br) for br in decimal_branches] or [[0]]
+    counts = [len(br) for br in branches]
+    flat = [v for br in branches for v in br]
+    empty = [i for i, v in enumerate(flat) if v is None]
+    values = np.array([0.0 if v is None else v for v in flat],
+                      dtype=np.float64)
+    decimals = np.concatenate(
+        [broadcast_decimals(
+            decimal_branches[min(k, len(decimal_branches) - 1)], n)
+         for k, n in enumerate(counts)] or [np.zeros(0, dtype=np.int64)])
+    rounded, flat_strings, decimals = round_values(values, decimals)
+    rounded = rounded.tolist()
+    for i in empty:
+        rounded[i] = flat_strings[i] = None
+    # split into branches again
+    result = []
+    result_strings = [] if strings else None
+    lo = 0
+    for n in counts:
+        result.append(rounded[lo:lo + n])
+        if strings:
+            result_strings.append(flat_strings[lo:lo + n])
+        lo += n
+    return result, result_strings
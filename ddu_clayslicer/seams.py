@@ -0,0 +1,379 @@
+"""
+Headless seam placement on sliced polylines.
+
+Chooses the start point (seam) of every closed polyline of a
+``SliceResult`` for all layers in one batched call, using one of the
+strategies in ``SEAM_STRATEGIES``:
+
+    aligned:  Like AdjustSliceSeams, the seam of the first polyline is placed
+              at a normalized length parameter, every other closed polyline
+              starts at its point closest to the seam of the first polyline
+              of the previous layer.
+    random:   Like AdjustSliceSeams with Randomize, every closed polyline
+              (except the first) starts at a seeded random length parameter.
+    sharpest: Every closed polyline starts at its sharpest corner. Polylines
+              without a corner turning by at least ``min_angle`` are aligned
+              instead.
+
+Only the seams of the first polylines of the layers depend on each other
+(each one is aligned to the one of the previous layer), they are found in a
+short loop over the layers. The closest points of all other polylines are
+then queried at once from a ``PolylineIndex`` (bounding boxes of runs of
+consecutive points), so only the points of the boxes close to a seam are
+tested instead of all points of a layer.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import math
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# LOCAL IMPORTS
+from .planar_slicer import SliceResult
+from .toolpaths import _local_index, _segment_lengths, rotate_polylines
+
+# available seam strategies
+SEAM_STRATEGIES = ('aligned', 'random', 'sharpest')
+
+# default minimum turning angle (degrees) of corners used as seams
+DEFAULT_MIN_ANGLE = 30.0
+
+# default number of consecutive points per bounding box of the index
+DEFAULT_CHUNK = 32
+
+
+def _segment_argmin(values, offsets):
+    """
+    Return the non-empty segments ``values[offsets[i]:offsets[i + 1]]`` and
+    the position of the first smallest value in every one of them.
+    """
+    counts = np.diff(offsets)
+    filled = np.flatnonzero(counts > 0)
+    if not len(filled):
+        return filled, np.zeros(0, dtype=np.int64)
+    mins = np.minimum.reduceat(values, offsets[:-1][filled])
+    hits = np.flatnonzero(values == np.repeat(mins, counts[filled]))
+    segments = np.repeat(np.arange(len(filled)), counts[filled])[hits]
+    return filled, hits[np.r_[True, segments[1:] != segments[:-1]]]
+
+
+def _expand(starts, counts):
+    """Concatenated ranges ``starts[i]:starts[i] + counts[i]``."""
+    offsets = np.cumsum(counts) - counts
+    return (np.repeat(starts - offsets, counts) +
+            np.arange(int(counts.sum()), dtype=np.int64))
+
+
+def _at_length(points, offsets, closed, indices, fractions):
+    """
+    Local index of the vertex at the normalized length parameters
+    ``fractions`` of the polylines ``indices``.
+    """
+    # only the polylines up to the last requested one are measured
+    end = int(indices.max()) + 1
+    offsets = offsets[:end + 1]
+    seglen = _segment_lengths(points[:offsets[-1]], offsets, closed[:end])
+    cum = np.cumsum(seglen) - seglen
+    totals = np.bincount(_local_index(offsets)[1], weights=seglen,
+                         minlength=end)
+    target = cum[offsets[indices]] + fractions * totals[indices]
+    pos = np.searchsorted(cum, target, side='right') - 1
+    pos = np.clip(pos, offsets[indices], offsets[indices + 1] - 1)
+    return pos - offsets[indices]
+
+
+# INDEX ------------------------------------------------------------------------
+
+class PolylineIndex(object):
+    """
+    Bounding boxes (in XY) of the runs of ``chunk`` consecutive points of
+    every polyline, answering batched closest point queries restricted to
+    one polyline per query. Building the index needs no sorting, queries
+    only test the points of the boxes which can contain the closest point.
+
+    Args:
+        points: Array of shape (n, 2) or (n, 3), only XY is used
+        offsets: CSR offsets of the polylines
+        chunk: Number of points per bounding box
+    """
+
+    def __init__(self, points, offsets, chunk=DEFAULT_CHUNK):
+        self.xy = np.ascontiguousarray(np.asarray(points,
+                                                  dtype=np.float64)[:, :2])
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.chunk = int(chunk)
+        counts = np.diff(self.offsets)
+        boxes = -(-counts // self.chunk)
+        self.box_offsets = np.r_[0, np.cumsum(boxes)].astype(np.int64)
+        local, owner = _local_index(self.box_offsets)
+        self.box_starts = self.offsets[:-1][owner] + local * self.chunk
+        self.box_counts = np.minimum(self.offsets[1:][owner] -
+                                     self.box_starts, self.chunk)
+        if len(self.box_starts):
+            self.lower = np.minimum.reduceat(self.xy, self.box_starts)
+            self.upper = np.maximum.reduceat(self.xy, self.box_starts)
+        else:
+            self.lower = self.upper = np.zeros((0, 2))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return 'PolylineIndex({0} polylines, {1} boxes)'.format(
+            len(self), len(self.box_starts))
+
+    def nearest(self, queries, polylines):
+        """
+        Return the closest point of polyline ``polylines[i]`` to every query
+        point ``queries[i]``.
+
+        Returns:
+            tuple: (indices, distances) of the closest points (the lowest
+                   point index on ties), -1 and inf for empty polylines
+        """
+        q = np.asarray(queries, dtype=np.float64)[:, :2]
+        polylines = np.asarray(polylines, dtype=np.int64)
+        best = np.full(len(q), -1, dtype=np.int64)
+        best_d = np.full(len(q), np.inf)
+        # distance bounds of the point set of every box of the polylines
+        counts = np.diff(self.box_offsets)[polylines]
+        rows = np.repeat(np.arange(len(q)), counts)
+        boxes = _expand(self.box_offsets[polylines], counts)
+        lo = self.lower[boxes] - q[rows]
+        hi = q[rows] - self.upper[boxes]
+        near = (np.maximum(np.maximum(lo, hi), 0.0) ** 2).sum(axis=1)
+        far = (np.maximum(np.abs(lo), np.abs(hi)) ** 2).sum(axis=1)
+        box_rows = np.r_[0, np.cumsum(counts)]
+        filled, first = _segment_argmin(far, box_rows)
+        bound = np.full(len(q), np.inf)
+        bound[filled] = far[first]
+        # only boxes which can contain a closer point than the best bound
+        keep = near <= bound[rows]
+        rows = rows[keep]
+        boxes = boxes[keep]
+        points = _expand(self.box_starts[boxes], self.box_counts[boxes])
+        rows = np.repeat(rows, self.box_counts[boxes])
+        d = ((self.xy[points] - q[rows]) ** 2).sum(axis=1)
+        filled, first = _segment_argmin(
+            d, np.r_[0, np.cumsum(np.bincount(rows, minlength=len(q)))])
+        best[filled] = points[first]
+        best_d[filled] = d[first]
+        return best, np.sqrt(best_d)
+
+
+# CORNERS ----------------------------------------------------------------------
+
+def turning_cosines(points, offsets, closed):
+    """
+    Cosine of the turning angle (projected to the XY plane) at every point
+    of the polylines, 1 for straight points and -1 for reversals. The ends
+    of open polylines and repeated points (zero length edges) do not turn.
+    The cosines only need correctly rounded operations, so they are
+    reproducible (unlike ``np.arctan2``).
+    """
+    xy = np.asarray(points, dtype=np.float64)[:, :2]
+    filled = np.diff(offsets) > 0
+    first = offsets[:-1][filled]
+    last = offsets[1:][filled] - 1
+    # outgoing edge b and incoming edge a of every point
+    b = np.empty_like(xy)
+    b[:-1] = xy[1:] - xy[:-1]
+    b[last] = xy[first] - xy[last]
+    a = np.empty_like(xy)
+    a[1:] = b[:-1]
+    a[first] = b[last]
+    dot = a[:, 0] * b[:, 0] + a[:, 1] * b[:, 1]
+    norm = np.sqrt((a[:, 0] * a[:, 0] + a[:, 1] * a[:, 1]) *
+                   (b[:, 0] * b[:, 0] + b[:, 1] * b[:, 1]))
+    cosines = np.ones(len(xy))
+    np.divide(dot, norm, out=cosines, where=norm > 0.0)
+    is_open = ~closed[filled]
+    cosines[first[is_open]] = 1.0
+    cosines[last[is_open]] = 1.0
+    return cosines
+
+
+# SEAMS ------------------------------------------------------------------------
+
+def seam_starts(result, strategy='aligned', seam=0.0, seed=0,
+                min_angle=DEFAULT_MIN_ANGLE, chunk=DEFAULT_CHUNK):
+    """
+    Return the local index of the seam point of every polyline.
+
+    Args:
+        result: The ``SliceResult`` of all layers
+        strategy: One of ``SEAM_STRATEGIES``
+        seam: Normalized length parameter of the seam of the first polyline,
+              negative values count from the end
+        seed: Seed of the random seams
+        min_angle: Minimum turning angle (degrees) of the corners used by
+                   the sharpest strategy
+        chunk: Number of points per bounding box of the closest point
+               queries (see ``PolylineIndex``)
+
+    Returns:
+        numpy.ndarray: Seam index of every polyline (0 for open polylines)
+    """
+    if strategy not in SEAM_STRATEGIES:
+        raise ValueError('Unknown seam strategy "{0}"!'.format(strategy))
+    points, offsets, closed = result.points, result.offsets, result.closed
+    count = len(closed)
+    starts = np.zeros(count, dtype=np.int64)
+    if not count:
+        return starts
+    seam = 1.0 + seam if seam < 0 else seam
+    starts[0] = _at_length(points, offsets, closed, np.array([0]),
+                           np.array([seam]))[0]
+    if strategy == 'random':
+        rng = np.random.default_rng(seed)
+        rest = np.arange(1, count)
+        if len(rest):
+            starts[rest] = _at_length(points, offsets, closed, rest,
+                                      rng.random(len(rest)))
+        starts[~closed] = 0
+        return starts
+
+    fixed = ~closed
+    starts[~closed] = 0
+    if strategy == 'sharpest':
+        cosines = turning_cosines(points, offsets, closed)
+        polylines, corners = _segment_argmin(cosines, offsets)
+        sharp = np.zeros(count, dtype=bool)
+        sharp[polylines] = cosines[corners] <= math.cos(
+            math.radians(min_angle))
+        sharp &= closed
+        starts[sharp] = corners[sharp[polylines]] - offsets[:-1][sharp]
+        fixed |= sharp
+
+    # the seams of the first polylines of the layers depend on each other
+    xy = points[:, :2]
+    firsts = np.flatnonzero(np.r_[True, result.planes[1:] !=
+                                  result.planes[:-1]])
+    samples = np.empty((len(firsts), 2))
+    samples[0] = xy[offsets[0] + starts[0]]
+    for layer in range(1, len(firsts)):
+        f = firsts[layer]
+        if not fixed[f]:
+            d = ((xy[offsets[f]:offsets[f + 1]] - samples[layer - 1]) **
+                 2).sum(axis=1)
+            starts[f] = int(np.argmin(d))
+        samples[layer] = xy[offsets[f] + starts[f]]
+
+    # all other polylines are aligned to the previous layer in one query
+    is_first = np.zeros(count, dtype=bool)
+    is_first[firsts] = True
+    rest = np.flatnonzero(~fixed & ~is_first)
+    if len(rest):
+        layer = np.cumsum(is_first) - 1
+        index = PolylineIndex(xy, offsets, chunk)
+        hits = index.nearest(samples[np.maximum(layer[rest] - 1, 0)],
+                             rest)[0]
+        starts[rest] = hits - offsets[rest]
+    return starts
+
+
+def place_seams(result, strategy='aligned', seam=0.0, seed=0,
+                min_angle=DEFAULT_MIN_ANGLE, chunk=DEFAULT_CHUNK):
+    """
+    Rotate all closed polylines to start at their seams (see
+    ``seam_starts``).
+
+    Returns:
+        SliceResult: A new result with rotated polylines
+    """
+    starts = seam_starts(result, strategy, seam, seed, min_angle, chunk)
+    return SliceResult(rotate_polylines(result.points, result.offsets,
+                                        starts),
+                       result.offsets, result.planes, result.closed,
+                       result.heights)
+
+
+# REFERENCE --------------------------------------------------------------------
+
+def reference_seam_starts(result, strategy='aligned', seam=0.0, seed=0,
+                          min_angle=DEFAULT_MIN_ANGLE):
+    """
+    Pure Python reference of ``seam_starts``, testing all points of every
+    polyline.
+    """
+    import bisect
+
+    points = [tuple(p) for p in result.points.tolist()]
+    offsets = result.offsets.tolist()
+    closed = result.closed.tolist()
+    planes = result.planes.tolist()
+    count = len(closed)
+    starts = [0] * count
+    if not count:
+        return starts
+
+    # running lengths like the vectorized version for identical rounding
+    cum, totals, running = [], [0.0] * count, 0.0
+    for i in range(count):
+        n = offsets[i + 1] - offsets[i]
+        for k in range(offsets[i], offsets[i + 1]):
+            if closed[i] or k < offsets[i + 1] - 1:
+                p, q = points[k], points[offsets[i] + (k - offsets[i] + 1) % n]
+                length = math.sqrt(sum((b - a) ** 2 for a, b in zip(p, q)))
+            else:
+                length = 0.0
+            running += length
+            cum.append(running - length)
+            totals[i] += length
+
+    def at_length(i, fraction):
+        target = cum[offsets[i]] + fraction * totals[i]
+        pos = bisect.bisect_right(cum, target) - 1
+        return min(max(pos, offsets[i]), offsets[i + 1] - 1) - offsets[i]
+
+    def closest(i, sample):
+        d = [(p[0] - sample[0]) ** 2 + (p[1] - sample[1]) ** 2
+             for p in points[offsets[i]:offsets[i + 1]]]
+        return d.index(min(d))
+
+    def corner(i):
+        pts = points[offsets[i]:offsets[i + 1]]
+        n = len(pts)
+        cosines = []
+        for k in range(n):
+            a = (pts[k][0] - pts[k - 1][0], pts[k][1] - pts[k - 1][1])
+            b = (pts[(k + 1) % n][0] - pts[k][0],
+                 pts[(k + 1) % n][1] - pts[k][1])
+            norm = math.sqrt((a[0] * a[0] + a[1] * a[1]) *
+                             (b[0] * b[0] + b[1] * b[1]))
+            cosines.append((a[0] * b[0] + a[1] * b[1]) / norm
+                           if norm > 0.0 else 1.0)
+        k = cosines.index(min(cosines))
+        return k if cosines[k] <= math.cos(math.radians(min_angle)) else None
+
+    seam = 1.0 + seam if seam < 0 else seam
+    starts[0] = at_length(0, seam) if closed[0] else 0
+    if strategy == 'random':
+        fractions = np.random.default_rng(seed).random(count - 1).tolist()
+        for i in range(1, count):
+            starts[i] = at_length(i, fractions[i - 1]) if closed[i] else 0
+        return starts
+    fixed = [not c for c in closed]
+    if strategy == 'sharpest':
+        for i in range(count):
+            k = corner(i) if closed[i] else None
+            if k is not None:
+                starts[i], fixed[i] = k, True
+
+    sample = points[offsets[0] + starts[0]]
+    layer_sample = sample
+    for i in range(1, count):
+        if planes[i] != planes[i - 1]:
+            # first polyline of a layer, aligned to the previous layer
+            layer_sample = sample
+            if not fixed[i]:
+                starts[i] = closest(i, layer_sample)
+            sample = points[offsets[i] + starts[i]]
+        elif not fixed[i]:
+            starts[i] = closest(i, layer_sample)
+    return starts
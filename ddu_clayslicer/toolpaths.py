@@ -0,0 +1,306 @@
+"""
+Headless toolpath processing of sliced layers.
+
+Turns the polylines of a ``planar_slicer.SliceResult`` into print paths and
+the move rows of the G-code, mirroring the components of the definition:
+
+    - ``adjust_seams`` moves the seams of closed polylines like
+      AdjustSliceSeams (aligned to the seam of the previous layer or at a
+      seeded random position, see ``seams`` for the seam engine).
+    - ``spiralize`` joins single-contour layers into one continuous path,
+      raising Z along every layer.
+    - ``floor_infill`` fills the region of a layer with zig-zag lines.
+    - ``build_moves`` creates the move rows of all paths like the
+      GenerateGCODE component (travel with Z-hop, extrusion moves,
+      retraction with Z-hop and a G92 E0 reset per path).
+
+Seams are moved to the nearest polyline vertex, no points are inserted.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# command code of the extrusion reset rows (G92 E0)
+RESET = 92
+
+
+def _local_index(offsets):
+    """Index of every point within its polyline and the polyline of it."""
+    counts = np.diff(offsets)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    return np.arange(offsets[-1]) - offsets[:-1][owner], owner
+
+
+def _segment_lengths(points, offsets, closed):
+    """
+    Length of the segment starting at every point, the last point of closed
+    polylines connects to the first one, of open polylines it has none.
+    """
+    counts = np.diff(offsets)
+    filled = counts > 0
+    nxt = np.arange(1, len(points) + 1)
+    last = offsets[1:][filled] - 1
+    nxt[last] = offsets[:-1][filled]
+    lengths = np.sqrt(((points[nxt] - points) ** 2).sum(axis=1))
+    lengths[last[~closed[filled]]] = 0.0
+    return lengths
+
+
+def rotate_polylines(points, offsets, starts):
+    """
+    Return the points with every polyline rotated to start at its local
+    point index ``starts[i]``.
+    """
+    local, owner = _local_index(offsets)
+    counts = np.diff(offsets)
+    if not len(local):
+        return points.copy()
+    rotated = offsets[:-1][owner] + (local + starts[owner]) % counts[owner]
+    return points[rotated]
+
+
+# SEAMS ------------------------------------------------------------------------
+
+def adjust_seams(result, seam=0.0, randomize=False, seed=0):
+    """
+    Move the seams of all closed polylines like AdjustSliceSeams.
+
+    Args:
+        result: The ``SliceResult`` to adjust
+        seam: Normalized length parameter of the seam of the first polyline,
+              negative values count from the end
+        randomize: Move every seam to a random position instead of aligning
+                   it to the seam of the first polyline of the last layer
+        seed: Seed of the random positions
+
+    Returns:
+        SliceResult: A new result with rotated polylines
+    """
+    from .seams import place_seams
+
+    return place_seams(result, 'random' if randomize else 'aligned', seam,
+                       seed)
+
+
+# PATHS ------------------------------------------------------------------------
+
+def polyline_paths(result, close=True):
+    """
+    Return the polylines as a list of point arrays, closed polylines repeat
+    their first point at the end if ``close`` is True.
+    """
+    paths = np.split(result.points, result.offsets[1:-1])
+    if close:
+        paths = [np.vstack([p, p[:1]]) if c and len(p) else p
+                 for p, c in zip(paths, result.closed)]
+    return paths
+
+
+def spiralize(result, first=0):
+    """
+    Join the polylines of all planes from plane index ``first`` on into one
+    continuous path, raising Z along every layer from the height of the
+    previous plane to its own height.
+
+    Returns:
+        ndarray: The points of the path or None, if any of these planes does
+                 not consist of exactly one closed polyline
+    """
+    planes = result.planes
+    sel = np.flatnonzero(planes >= first)
+    if not len(sel) or not result.closed[sel].all():
+        return None
+    if (np.bincount(planes[sel] - first).min() != 1 or
+            len(sel) != planes[sel].max() - first + 1):
+        return None
+    lo, hi = result.offsets[sel[0]], result.offsets[sel[-1] + 1]
+    points = result.points[lo:hi].copy()
+    offsets = result.offsets[sel[0]:sel[-1] + 2] - lo
+    seglen = _segment_lengths(points, offsets, np.ones(len(sel), bool))
+    cum = np.cumsum(seglen) - seglen
+    local_start = np.repeat(cum[offsets[:-1]], np.diff(offsets))
+    owner = np.repeat(np.arange(len(sel)), np.diff(offsets))
+    totals = np.bincount(owner, weights=seglen, minlength=len(sel))
+    fraction = (cum - local_start) / np.maximum(totals[owner], 1e-12)
+    heights = result.heights[planes[sel]]
+    # the first spiral layer starts at its own height
+    below = np.r_[heights[0], heights[:-1]]
+    points[:, 2] = below[owner] + (heights - below)[owner] * fraction
+    return points
+
+
+# FLOORS -----------------------------------------------------------------------
+
+def floor_infill(result, plane, spacing, angle=0.0):
+    """
+    Fill the region of the closed polylines of ``plane`` (even-odd rule) with
+    parallel lines at ``spacing`` (rotated by ``angle`` in degrees), joined
+    into zig-zag paths where consecutive lines are close.
+
+    Returns:
+        list: Point arrays of the infill paths
+    """
+    idx = result.plane_polylines(plane)
+    idx = idx[result.closed[idx]]
+    if not len(idx) or spacing <= 0:
+        return []
+    polys = [result.polyline(i) for i in idx]
+    height = result.heights[plane]
+    a = np.radians(angle)
+    rot = np.array([[np.cos(a), np.sin(a)], [-np.sin(a), np.cos(a)]])
+    # all edges of all polylines in the rotated frame
+    p0 = np.concatenate([p[:, :2] for p in polys]) @ rot.T
+    p1 = np.concatenate([np.roll(p[:, :2], -1, axis=0) for p in polys]) @ \
+        rot.T
+    y0 = p0[:, 1].min()
+    lines = np.arange(y0 + 0.5 * spacing, p0[:, 1].max(), spacing)
+    if not len(lines):
+        return []
+    ya = np.minimum(p0[:, 1], p1[:, 1])
+    yb = np.maximum(p0[:, 1], p1[:, 1])
+    lo = np.searchsorted(lines, ya, side='left')
+    hi = np.searchsorted(lines, yb, side='left')
+    counts = np.maximum(hi - lo, 0)
+    edge = np.repeat(np.arange(len(p0)), counts)
+    line = np.repeat(lo - (np.cumsum(counts) - counts), counts) + \
+        np.arange(int(counts.sum()))
+    t = (lines[line] - p0[edge, 1]) / (p1[edge, 1] - p0[edge, 1])
+    x = p0[edge, 0] + (p1[edge, 0] - p0[edge, 0]) * t
+    order = np.lexsort((x, line))
+    x, line = x[order], line[order]
+    # even-odd pairs of crossings, shortened by half a line at both ends
+    xa, xb, line = x[0::2] + 0.5 * spacing, x[1::2] - 0.5 * spacing, \
+        line[0::2]
+    keep = xb > xa
+    xa, xb, line = xa[keep], xb[keep], line[keep]
+    if not len(line):
+        return []
+    # zig-zag: every other line runs backwards, intervals in reverse order
+    odd = line % 2 == 1
+    ordkey = np.where(odd, -xa, xa)
+    order = np.lexsort((ordkey, line))
+    xa, xb, line, odd = xa[order], xb[order], line[order], odd[order]
+    start = np.where(odd, xb, xa)
+    end = np.where(odd, xa, xb)
+    # join an interval to the previous one if it lies on the next line and
+    # the connecting move is short
+    gap = np.hypot(start[1:] - end[:-1], lines[line[1:]] - lines[line[:-1]])
+    join = (line[1:] == line[:-1] + 1) & (gap <= 2.0 * spacing)
+    pts = np.empty((2 * len(line), 2))
+    pts[0::2, 0], pts[1::2, 0] = start, end
+    pts[0::2, 1] = pts[1::2, 1] = lines[line]
+    pts = pts @ rot
+    pts = np.column_stack([pts, np.full(len(pts), height)])
+    breaks = 2 * (np.flatnonzero(~join) + 1)
+    return np.split(pts, breaks)
+
+
+# MOVES ------------------------------------------------------------------------
+
+class Moves(object):
+    """
+    Move rows of all paths, i.e. for ``GCodeFormatter`` and ``estimate_print``.
+
+    Args:
+        commands: Command code per row (1 for G1, ``RESET`` for G92 E0)
+        points: Array of shape (n, 3), NaN on reset rows
+        e: E value per row
+        f: Feedrate per row, NaN on reset rows
+        extruding: Boolean array, True for extruding rows
+        layers: Layer index per row
+    """
+
+    def __init__(self, commands, points, e, f, extruding, layers):
+        self.commands = commands
+        self.points = points
+        self.e = e
+        self.f = f
+        self.extruding = extruding
+        self.layers = layers
+
+    def __len__(self):
+        return len(self.commands)
+
+
+def build_moves(paths, layers, extrusion_rate, init_extrusion=0.0,
+                retraction=0.0, print_speed=1500.0, travel_speed=3000.0,
+                retraction_speed=1500.0, z_hop=0.0, offset=(0.0, 0.0),
+                tolerance=1e-3):
+    """
+    Create the move rows of all paths like the GenerateGCODE component: a
+    travel move to the first point lifted by ``z_hop``, the extrusion moves
+    (the first one at half the print speed), a retraction move lifted by
+    ``z_hop`` and a reset of the extrusion distance.
+
+    Args:
+        paths: List of point arrays
+        layers: Layer index of every path, or an array of layer indices per
+                point of the path (i.e. for spiralized paths)
+        offset: XY translation of all points
+        tolerance: Points closer than this to their predecessor are skipped
+
+    Returns:
+        Moves: The move rows of all paths
+    """
+    if not len(paths):
+        empty = np.zeros(0)
+        return Moves(np.zeros(0, dtype=np.int64), np.zeros((0, 3)), empty,
+                     empty, np.zeros(0, dtype=bool),
+                     np.zeros(0, dtype=np.int64))
+    points = np.concatenate(paths).astype(np.float64)
+    points[:, :2] += offset
+    counts = np.array([len(p) for p in paths], dtype=np.int64)
+    offsets = np.r_[0, np.cumsum(counts)]
+    local = np.arange(len(points)) - np.repeat(offsets[:-1], counts)
+    dist = np.zeros(len(points))
+    dist[1:] = np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1))
+    dist[local == 0] = 0.0
+    keep = (local == 0) | (dist >= tolerance)
+    points, dist, local = points[keep], dist[keep], local[keep]
+    owner = np.repeat(np.arange(len(paths)), counts)[keep]
+    point_layers = np.concatenate([
+        np.broadcast_to(np.asarray(layer, dtype=np.int64), (len(p),))
+        for p, layer in zip(paths, layers)])[keep]
+    counts = np.bincount(owner, minlength=len(paths))
+    offsets = np.r_[0, np.cumsum(counts)]
+    # extrusion distance per point, restarting on every path
+    cum = np.cumsum(dist)
+    e = init_extrusion + extrusion_rate * (
+        cum - np.repeat(cum[offsets[:-1]], counts))
+    f = np.where(local == 0, 0.5 * print_speed, print_speed)
+
+    # three extra rows per path: travel, retraction and reset
+    npaths = len(paths)
+    rows = len(points) + 3 * npaths
+    first = offsets[:-1] + 3 * np.arange(npaths)
+    point_rows = np.arange(len(points)) + 3 * owner + 1
+    retract_rows = first + counts + 1
+    reset_rows = retract_rows + 1
+    commands = np.ones(rows, dtype=np.int64)
+    commands[reset_rows] = RESET
+    out_points = np.full((rows, 3), np.nan)
+    out_e = np.zeros(rows)
+    out_f = np.full(rows, np.nan)
+    extruding = np.zeros(rows, dtype=bool)
+    out_layers = np.zeros(rows, dtype=np.int64)
+
+    out_points[point_rows] = points
+    out_e[point_rows] = e
+    out_f[point_rows] = f
+    extruding[point_rows] = True
+    out_layers[point_rows] = point_layers
+    out_layers[first] = point_layers[offsets[:-1]]
+    out_layers[retract_rows] = out_layers[reset_rows] = \
+        point_layers[offsets[1:] - 1]
+    # travel to the lifted first point
+    out_points[first] = points[offsets[:-1]] + (0.0, 0.0, z_hop)
+    out_f[first] = travel_speed
+    # retract at the lifted last point
+    out_points[retract_rows] = points[offsets[1:] - 1] + (0.0, 0.0, z_hop)
+    out_e[retract_rows] = e[offsets[1:] - 1] - retraction
+    out_f[retract_rows] = retraction_speed
+    return Moves(commands, out_points, out_e, out_f, extruding, out_layers)
@@ -0,0 +1,290 @@
+"""
+Vectorized trim domains of the AnalysisTrimCurves component.
+
+The parameters of many curves are stored in a CSR-style layout: two flat
+arrays ``a`` and ``b`` with the start and end parameters of all analysis
+intervals of all curves, and an ``offsets`` array of length
+``curve_count + 1`` so that the parameters of curve ``k`` are
+``a[offsets[k]:offsets[k + 1]]``.
+
+For every curve, the trim domain ``i`` spans from the midpoint of interval
+``i - 1`` to the midpoint of interval ``i``. The first domain wraps around
+the seam, it starts at the midpoint of the last interval. Before computing
+the midpoints, the seam is clamped:
+
+    - if the first interval starts after its end and at the very end of the
+      curve (a > 0.999), it starts at 0.0
+    - if the last interval ends before its start and at the very start of
+      the curve (b <= 0.001), it ends at 1.0
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# seam clamp thresholds (normalized curve parameters)
+SEAM_START = 0.999
+SEAM_END = 0.001
+
+
+def offsets_from_counts(counts):
+    """Return the CSR offsets of lists with the given item counts."""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def flatten(lists):
+    """
+    Flatten a sequence of float sequences into a flat float64 array and
+    CSR offsets.
+    """
+    lists = [list(lst) for lst in lists]
+    offsets = offsets_from_counts([len(lst) for lst in lists])
+    flat = np.fromiter((v for lst in lists for v in lst), dtype=np.float64,
+                       count=int(offsets[-1]))
+    return flat, offsets
+
+
+def batch_domains(a, b, offsets):
+    """
+    Compute the trim domains of many curves in one vectorized pass.
+
+    Args:
+        a: Flat array of interval start parameters
+        b: Flat array of interval end parameters
+        offsets: CSR offsets of the curves, length ``curve_count + 1``
+
+    Returns:
+        tuple: (starts, ends) flat float64 arrays of the domains, using the
+               same offsets as the input
+    """
+    a = np.array(a, dtype=np.float64)
+    b = np.array(b, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if a.shape != b.shape:
+        raise ValueError('List counts do not match!')
+    if offsets[-1] != len(a):
+        raise ValueError('Offsets do not match the parameter count!')
+    # first and last item of every non-empty curve
+    nonempty = offsets[1:] > offsets[:-1]
+    first = offsets[:-1][nonempty]
+    last = offsets[1:][nonempty] - 1
+    # seam clamps, the first clamp is applied before the second one is
+    # evaluated (this matters for single interval curves)
+    clamp = (a[first] > b[first]) & (a[first] > SEAM_START)
+    a[first[clamp]] = 0.0
+    clamp = (b[last] < a[last]) & (b[last] <= SEAM_END)
+    b[last[clamp]] = 1.0
+    mid = (a + b) * 0.5
+    # every domain starts at the midpoint of the previous interval, the
+    # first one at the midpoint of the last interval of the same curve
+    prev = np.arange(-1, len(mid) - 1, dtype=np.int64)
+    prev[first] = last
+    return mid[prev], mid
+
+
+def domains(a, b):
+    """Compute the trim domains of a single curve."""
+    offsets = np.array([0, len(a)], dtype=np.int64)
+    return batch_domains(a, b, offsets)
+
+
+class LazyTrims(object):
+    """
+    Subcurves of trim domains which are only created on demand.
+
+    Trimming is deferred until a subcurve is requested and every subcurve
+    is memoized, so consumers which only need the domains never allocate
+    curves.
+
+    Args:
+        trim: Callable ``trim(curve_index, start, end)`` returning the
+              subcurve (i.e. ``curves[k].Trim(start, end)``)
+        starts: Flat array of domain starts
+        ends: Flat array of domain ends
+        offsets: CSR offsets of the curves, defaults to a single curve
+    """
+
+    def __init__(self, trim, starts, ends, offsets=None):
+        self._trim = trim
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        if offsets is None:
+            offsets = np.array([0, len(self.starts)], dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._memo = {}
+
+    @property
+    def count(self):
+        """Total number of domains."""
+        return len(self.starts)
+
+    @property
+    def curve_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def trimmed(self):
+        """Number of subcurves created so far."""
+        return len(self._memo)
+
+    def get(self, index, curve=0):
+        """Return subcurve ``index`` of curve ``curve``."""
+        lo = int(self.offsets[curve])
+        hi = int(self.offsets[curve + 1])
+        if index < 0:
+            index += hi - lo
+        if not 0 <= index < hi - lo:
+            raise IndexError('Domain index out of range!')
+        flat = lo + index
+        if flat not in self._memo:
+            self._memo[flat] = self._trim(curve, float(self.starts[flat]),
+                                          float(self.ends[flat]))
+        return self._memo[flat]
+
+    def curve(self, curve=0):
+        """Return all subcurves of curve ``curve``."""
+        count = int(self.offsets[curve + 1] - self.offsets[curve])
+        return [self.get(i, curve) for i in range(count)]
+
+    def __repr__(self):
+        return 'LazyTrims({0} domains, {1} trimmed)'.format(self.count,
+                                                            self.trimmed)
+
+
+# REFERENCE AND VALIDATION -----------------------------------------------------
+
+def reference_domains(a, b):
+    """
+    Pure Python reference implementation of the trim domains of a single
+    curve, following the original loop of the AnalysisTrimCurves component.
+
+    Returns:
+        list: [(start, end)] of all domains
+    """
+    a = list(a)
+    b = list(b)
+    result = []
+    for i in range(len(a)):
+        if i == 0:
+            if a[i] > b[i] and a[i] > SEAM_START:
+                a[i] = 0.0
+            if b[-1] < a[-1] and b[-1] <= SEAM_END:
+                b[-1] = 1.0
+            ai = (a[-1] + b[-1]) * 0.5
+            bi = (a[i] + b[i]) * 0.5
+        elif i < len(a) - 1:
+            ai = (a[i - 1] + b[i - 1]) * 0.5
+            bi = (a[i] + b[i]) * 0.5
+        else:
+            ai = result[-1][1]
+            bi = result[0][0]
+        result.append((ai, bi))
+    return result
+
+
+def validate_domains(starts, ends, offsets, period=1.0, tol=1e-9):
+    """
+    Check the invariants of the domains of closed curves with a parameter
+    domain of length ``period``:
+
+        - chaining: every domain starts where the previous one ends and the
+          first domain starts where the last one ends (wrap-around)
+        - coverage: the domains cover the whole curve exactly once, i.e.
+          their lengths (modulo the period) sum up to the period, so there
+          are no gaps or overlaps
+
+    Curves with a single domain are skipped as their domain is degenerate.
+
+    Returns:
+        list: Indices of the curves violating an invariant
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    valid = counts > 1
+    nonempty = counts > 0
+    # chaining, including the wrap-around from the last to the first domain
+    nxt = np.arange(1, len(starts) + 1, dtype=np.int64)
+    nxt[offsets[1:][nonempty] - 1] = offsets[:-1][nonempty]
+    curve = np.repeat(np.arange(len(counts)), counts)
+    chained = np.abs(starts[nxt] - ends) <= tol
+    chained[~valid[curve]] = True
+    # coverage, the length of every domain modulo the period
+    lengths = np.bincount(curve, weights=np.mod(ends - starts, period),
+                          minlength=len(counts))
+    covered = np.abs(lengths - period) <= tol * np.maximum(1, counts)
+    bad = valid & ~covered
+    bad[curve[~chained]] = True
+    return np.flatnonzero(bad).tolist()
+
+
+def random_parameters(curve_count, max_count=64, seed=0, seam_ratio=0.2,
+                      min_count=2):
+    """
+    Create random, sorted analysis parameters of closed curves in the CSR
+    layout with ``min_count`` to ``max_count`` intervals per curve. A
+    ``seam_ratio`` of the curves has an interval crossing the seam, half of
+    them as their last interval, the other half as their first one.
+
+    Returns:
+        tuple: (a, b, offsets)
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(min_count, max_count + 1, size=curve_count)
+    offsets = offsets_from_counts(counts)
+    total = int(offsets[-1])
+    # sorted, distinct breakpoints per curve, clear of the seam thresholds
+    t = rng.random(total)
+    curve = np.repeat(np.arange(curve_count), counts)
+    t = np.sort(t + curve) - curve
+    t = SEAM_END + t * (SEAM_START - SEAM_END)
+    # every interval spans a fraction of the gap to the next breakpoint
+    nxt = np.roll(t, -1)
+    first = offsets[:-1][counts > 0]
+    last = offsets[1:][counts > 0] - 1
+    nxt[last] = t[first] + 1.0
+    a = t
+    b = np.minimum(t + (nxt - t) * 0.5, 1.0)
+    # intervals crossing the seam
+    seam = rng.random(len(first)) < seam_ratio
+    at_end = rng.random(len(first)) < 0.5
+    crossing = last[seam & at_end]
+    b[crossing] = rng.random(len(crossing)) * SEAM_END
+    crossing = first[seam & ~at_end]
+    a[crossing] = SEAM_START + rng.random(len(crossing)) * (1.0 - SEAM_START)
+    b[crossing] = rng.random(len(crossing)) * SEAM_END
+    return a, b, offsets
+
+
+def check_properties(seeds=range(200), curve_count=500, max_count=8):
+    """
+    Check the domains of random curves for many ``seeds``, including single
+    interval curves and intervals crossing the seam at the first and the
+    last interval: every curve has to match ``reference_domains`` exactly
+    and satisfy the invariants of ``validate_domains``.
+
+    Returns:
+        list: Descriptions of all violations, empty if there are none
+    """
+    violations = []
+    for seed in seeds:
+        a, b, offsets = random_parameters(curve_count, max_count, seed,
+                                          seam_ratio=0.5, min_count=1)
+        starts, ends = batch_domains(a, b, offsets)
+        for k in validate_domains(starts, ends, offsets):
+            violations.append('seed {0}, curve {1}: invariant violated'
+                              .format(seed, k))
+        for k in range(curve_count):
+            lo, hi = offsets[k], offsets[k + 1]
+            ref = reference_domains(a[lo:hi].tolist(), b[lo:hi].tolist())
+            if ref != list(zip(starts[lo:hi].tolist(),
+                               ends[lo:hi].tolist())):
+                violations.append('seed {0}, curve {1}: differs from the '
+                                  'reference'.format(seed, k))
+    return violations
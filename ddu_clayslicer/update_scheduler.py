@@ -0,0 +1,122 @@
+"""
+Debounced, event-coalescing update scheduler.
+
+Used by the PipelineController component to coalesce bursts of Rhino
+document events (i.e. dragging a large selection or pasting hundreds of
+objects) into a single re-solve. Events are recorded with the layer index
+of the affected object; layers which are not watched never trigger an
+update.
+
+An update becomes due once no relevant event has been recorded for
+``quiet`` seconds, or at the latest ``max_latency`` seconds after the first
+relevant event of the burst.
+
+This module does not depend on Rhino or Grasshopper.
+
+Author: Max Benjamin Eschenbach
+License: MIT License
+Version: 261018
+"""
+
+# PYTHON STANDARD LIBRARY IMPORTS
+import time
+
+# default quiet period and maximum latency in seconds
+DEFAULT_QUIET = 0.25
+DEFAULT_MAX_LATENCY = 1.0
+
+
+class DebouncedScheduler(object):
+    """
+    Coalesces touched layer indices into debounced updates.
+
+    Args:
+        quiet: Seconds without relevant events before an update is due
+        max_latency: Maximum seconds between the first relevant event and
+                     the update, even if events keep coming in
+        clock: Monotonic clock returning seconds
+    """
+
+    def __init__(self, quiet=DEFAULT_QUIET, max_latency=DEFAULT_MAX_LATENCY,
+                 clock=time.monotonic):
+        self.quiet = quiet
+        self.max_latency = max_latency
+        self.clock = clock
+        # None watches all layers
+        self.watched = None
+        self.touched = set()
+        self.first = None
+        self.last = None
+        self.events = 0
+        self.ignored = 0
+
+    def configure(self, quiet=None, max_latency=None):
+        """Update the quiet period and/or the maximum latency."""
+        if quiet is not None:
+            self.quiet = max(0.0, quiet)
+        if max_latency is not None:
+            self.max_latency = max(0.0, max_latency)
+
+    def watch(self, layer_indices):
+        """Set the layer indices which trigger updates (None for all)."""
+        self.watched = None if layer_indices is None else set(layer_indices)
+        if self.watched is not None:
+            self.touched &= self.watched
+            if not self.touched:
+                self.reset()
+
+    @property
+    def pending(self):
+        """True if relevant events are waiting for an update."""
+        return self.first is not None
+
+    def touch(self, layer_indices):
+        """
+        Record an event which affected objects on ``layer_indices``.
+
+        Returns:
+            bool: True if the event touched a watched layer
+        """
+        self.events += 1
+        if self.watched is None:
+            relevant = set(layer_indices)
+        else:
+            relevant = self.watched.intersection(layer_indices)
+        if not relevant:
+            self.ignored += 1
+            return False
+        now = self.clock()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.touched.update(relevant)
+        return True
+
+    def remaining(self):
+        """
+        Seconds until the pending update is due, 0.0 if it is due now and
+        None if nothing is pending.
+        """
+        if self.first is None:
+            return None
+        now = self.clock()
+        wait = min(self.last + self.quiet, self.first + self.max_latency) - now
+        return max(0.0, wait)
+
+    def take(self):
+        """
+        Return the touched layer indices and reset the scheduler if an
+        update is due, otherwise return None.
+        """
+        remaining = self.remaining()
+        if remaining is None or remaining > 0.0:
+            return None
+        touched = self.touched
+        self.reset()
+        return touched
+
+    def reset(self):
+        """Discard all pending events."""
+        self.touched = set()
+        self.first = None
+        self.last = None
@@ -3,6 +3,22 @@ import System
 import Rhino
 import Grasshopper
 
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+try:
+    from ddu_clayslicer.instrumentation import timed
+except ImportError:
+    def timed(*args, **kwargs):
+        return lambda func: func
+try:
+    from ddu_clayslicer.trim_domains import LazyTrims
+    from ddu_clayslicer.trim_domains import domains as trim_domains
+except ImportError:
+    LazyTrims = None
+    trim_domains = None
+
 # GHENV COMPONENT SETTINGS
 ghenv.Component.Name = "AnalysisTrimCurves"
 ghenv.Component.NickName = "AnalysisTrimCurves"
@@ -13,12 +29,19 @@ class AnalysisTrimCurves(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach
     License: MIT License
-    Version: 250429
+    Version: 261018
+
+    If Lazy is enabled, no subcurves are created upfront. SubCurves then is
+    a single LazyTrims object which trims (and memoizes) a subcurve once it
+    is requested using its get(i) method, i.e. in a downstream script.
+    Starts and Ends output the parameters of all domains.
     """
+    @timed("AnalysisTrimCurves", store=st)
     def RunScript(self,
             A: System.Collections.Generic.List[float],
             B: System.Collections.Generic.List[float],
-            C: Rhino.Geometry.Curve):
+            C: Rhino.Geometry.Curve,
+            Lazy: bool):
 
         if not A or not B or not C:
             rml = ghenv.Component.RuntimeMessageLevel.Warning
@@ -35,6 +58,8 @@ class AnalysisTrimCurves(Grasshopper.Kernel.GH_ScriptInstance):
                     rml,
                     'Input Parameter A failed to collect Data!')
             return (Grasshopper.DataTree[object](),
+                    Grasshopper.DataTree[object](),
+                    Grasshopper.DataTree[object](),
                     Grasshopper.DataTree[object]())
 
         A = list(A)
@@ -45,8 +70,29 @@ class AnalysisTrimCurves(Grasshopper.Kernel.GH_ScriptInstance):
                 ghenv.Component.RuntimeMessageLevel.Error,
                 'List counts do not match!')
             return (Grasshopper.DataTree[object](),
+                    Grasshopper.DataTree[object](),
+                    Grasshopper.DataTree[object](),
                     Grasshopper.DataTree[object]())
 
+        # vectorized domains if the ddu_clayslicer library is available
+        if trim_domains is not None:
+            starts, ends = trim_domains(A, B)
+            Starts = starts.tolist()
+            Ends = ends.tolist()
+            domains = [Rhino.Geometry.Interval(ai, bi)
+                       for ai, bi in zip(Starts, Ends)]
+            # defer trimming until a subcurve is requested
+            if Lazy:
+                lazy = LazyTrims(lambda k, t0, t1: C.Trim(t0, t1),
+                                 starts, ends)
+                return ([lazy], domains, Starts, Ends)
+            subcrvs = [C.Trim(ai, bi) for ai, bi in zip(Starts, Ends)]
+            return (subcrvs, domains, Starts, Ends)
+        elif Lazy:
+            ghenv.Component.AddRuntimeMessage(
+                ghenv.Component.RuntimeMessageLevel.Warning,
+                'Lazy trimming requires the ddu_clayslicer library!')
+
         domains = []
         subcrvs = []
         # loop over all domains
@@ -77,4 +123,5 @@ class AnalysisTrimCurves(Grasshopper.Kernel.GH_ScriptInstance):
             subcrv = C.Trim(ai, bi)
             subcrvs.append(subcrv)
 
-        return (subcrvs, domains)
+        return (subcrvs, domains,
+                [d.T0 for d in domains], [d.T1 for d in domains])
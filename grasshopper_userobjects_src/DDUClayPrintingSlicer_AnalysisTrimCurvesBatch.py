@@ -0,0 +1,115 @@
+# RHINO SDK IMPORTS
+import System
+import Rhino
+import Grasshopper
+
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+from ddu_clayslicer.trim_domains import LazyTrims, batch_domains, flatten
+from ddu_clayslicer.instrumentation import timed
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "AnalysisTrimCurvesBatch"
+ghenv.Component.NickName = "AnalysisTrimCurvesBatch"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "9 Utilities"
+
+class AnalysisTrimCurvesBatch(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Batch version of AnalysisTrimCurves. Takes whole trees of analysis
+    parameters (A, B) and curves (C, one curve per branch of A or a flat
+    list with one curve per branch of A) and computes the trim domains of
+    all curves in one vectorized pass. The outputs keep the paths of A.
+
+    If Lazy is enabled, no subcurves are created upfront. SubCurves then is
+    a single LazyTrims object which trims (and memoizes) subcurve i of
+    branch k once it is requested using its get(i, k) method, i.e. in a
+    downstream script. Starts and Ends output the parameters of all domains.
+    """
+
+    def getCurves(self, A, C):
+        # a flat list of curves is matched with the branches of A
+        if C.BranchCount == 1 and C.DataCount == A.BranchCount:
+            return list(C.Branch(0))
+        # otherwise use the first curve of every branch (longest list)
+        curves = []
+        for i in range(A.BranchCount):
+            branch = C.Branch(min(i, C.BranchCount - 1))
+            curves.append(branch[0] if branch.Count else None)
+        return curves
+
+    @timed("AnalysisTrimCurvesBatch", store=st)
+    def RunScript(self,
+            A: Grasshopper.DataTree[float],
+            B: Grasshopper.DataTree[float],
+            C: Grasshopper.DataTree[Rhino.Geometry.Curve],
+            Lazy: bool):
+
+        SubCurves = Grasshopper.DataTree[object]()
+        Domains = Grasshopper.DataTree[object]()
+        Starts = Grasshopper.DataTree[object]()
+        Ends = Grasshopper.DataTree[object]()
+
+        if A.DataCount == 0 or B.DataCount == 0 or C.DataCount == 0:
+            rml = ghenv.Component.RuntimeMessageLevel.Warning
+            for name, tree in (("A", A), ("B", B), ("C", C)):
+                if tree.DataCount == 0:
+                    ghenv.Component.AddRuntimeMessage(
+                        rml,
+                        'Input Parameter {0} failed to collect Data!'.format(name))
+            return SubCurves, Domains, Starts, Ends
+
+        if A.BranchCount != B.BranchCount:
+            ghenv.Component.AddRuntimeMessage(
+                ghenv.Component.RuntimeMessageLevel.Error,
+                'Branch counts do not match!')
+            return SubCurves, Domains, Starts, Ends
+
+        a, offsets = flatten(A.Branches)
+        b, b_offsets = flatten(B.Branches)
+        if len(a) != len(b) or (offsets != b_offsets).any():
+            ghenv.Component.AddRuntimeMessage(
+                ghenv.Component.RuntimeMessageLevel.Error,
+                'List counts do not match!')
+            return SubCurves, Domains, Starts, Ends
+
+        # all domains of all curves in one pass
+        starts_arr, ends_arr = batch_domains(a, b, offsets)
+        starts = starts_arr.tolist()
+        ends = ends_arr.tolist()
+
+        curves = self.getCurves(A, C)
+        missing = 0
+        for k, path in enumerate(A.Paths):
+            crv = curves[k]
+            lo, hi = int(offsets[k]), int(offsets[k + 1])
+            Domains.AddRange([Rhino.Geometry.Interval(ai, bi) for ai, bi
+                              in zip(starts[lo:hi], ends[lo:hi])], path)
+            Starts.AddRange(starts[lo:hi], path)
+            Ends.AddRange(ends[lo:hi], path)
+            if not crv and hi > lo:
+                missing += 1
+            if Lazy:
+                continue
+            SubCurves.AddRange([crv.Trim(ai, bi) if crv else None
+                                for ai, bi in zip(starts[lo:hi], ends[lo:hi])],
+                               path)
+
+        # defer trimming until a subcurve is requested
+        if Lazy:
+            def trim(k, t0, t1):
+                return curves[k].Trim(t0, t1) if curves[k] else None
+            SubCurves.Add(LazyTrims(trim, starts_arr, ends_arr, offsets))
+
+        if missing:
+            ghenv.Component.AddRuntimeMessage(
+                ghenv.Component.RuntimeMessageLevel.Warning,
+                '{0} branches have no curve to trim!'.format(missing))
+
+        return SubCurves, Domains, Starts, Ends
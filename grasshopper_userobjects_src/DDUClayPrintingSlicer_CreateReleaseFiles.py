@@ -6,7 +6,10 @@
 # r: scikit-learn==1.4.2
 
 # PYTHON STANDARD LIBRARY IMPORTS ---------------------------------------------
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # RHINO AND GH RELATED IMPORTS ------------------------------------------------
@@ -26,20 +29,28 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach
     License: MIT License
-    Version: 250911
+    Version: 261018
 
     This component can be used to create a Grasshopper release file in a
     separate folder.
 
     It creates a copy of the current Grasshopper document in
-    memory, removes all components that belong to a specified group (i.e.
-    development components), and saves the modified document to a specified
-    folder.
+    memory, removes all components that belong to the specified group(s)
+    (i.e. development components), and saves the modified document to a
+    specified folder.
 
     The folder path can be relative, i.e. "..\\grasshopper_release".
 
     The filename can be specified, otherwise a timestamp-based filename will be
     generated.
+
+    If Variants are supplied, several release files are built from one
+    snapshot of the current document. Every variant is a JSON object string
+    with the keys "filename", "groups" and "panels", i.e.
+    {"filename": "Student", "groups": ["DEV", "PRO"], "panels": ["Key"]}.
+    Missing groups or panels default to the RemoveGroupName and
+    ClearPanelNames inputs. The files are saved in parallel and a report with
+    the removed counts and timings of every variant is returned.
     """
 
     def __init__(self):
@@ -115,34 +126,59 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
         # return target groups and objects
         return panels_cleared
 
-    def find_groups_and_objects(self, doc, group_name, panel_names=[]):
+    def index_document(self, doc):
         """
-        Find all groups and objects in the document with the specified name.
+        Index all groups and panels of a document in one pass over its
+        objects.
+
+        Args:
+            doc: The Grasshopper document to index
+
+        Returns:
+            dict: {'groups': {nickname: [GH_Group]},
+                   'panels': {nickname: [GH_Panel]}}
         """
-        # get type for groups as string for verification
         grouptype = Grasshopper.Kernel.Special.GH_Group
-        grouptype_str = str(grouptype).split("'")[1]
-        # get type for panels as string for verification
         paneltype = Grasshopper.Kernel.Special.GH_Panel
-        paneltype_str = str(paneltype).split("'")[1]
-        # loop over all document objects
-        doc_objects = doc.Objects
+        index = {'groups': {}, 'panels': {}}
+        for doc_obj in doc.Objects:
+            if isinstance(doc_obj, grouptype):
+                key = 'groups'
+            elif isinstance(doc_obj, paneltype):
+                key = 'panels'
+            else:
+                continue
+            index[key].setdefault(doc_obj.NickName, []).append(doc_obj)
+        return index
+
+    def find_groups_and_objects(self, doc, group_names, panel_names=[],
+                                index=None):
+        """
+        Find all groups (and their objects) and panels in the document with
+        one of the specified names.
+        """
+        if isinstance(group_names, str):
+            group_names = [group_names]
         target_groups = []
         target_objects = []
         target_panels = []
         try:
-            for doc_obj in doc_objects:
-                # ensure matching group name
-                if doc_obj.NickName == group_name:
-                    # ensure matching type
-                    if str(doc_obj.GetType()) == grouptype_str:
-                        target_groups.append(doc_obj)
-                        for grp_obj in doc_obj.Objects():
+            if index is None:
+                index = self.index_document(doc)
+            # set based matching of group names
+            seen = set()
+            for group_name in set(group_names):
+                for grp in index['groups'].get(group_name, []):
+                    target_groups.append(grp)
+                    for grp_obj in grp.Objects():
+                        # objects can be part of several groups
+                        iguid = grp_obj.InstanceGuid
+                        if iguid not in seen:
+                            seen.add(iguid)
                             target_objects.append(grp_obj)
-                elif panel_names and doc_obj.NickName in panel_names:
-                    # ensure matching type
-                    if str(doc_obj.GetType()) == paneltype_str:
-                        target_panels.append(doc_obj)
+            # set based matching of panel names
+            for panel_name in set(panel_names or []):
+                target_panels.extend(index['panels'].get(panel_name, []))
         except Exception as e:
             self._addError(f'Error finding groups and objects: {str(e)}')
             return None, None, None
@@ -151,24 +187,75 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
 
     def remove_objects_from_doc(self, doc, objects, groups=None):
         """
-        Remove objects from the document.
+        Remove objects (and groups) from the document in one batch, the
+        document is only updated once at the end.
         """
-        components_removed = 0
         try:
-            # loop over objects and remove them
+            batch = System.Collections.Generic.List[
+                Grasshopper.Kernel.IGH_DocumentObject]()
             for obj in objects:
-                doc.RemoveObject(obj, True)
-                components_removed += 1
-            # loop over groups and remove them
+                batch.Add(obj)
             if groups:
                 for grp in groups:
-                    doc.RemoveObject(grp, True)
-                    components_removed += 1
+                    batch.Add(grp)
+            if batch.Count == 0:
+                return 0
+            doc.RemoveObjects(batch, True)
         except Exception as e:
             self._addError(f'Error removing objects from document: {str(e)}')
             return 0
         # return number of components removed
-        return components_removed
+        return batch.Count
+
+    def resolve_save_path(self, save_path):
+        """
+        Resolve a (relative) save folder against the folder of the current
+        Grasshopper document and make sure it exists.
+
+        Returns:
+            str: The absolute folder path, or '' if it could not be created
+        """
+        # Handle relative paths - get the current GH
+        # document directory as base
+        current_doc = self.Component.OnPingDocument()
+        if current_doc and current_doc.FilePath:
+            current_dir = os.path.dirname(current_doc.FilePath)
+            # Convert relative path to absolute path
+            if not os.path.isabs(save_path):
+                save_path = os.path.normpath(
+                    os.path.join(current_dir, save_path)
+                )
+        else:
+            # If no current document, use current working directory
+            save_path = os.path.abspath(os.path.normpath(save_path))
+
+        # Ensure the save directory exists
+        if not os.path.exists(save_path):
+            try:
+                os.makedirs(save_path, exist_ok=True)
+                self._addRemark(f'Created directory: {save_path}')
+            except Exception as e:
+                self._addError(
+                    f'Failed to create directory {save_path}: '
+                    f'{str(e)}'
+                )
+                return ''
+        return save_path
+
+    def release_filename(self, filename=None):
+        """
+        Return the filename of a release file, generates a timestamp-based
+        filename if none is supplied and ensures the .gh extension.
+        """
+        # Generate filename if not provided
+        if not filename:
+            timestamp = datetime.now().strftime('%y%m%d_%H%M%S')
+            filename = f'{timestamp}_ReleaseFile.gh'
+
+        # Ensure filename has .gh extension
+        if not filename.endswith('.gh'):
+            filename += '.gh'
+        return filename
 
     def save_document(self, doc, save_path, filename=None):
         """
@@ -192,43 +279,13 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
                 self._addError('Save path is empty')
                 return False, ''
 
-            # Handle relative paths - get the current GH
-            # document directory as base
-            current_doc = self.Component.OnPingDocument()
-            if current_doc and current_doc.FilePath:
-                current_dir = os.path.dirname(current_doc.FilePath)
-                # Convert relative path to absolute path
-                if not os.path.isabs(save_path):
-                    save_path = os.path.normpath(
-                        os.path.join(current_dir, save_path)
-                    )
-            else:
-                # If no current document, use current working directory
-                save_path = os.path.abspath(os.path.normpath(save_path))
-
-            # Ensure the save directory exists
-            if not os.path.exists(save_path):
-                try:
-                    os.makedirs(save_path, exist_ok=True)
-                    self._addRemark(f'Created directory: {save_path}')
-                except Exception as e:
-                    self._addError(
-                        f'Failed to create directory {save_path}: '
-                        f'{str(e)}'
-                    )
-                    return False, ''
-
-            # Generate filename if not provided
-            if not filename:
-                timestamp = datetime.now().strftime('%y%m%d_%H%M%S')
-                filename = f'{timestamp}_ReleaseFile.gh'
-
-            # Ensure filename has .gh extension
-            if not filename.endswith('.gh'):
-                filename += '.gh'
+            save_path = self.resolve_save_path(save_path)
+            if not save_path:
+                return False, ''
 
             # Create full file path
-            full_path = os.path.join(save_path, filename)
+            full_path = os.path.join(save_path,
+                                     self.release_filename(filename))
 
             # Use GH_DocumentIO to save the document
             # (following SaveAndSaveGHX pattern)
@@ -247,18 +304,193 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
             self._addError(f'Error saving document: {str(e)}')
             return False, ''
 
-    def validate_inputs(self, group_name, clear_panel_names, save_path):
+    def snapshot_document(self, source_doc):
+        """
+        Serialize the source document once into an in-memory binary
+        archive. Every release variant is derived from this snapshot.
+
+        Returns:
+            GH_Archive: The snapshot archive, or None if failed
+        """
+        try:
+            archive = Grasshopper.Kernel.GH_Archive()
+            if not archive.AppendObject(source_doc, 'Definition'):
+                self._addError('Failed to serialize the document')
+                return None
+            # a binary round trip decouples the snapshot from the live doc
+            snapshot = Grasshopper.Kernel.GH_Archive()
+            if not snapshot.Deserialize_Binary(archive.Serialize_Binary()):
+                self._addError('Failed to snapshot the document')
+                return None
+            return snapshot
+        except Exception as e:
+            self._addError(f'Error serializing document: {str(e)}')
+            return None
+
+    def document_from_snapshot(self, snapshot):
+        """
+        Create a new, independent Grasshopper document from a snapshot.
+
+        Returns:
+            GH_Document: The new document, or None if failed
+        """
+        try:
+            doc = Grasshopper.Kernel.GH_Document()
+            if not snapshot.ExtractObject(doc, 'Definition'):
+                self._addError('Failed to restore document from snapshot')
+                return None
+            return doc
+        except Exception as e:
+            self._addError(f'Error restoring document: {str(e)}')
+            return None
+
+    def parse_variants(self, variants, group_names, panel_names):
+        """
+        Parse release variant specs. Every spec is a JSON object string with
+        the keys "filename", "groups" (group names to remove) and "panels"
+        (panel names to clear), i.e.:
+            {"filename": "Student", "groups": ["DEV", "PRO"]}
+        Missing groups and panels default to the RemoveGroupName and
+        ClearPanelNames inputs.
+
+        Returns:
+            list: [{'filename': str, 'groups': list, 'panels': list}] or
+                  None if a spec is invalid
+        """
+        parsed = []
+        for i, spec in enumerate(variants):
+            try:
+                data = json.loads(spec)
+            except (TypeError, ValueError) as e:
+                self._addError(f'Variant {i} is not valid JSON: {str(e)}')
+                return None
+            if not isinstance(data, dict):
+                self._addError(f'Variant {i} is not a JSON object')
+                return None
+            groups = data.get('groups', group_names)
+            panels = data.get('panels', panel_names)
+            if isinstance(groups, str):
+                groups = [groups]
+            if isinstance(panels, str):
+                panels = [panels]
+            parsed.append({
+                'filename': self.release_filename(data.get('filename')),
+                'groups': list(groups or []),
+                'panels': list(panels or []),
+            })
+        filenames = [v['filename'].lower() for v in parsed]
+        if len(set(filenames)) != len(filenames):
+            self._addError('Variant filenames have to be unique')
+            return None
+        return parsed
+
+    def write_archive(self, archive, full_path):
+        """Write an archive to disk, called from the save worker threads."""
+        t0 = time.perf_counter()
+        success = archive.WriteToFile(full_path, True, False)
+        return success, time.perf_counter() - t0
+
+    def build_variants(self, source_doc, variants, save_path):
+        """
+        Build several release files from one snapshot of the source document.
+
+        The source document is serialized once, every variant is restored
+        from the snapshot, edited and serialized on the calling thread, while
+        the (compressing) file writes run in parallel.
+
+        Returns:
+            tuple: (success, total_removed, saved_paths, report)
+        """
+        save_path = self.resolve_save_path(save_path)
+        if not save_path:
+            return False, 0, [], []
+
+        t0 = time.perf_counter()
+        snapshot = self.snapshot_document(source_doc)
+        if snapshot is None:
+            return False, 0, [], []
+        snapshot_time = time.perf_counter() - t0
+
+        rows = []
+        jobs = []
+        with ThreadPoolExecutor(
+                max_workers=min(8, max(1, len(variants)))) as pool:
+            for variant in variants:
+                row = {'filename': variant['filename'], 'removed': 0,
+                       'cleared': 0, 'path': '', 'timings': []}
+                rows.append(row)
+                t0 = time.perf_counter()
+                doc = self.document_from_snapshot(snapshot)
+                if doc is None:
+                    continue
+                row['timings'].append(('derive', time.perf_counter() - t0))
+
+                t0 = time.perf_counter()
+                (target_groups,
+                    target_objects,
+                    target_panels) = self.find_groups_and_objects(
+                    doc, variant['groups'], variant['panels'])
+                if target_groups is None:
+                    continue
+                if target_panels:
+                    row['cleared'] = self.clear_panels(doc, target_panels)
+                row['removed'] = self.remove_objects_from_doc(
+                    doc, target_objects, target_groups)
+                row['timings'].append(('edit', time.perf_counter() - t0))
+
+                t0 = time.perf_counter()
+                archive = Grasshopper.Kernel.GH_Archive()
+                if not archive.AppendObject(doc, 'Definition'):
+                    self._addError(
+                        f'Failed to serialize variant {variant["filename"]}')
+                    continue
+                row['timings'].append(('serialize',
+                                       time.perf_counter() - t0))
+                full_path = os.path.join(save_path, variant['filename'])
+                jobs.append((row, full_path,
+                             pool.submit(self.write_archive, archive,
+                                         full_path)))
+
+            for row, full_path, future in jobs:
+                try:
+                    success, seconds = future.result()
+                except Exception as e:
+                    self._addError(f'Error saving {full_path}: {str(e)}')
+                    continue
+                if success:
+                    row['path'] = os.path.normpath(full_path)
+                    row['timings'].append(('save', seconds))
+                else:
+                    self._addError(f'Failed to save document to: {full_path}')
+
+        report = [f'snapshot: {snapshot_time:.3f} s']
+        for row in rows:
+            timings = ', '.join(f'{stage} {seconds:.3f} s'
+                                for stage, seconds in row['timings'])
+            status = row['path'] or 'NOT SAVED'
+            report.append(f'{row["filename"]}: removed {row["removed"]}, '
+                          f'cleared {row["cleared"]} panels, {status} '
+                          f'({timings})')
+        saved_paths = [row['path'] for row in rows if row['path']]
+        total_removed = sum(row['removed'] for row in rows)
+        return (len(saved_paths) == len(rows), total_removed, saved_paths,
+                report)
+
+    def validate_inputs(self, group_names, clear_panel_names, save_path,
+                        require_groups=True):
         """
         Validate the input parameters.
 
         Args:
-            group_name: The name of the group to remove
+            group_names: The name(s) of the group(s) to remove
             save_path: The path where to save the document
+            require_groups: If False, group_names may be empty (variants)
 
         Returns:
             bool: True if inputs are valid, False otherwise
         """
-        if not group_name or not group_name.strip():
+        if (require_groups and not group_names) or not all(
+                isinstance(gn, str) and gn.strip() for gn in group_names):
             self._addError('Group name cannot be empty')
             return False
 
@@ -307,25 +539,27 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
 
     def RunScript(self,
             Run: bool,
-            RemoveGroupName: str,
+            RemoveGroupName: System.Collections.Generic.List[str],
             ClearPanelNames: System.Collections.Generic.List[str],
             ReleasePath: str,
-            Filename: str):
+            Filename: str,
+            Variants: System.Collections.Generic.List[str]):
         """
         Main execution method for the component.
 
         Args:
             Run: Boolean trigger to Run the operation
-            RemoveGroupName: Name of the group to remove components from
+            RemoveGroupName: Name(s) of the group(s) to remove components from
             ReleasePath: Path where to save the modified document
             Filename: Optional filename for the saved document
+            Variants: Optional JSON specs of several release variants
         """
         # Initialize param descriptions# Initialize param descriptions
         self.InputParams[0].Description = (
             'Run the document copy, object removal, and save operation'
         )
         self.InputParams[1].Description = (
-            'Name of the group(s) to remove for relese file'
+            'Name(s) of the group(s) to remove for release file'
         )
         self.InputParams[2].Description = (
             'List of names of optional GH_Panel objects to clear,'
@@ -338,6 +572,11 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
             'Optional filename for the saved document '
             '(without .gh extension)'
         )
+        self.InputParams[5].Description = (
+            'Optional list of release variants as JSON objects with the keys '
+            '"filename", "groups" and "panels". If supplied, one release '
+            'file is built per variant and Filename is ignored'
+        )
 
         # Initialize output param descriptions
         self.OutputParams[0].Description = (
@@ -352,6 +591,9 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
         self.OutputParams[3].Description = (
             'Status message describing the operation result'
         )
+        self.OutputParams[4].Description = (
+            'Per-variant report of removed counts, saved paths and timings'
+        )
 
         try:
             # Initialize output variables
@@ -359,21 +601,26 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
             components_removed = 0
             saved_file_path = ''
             status_message = ''
+            variant_report = []
 
             # Check if execution is requested
             if not Run:
                 status_message = 'Run is False - operation not performed'
                 self.Component.Message = status_message
                 return (success, components_removed, saved_file_path,
-                        status_message)
+                        status_message, variant_report)
 
             # Validate inputs
+            RemoveGroupName = list(RemoveGroupName or [])
+            group_names = ', '.join(RemoveGroupName)
+            Variants = list(Variants or [])
             if not self.validate_inputs(
-                    RemoveGroupName, ClearPanelNames, ReleasePath):
+                    RemoveGroupName, ClearPanelNames, ReleasePath,
+                    require_groups=not Variants):
                 status_message = 'Input validation failed'
                 self.Component.Message = status_message
                 return (success, components_removed, saved_file_path,
-                        status_message)
+                        status_message, variant_report)
 
             # Get the current Grasshopper document
             current_doc = self.Component.OnPingDocument()
@@ -382,7 +629,34 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
                 self._addError(status_message)
                 self.Component.Message = status_message
                 return (success, components_removed, saved_file_path,
-                        status_message)
+                        status_message, variant_report)
+
+            # Variant mode: build all release files from one snapshot
+            if Variants:
+                variants = self.parse_variants(
+                    Variants, RemoveGroupName, ClearPanelNames or [])
+                if variants is None:
+                    status_message = 'Invalid variant specs'
+                    self.Component.Message = status_message
+                    return (success, components_removed, saved_file_path,
+                            status_message, variant_report)
+                self.Component.Message = 'Building variants...'
+                (success,
+                    components_removed,
+                    saved_paths,
+                    variant_report) = self.build_variants(
+                    current_doc, variants, ReleasePath)
+                saved_file_path = '\n'.join(saved_paths)
+                status_message = (
+                    f'Saved {len(saved_paths)} of {len(variants)} variants, '
+                    f'removed {components_removed} components in total'
+                )
+                if success:
+                    self.Component.Message = 'Operation completed successfully'
+                else:
+                    self.Component.Message = 'Save operation failed'
+                return (success, components_removed, saved_file_path,
+                        status_message, variant_report)
 
             # Step 1: Copy the current document
             self.Component.Message = 'Copying document...'
@@ -391,7 +665,7 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
                 status_message = 'Failed to copy document'
                 self.Component.Message = status_message
                 return (success, components_removed, saved_file_path,
-                        status_message)
+                        status_message, variant_report)
 
             # Step 2: Find the specified group
             self.Component.Message = 'Finding groups...'
@@ -406,7 +680,7 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
                 status_message = 'Failed to find groups and objects'
                 self.Component.Message = status_message
                 return (success, components_removed, saved_file_path,
-                        status_message)
+                        status_message, variant_report)
 
             # Step 3: Clear Panels if ClearPanelNames were supplied
             if target_panels:
@@ -428,13 +702,13 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
             if components_removed == 0:
                 status_message = (
                     'No components were removed from '
-                    f'group "{RemoveGroupName}"'
+                    f'group "{group_names}"'
                 )
                 self._addWarning(status_message)
             else:
                 status_message = (
                     f'Removed {components_removed} components from group '
-                    f'"{RemoveGroupName}"'
+                    f'"{group_names}"'
                 )
             # Step 5: Save the modified document
             self.Component.Message = 'Saving document...'
@@ -455,10 +729,10 @@ class CreateReleaseFiles(Grasshopper.Kernel.GH_ScriptInstance):
                 self.Component.Message = 'Save operation failed'
 
             return (success, components_removed, saved_file_path,
-                    status_message)
+                    status_message, variant_report)
 
         except Exception as e:
             error_msg = f'Unexpected error: {str(e)}'
             self._addError(error_msg)
             self.Component.Message = 'Operation failed'
-            return (False, 0, '', error_msg)
+            return (False, 0, '', error_msg, [])
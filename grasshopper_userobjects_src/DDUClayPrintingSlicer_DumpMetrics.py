@@ -0,0 +1,88 @@
+# PYTHON STANDARD LIBRARY IMPORTS
+from os.path import basename
+
+# RHINO SDK IMPORTS
+import System
+import Rhino
+import Grasshopper
+
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+from ddu_clayslicer import instrumentation
+from ddu_clayslicer.paths import resolve_path
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "DumpMetrics"
+ghenv.Component.NickName = "DumpMetrics"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "0 Development"
+
+
+class DumpMetrics(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Enables the timing instrumentation of the slicer UserObjects and dumps
+    the collected per-component metrics (run durations and input sizes) as
+    CSV or JSON, depending on the file extension of Path. If Profile is
+    enabled, every instrumented RunScript call is captured using cProfile
+    and the profile summary is included in the records.
+    """
+
+    def RunScript(self,
+            Enable: bool,
+            Profile: bool,
+            Capacity: int,
+            Clear: bool,
+            Save: bool,
+            Path: str):
+        # enable or disable the instrumentation of all components
+        if Enable:
+            instrumentation.enable(profile=Profile)
+        else:
+            instrumentation.disable()
+        buf = instrumentation.get_buffer(st, Capacity if Capacity else None)
+        if Clear:
+            buf.clear()
+        # dump all records to csv or json
+        if Save:
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel
+            if not Path:
+                ghenv.Component.AddRuntimeMessage(rml.Warning,
+                                                  "No Path supplied!")
+            else:
+                doc = ghenv.Component.OnPingDocument()
+                try:
+                    fp = resolve_path(Path, doc.FilePath if doc else None)
+                    if fp.lower().endswith(".json"):
+                        instrumentation.dump_json(buf, fp)
+                    else:
+                        instrumentation.dump_csv(buf, fp)
+                except (IOError, OSError, ValueError) as e:
+                    ghenv.Component.AddRuntimeMessage(rml.Error, str(e))
+                else:
+                    ghenv.Component.AddRuntimeMessage(rml.Remark,
+                        "Wrote {0} records to {1}!".format(len(buf),
+                                                           basename(fp)))
+        # summarize per component
+        Summary = []
+        for row in buf.summary():
+            line = "{0}: {1} calls, {2:.3f} s total, {3:.4f} s mean, " \
+                   "{4:.4f} s max".format(row["component"], row["calls"],
+                                          row["total_s"], row["mean_s"],
+                                          row["max_s"])
+            if row["mean_size"] is not None:
+                line += ", {0:.0f} items mean".format(row["mean_size"])
+            Summary.append(line)
+        Records = len(buf)
+        if instrumentation.is_profiling():
+            ghenv.Component.Message = "Profiling"
+        elif instrumentation.is_enabled():
+            ghenv.Component.Message = "Timing"
+        else:
+            ghenv.Component.Message = "Disabled"
+        return Summary, Records
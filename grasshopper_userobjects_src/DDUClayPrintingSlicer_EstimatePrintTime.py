@@ -0,0 +1,94 @@
+# RHINO SDK IMPORTS
+import System
+import Rhino
+import Grasshopper
+
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+from ddu_clayslicer.gcode_parser import (parse_gcode, parse_header,
+                                         parse_lines, read_header)
+from ddu_clayslicer.print_time import (DEFAULT_ACCELERATION,
+                                       DEFAULT_JUNCTION_DEVIATION,
+                                       estimate_columns)
+from ddu_clayslicer.paths import resolve_path
+from ddu_clayslicer.instrumentation import timed
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "EstimatePrintTime"
+ghenv.Component.NickName = "EstimatePrintTime"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "9 Utilities"
+
+class EstimatePrintTime(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Estimates the print time and clay volume of GCODE (the output of
+    GenerateGCODE) or of a saved .gcode file (Path), using acceleration
+    limited moves (an Acceleration of 0 estimates constant speeds). Hours,
+    Minutes and Seconds can be connected to PrintingTimeInfo. LayerTimes
+    holds the time of every layer in seconds, Volume the clay volume in
+    litres (computed from the LINEWIDTH and LAYERHEIGHT of the GCODE
+    header).
+    """
+
+    @timed("EstimatePrintTime", store=st)
+    def RunScript(self,
+            GCODE: System.Collections.Generic.List[str],
+            Path: str,
+            Acceleration: float,
+            JunctionDeviation: float):
+
+        Hours = 0
+        Minutes = 0
+        Seconds = 0
+        LayerTimes = []
+        Volume = None
+
+        try:
+            if GCODE:
+                lines = list(GCODE)
+                columns = parse_lines(lines)
+                header = parse_header(lines)
+            elif Path:
+                doc = ghenv.Component.OnPingDocument()
+                fp = resolve_path(Path, doc.FilePath if doc else None)
+                columns = parse_gcode(fp)[0]
+                header = read_header(fp)
+            else:
+                ghenv.Component.AddRuntimeMessage(
+                    Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning,
+                    "Input Parameters GCODE and Path failed to collect Data!")
+                return Hours, Minutes, Seconds, LayerTimes, Volume
+        except (IOError, OSError, ValueError) as e:
+            ghenv.Component.AddRuntimeMessage(
+                Grasshopper.Kernel.GH_RuntimeMessageLevel.Error, str(e))
+            return Hours, Minutes, Seconds, LayerTimes, Volume
+
+        # header values which are not numbers (i.e. written using a decimal
+        # comma) are ignored
+        bead = [header.get(key, None) for key in ("LINEWIDTH", "LAYERHEIGHT")]
+        bead = [v if isinstance(v, float) else None for v in bead]
+
+        # an unconnected Acceleration uses the default, 0 constant speeds
+        if Acceleration is None:
+            Acceleration = DEFAULT_ACCELERATION
+        est = estimate_columns(
+            columns,
+            acceleration=Acceleration or None,
+            deviation=(JunctionDeviation if JunctionDeviation
+                       else DEFAULT_JUNCTION_DEVIATION),
+            line_width=bead[0],
+            layer_height=bead[1])
+
+        Hours, Minutes, Seconds = est.hours_minutes_seconds()
+        LayerTimes = est.layer_times()[1].tolist()
+        if est.volume is not None:
+            Volume = est.volume / 1e6
+        ghenv.Component.Message = est.summary()
+
+        return Hours, Minutes, Seconds, LayerTimes, Volume
@@ -3,11 +3,20 @@ import Rhino
 import Grasshopper
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 
 import GhPython as ghpy
 import ScriptComponents as scomp
 import RhinoCodePluginGH as rcpgh
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+# this development component requires the ddu_clayslicer library
+from ddu_clayslicer import document_scan
+from ddu_clayslicer.export_cache import (ExportManifest, hash_file,
+                                         manifest_path)
 
 # GHENV COMPONENT SETTINGS
 ghenv.Component.Name = "ExportScriptsAndSource"
@@ -20,189 +29,82 @@ class ExportScriptsAndSource(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach (based on a Python Script by Anders Holden Deleuran)
     License: MIT License
-    Version: 250415
+    Version: 261018
     """
 
+    # UNIQUE STICKY KEY FOR THE SESSION-WIDE TYPE DISPATCH TABLE
+    DISPATCHKEY = "DDUClayPrintingSlicer___SCRIPTDISPATCH"
+
     def get_source_version(self, source):
         """
-        Attempts to get the first instance of the word "version" (or, "Version")
-        in a multi line string. Then attempts to extract an integer from this line
-        where the word "version" exists. So format version YYMMDD in the
-        docstring like so (or any other integer system):
+        Get the version integer from the docstring header of a source, i.e.
             Version: 160121
+        See ddu_clayslicer.document_scan.get_source_version
         """
-        # Get first line with version in it
-        src_lower = source.lower()
-        version_str = [ln for ln in src_lower.split('\n') if "version" in ln]
-        if version_str:
-            # Get the first substring integer and return it
-            version_int = [int(s) for s in version_str[0].split() if s.isdigit()]
-            if version_int:
-                return int(version_int[0])
-        else:
-            return None
+        return document_scan.get_source_version(source)
 
-    def process_document_objects(self, ghdocument, verbose=False):
+    def get_dispatch_table(self):
         """
-        Processes GH_Document object and return a list of all script components
+        Returns a dispatch table mapping the type strings of all script (and
+        cluster) component types to their script type id and a source
+        extractor. The table is built only once per session and stored in
+        the sticky.
         """
-        # get all document objects
-        comps = list(ghdocument.Objects)
-
-        # types of python components
-        ghpycomp = ghpy.Component.ZuiPythonComponent
-        ipycomp = rcpgh.Components.IronPython2Component
-        py3comp = rcpgh.Components.Python3Component
+        if self.DISPATCHKEY in st:
+            return st[self.DISPATCHKEY]
 
-        # types of csharp components
-        cscomp = scomp.Component_CSNET_Script
-        cs9comp = rcpgh.Components.CSharpComponent
+        def type_str(t):
+            return str(t).split("'")[1]
 
-        # cluster component
-        clustercomp = Grasshopper.Kernel.Special.GH_Cluster
+        # source extractors, return (success, source)
+        def extract_ghpy(obj):
+            source = obj.Code
+            return bool(source), source
 
-        # extract component type strings
-        ghpycomp_str = str(ghpycomp).split("'")[1]
-        cscomp_str = str(cscomp).split("'")[1]
-        ipycomp_str = str(ipycomp).split("'")[1]
-        py3comp_str = str(py3comp).split("'")[1]
-        cs9comp_str = str(cs9comp).split("'")[1]
-        clustercomp_str = str(clustercomp).split("'")[1]
+        def extract_cs(obj):
+            source = obj.ScriptSource.ScriptCode
+            return bool(source), source
 
-        # define script types
-        id_ghpycomp = 'GHPY'
-        id_cscomp = 'CS'
-        id_ipycomp = 'IPY2'
-        id_py3comp = 'PY3'
-        id_cs9comp = 'CS9'
+        def extract_try_get_source(obj):
+            return obj.TryGetSource()
 
-        # init dict for script component storage
-        script_components = {}
+        dispatch = {
+            # old ghpython and c# components
+            type_str(ghpy.Component.ZuiPythonComponent): ('GHPY', extract_ghpy),
+            type_str(scomp.Component_CSNET_Script): ('CS', extract_cs),
+            # new rhino 8 script components
+            type_str(rcpgh.Components.CSharpComponent): ('CS9', extract_try_get_source),
+            type_str(rcpgh.Components.IronPython2Component): ('IPY2', extract_try_get_source),
+            type_str(rcpgh.Components.Python3Component): ('PY3', extract_try_get_source),
+            # clusters are walked, they have no extractor
+            type_str(Grasshopper.Kernel.Special.GH_Cluster): ('CLUSTER', None),
+        }
+        st[self.DISPATCHKEY] = dispatch
+        return dispatch
 
-        # loop over all document components
-        # store all component objects in a dictionary to check
-        # - are all "same" scripts the same code?
-        # - are there scripts without category or version attribute?
-        # - separate old from new scripts, dont export old scripts!
-        for obj in comps:
-            # extract basic info
-            name = obj.Name
-            nickname = obj.NickName
-            iguid = str(obj.InstanceGuid)
-            # extract type string
-            objtype_str = str(obj.GetType())
-            # OLD GHPYTHON COMPONENT
-            if objtype_str == ghpycomp_str:
-                source = obj.Code
-                if source:
-                    print(f'Found Source for OLD GHPY Component "{nickname}" ({iguid})') if verbose else None
-                    scriptcomp = [id_ghpycomp, nickname, name, obj, source]
-                    script_components[iguid] = scriptcomp
-            # OLD C# COMPONENT
-            elif objtype_str == cscomp_str:
-                source = obj.ScriptSource.ScriptCode
-                if source:
-                    print(f'Found Source for OLD CS Component "{nickname}" ({iguid})') if verbose else None
-                    scriptcomp = [id_cscomp, nickname, name, obj, source]
-                    script_components[iguid] = scriptcomp
-            # NEW C#9 COMPONENT
-            elif objtype_str == cs9comp_str:
-                bres, source = obj.TryGetSource()
-                if bres:
-                    print(f'Found Source for CS9 Component "{nickname}" ({iguid})') if verbose else None
-                    scriptcomp = [id_cs9comp, nickname, name, obj, source]
-                    script_components[iguid] = scriptcomp
-            # NEW IRONPYTHON COMPONENT
-            elif objtype_str == ipycomp_str:
-                bres, source = obj.TryGetSource()
-                if bres:
-                    print(f'Found Source for IPY2 Component "{nickname}" ({iguid})') if verbose else None
-                    scriptcomp = [id_ipycomp, nickname, name, obj, source]
-                    script_components[iguid] = scriptcomp
-            # NEW PYTHON3 COMPONENT
-            elif objtype_str == py3comp_str:
-                bres, source = obj.TryGetSource()
-                if bres:
-                    print(f'Found Source for PY3 Component "{nickname}" ({iguid})') if verbose else None
-                    scriptcomp = [id_py3comp, nickname, name, obj, source]
-                    script_components[iguid] = scriptcomp
-            # CLUSTER COMPONENT
-            elif objtype_str == clustercomp_str:
-                # RECURSIVELY STEP THROUGH CLUSTERS AND LOOK FOR SCRIPTS AGAIN...
-                print(f'Processing CLUSTER "{nickname}" ({name}, {iguid}) ...') if verbose else None
-                cluster_scripts = self.process_document_objects(obj.Document(''), verbose=verbose)
-                # add cluster script dict to main dict
-                script_components.update(cluster_scripts)
-
-        return script_components
+    def process_document_objects(self, ghdocument, verbose=False):
+        """
+        Processes GH_Document object and return a list of all script components.
+        Clusters are walked iteratively in document order, every cluster
+        document is only scanned once.
+        """
+        return document_scan.scan_document(ghdocument,
+                                           self.get_dispatch_table(),
+                                           verbose=verbose)
 
     def process_script_components(self, script_components: dict, set_category: str):
         """
         Process found script components and get unique components.
         """
-        unique_script_components = {}
+        return document_scan.process_script_components(script_components,
+                                                       set_category)
 
-        OldScriptsDebug = []
-        CategoryDebug = []
-        VersionDebug = []
-        InfoMessages = []
-
-        for iguid, values in script_components.items():
-            script_type, nickname, name, obj, source = values
-            category = obj.Category
-            version = self.get_source_version(source)
-            script_id = nickname + ' ' + name
-            # NOT SEEN YET SCRIPT COMPONENTS
-            if script_id not in unique_script_components:
-                if script_type == 'GHPY':
-                    OldScriptsDebug.append(f'{script_type} - {nickname} ({name})')
-                    OldScriptsDebug.append('    - IS AN OLD GHPYTHON SCRIPT!')
-                elif script_type == 'CS':
-                    OldScriptsDebug.append(f'{script_type} - {nickname} ({name})')
-                    OldScriptsDebug.append('    - IS AN OLD C# SCRIPT!')
-                if category != set_category:
-                    if category == 'Maths':
-                        CategoryDebug.append(f'{script_type} - {nickname} ({name})')
-                        CategoryDebug.append(f'    - HAS NO CATEGORY ({category})!')
-                    else:
-                        CategoryDebug.append(f'{script_type} - {nickname} ({name})')
-                        CategoryDebug.append(f'    - {category} OUT OF SET CATEGORY {set_category}!')
-                if version is None:
-                    VersionDebug.append(' '.join([script_type, nickname, name]))
-                    VersionDebug.append('    - HAS NO VERSION!')
-                else:
-                    InfoMessages.append(f'{script_type} - {nickname} ({name})')
-                    unique_script_components[script_id] = values
-            # ALREADY SEEN SCRIPT COMPONENTS
-            else:
-                existing_obj = unique_script_components[script_id][3]
-                existing_source = unique_script_components[script_id][4]
-                existing_version = self.get_source_version(existing_source)
-                if version is None:
-                    VersionDebug.append(f'{script_type} - {nickname} ({name})')
-                    VersionDebug.append('    - HAS NO VERSION!')
-                elif existing_version is None and version is not None:
-                    VersionDebug.append(f'{script_type} - {nickname} ({name})')
-                    VersionDebug.append(f'    - VERSION {version} > ALREADY FOUND VERSION {existing_version}!')
-                    # REPLACE FOUND "NONE" VERSION WITH NAMED VERSION!
-                    raise
-                elif version < existing_version:
-                    VersionDebug.append(f'{script_type} - {nickname} ({name})')
-                    VersionDebug.append(f'    - VERSION {version} < {existing_version}! Continuing...')
-                    # REPLACE THE SOURCE OF THE LOWER VERSION WITH HIGHER VERSION SOURCE!
-                    continue
-                elif version > existing_version:
-                    VersionDebug.append(f'{script_type} - {nickname} ({name})')
-                    VersionDebug.append(f'    - VERSION {version} > ALREADY FOUND VERSION {existing_version}!')
-                    # REPLACE THE OBJECT IN DICT WITH NEWER VERSION
-                    raise
-        return unique_script_components, OldScriptsDebug, CategoryDebug, VersionDebug, InfoMessages
-
-    def export_scriptcomp_usrobj(self, scriptcomp, usrobjpath, iconpath=''):
+    def export_scriptcomp_usrobj(self, scriptcomp, usrobjpath, iconpath='', icon=None):
         """
         Automates the creation of a GHPython user object. Based on this thread:
         http://www.grasshopper3d.com/forum/topics/change-the-default-values-for-userobject-popup-menu
         scriptcomp = [script_type, nickname, name, obj, source]
+        An already decoded icon bitmap can be supplied to avoid reloading it.
         """
         try:
             # Make a user object
@@ -210,8 +112,10 @@ class ExportScriptsAndSource(Grasshopper.Kernel.GH_ScriptInstance):
             # Get component object
             obj = scriptcomp[3]
             # Process icon
-            if iconpath:
-                obj.SetIconOverride(System.Drawing.Bitmap.FromFile(iconpath))
+            if icon is None and iconpath:
+                icon = System.Drawing.Bitmap.FromFile(iconpath)
+            if icon is not None:
+                obj.SetIconOverride(icon)
             uo.Icon = obj.Icon_24x24
             # Set its properties based on the GHPython component properties
             uo.BaseGuid = obj.ComponentGuid
@@ -229,6 +133,24 @@ class ExportScriptsAndSource(Grasshopper.Kernel.GH_ScriptInstance):
             return False
         return True
 
+    def get_export_paths(self, scriptcomp, usrobjpath, srcpath):
+        """
+        Get the file paths a script component is exported to. Old scripts
+        do not get their source exported, their source path is None.
+        scriptcomp = [script_type, nickname, name, obj, source]
+        """
+        script_type = scriptcomp[0]
+        name = scriptcomp[2]
+        obj = scriptcomp[3]
+        usrobj_file = os.path.join(usrobjpath, obj.Category + '_' + obj.Name + '.ghuser')
+        if script_type == 'PY3' or script_type == 'IPY2':
+            src_file = os.path.join(srcpath, obj.Category + '_' + name + '.py')
+        elif script_type == 'CS9':
+            src_file = os.path.join(srcpath, obj.Category + '_' + name + '.cs')
+        else:
+            src_file = None
+        return usrobj_file, src_file
+
     def export_scriptcomp_source(self, scriptcomp, srcpath):
         """
         Export the source code of a script component
@@ -260,18 +182,74 @@ class ExportScriptsAndSource(Grasshopper.Kernel.GH_ScriptInstance):
                 f.write(code)
         return loc
 
+    def write_source_file(self, src_file, code):
+        """
+        Write source code to a file and return the lines of code. Does not
+        touch any Grasshopper objects, so it is safe to call from a worker
+        thread.
+        """
+        with open(src_file, 'w') as f:
+            f.write(code)
+        return len(code.splitlines())
+
+    def export_pipelined(self, to_export, usrobjpath, srcpath, iconpath):
+        """
+        Pipelined export of script components. The icon is decoded only once,
+        the source files are written by a thread pool while the userobjects
+        are serialized in one batch on the solver thread.
+        to_export = [(script_id, scriptcomp), ...]
+        Returns a dict {script_id: (result, loc)} and the stage timings.
+        """
+        timings = []
+        t_start = time.perf_counter()
+        # STAGE 1: decode the icon once and share it between all components
+        t0 = time.perf_counter()
+        icon = None
+        if iconpath and os.path.isfile(iconpath):
+            icon = System.Drawing.Bitmap.FromFile(iconpath)
+        timings.append(('icon', time.perf_counter() - t0))
+        # collect everything needed for the source writes on the solver
+        # thread, the worker threads never touch any grasshopper objects
+        os.makedirs(srcpath, exist_ok=True)
+        source_jobs = []
+        for script_id, scriptcomp in to_export:
+            src_file = self.get_export_paths(scriptcomp, usrobjpath, srcpath)[1]
+            if src_file:
+                source_jobs.append((script_id, src_file, scriptcomp[4].replace('\r', '')))
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(8, max(1, len(source_jobs)))) as pool:
+            # STAGE 2: write the source files in the background
+            t0 = time.perf_counter()
+            futures = {script_id: pool.submit(self.write_source_file, src_file, code)
+                       for script_id, src_file, code in source_jobs}
+            # STAGE 3: serialize all userobjects in one batch meanwhile
+            t1 = time.perf_counter()
+            for script_id, scriptcomp in to_export:
+                results[script_id] = self.export_scriptcomp_usrobj(scriptcomp, usrobjpath, icon=icon)
+            timings.append(('userobjects', time.perf_counter() - t1))
+            # wait for the remaining source writes
+            locs = {script_id: f.result() for script_id, f in futures.items()}
+            timings.append(('sources', time.perf_counter() - t0))
+        results = {script_id: (res, locs.get(script_id, 0)) for script_id, res in results.items()}
+        timings.append(('total', time.perf_counter() - t_start))
+        return results, timings
+
     def RunScript(self,
             RunComponentAnalysis: bool,
             ExportUserObjectsAndSource: bool,
             Category: str,
             UserObjFolder,
             SourceFolder,
-            IconPath: str):
+            IconPath: str,
+            ForceExport: bool,
+            Pipelined: bool):
         # Init outputs
         OldScriptsDebug = Grasshopper.DataTree[object]()
         CategoryDebug = Grasshopper.DataTree[object]()
         VersionDebug = Grasshopper.DataTree[object]()
         InfoMessages = Grasshopper.DataTree[object]()
+        ExportedComponents = Grasshopper.DataTree[object]()
+        Timings = Grasshopper.DataTree[object]()
 
         # Iterate the canvas and get to the GHPython components
         grasshopper_document = ghenv.Component.OnPingDocument()
@@ -299,14 +277,53 @@ class ExportScriptsAndSource(Grasshopper.Kernel.GH_ScriptInstance):
         if ExportUserObjectsAndSource and RunComponentAnalysis:
             # - SAVE USEROBJECT
             # - SAVE SOURCE
+            # - SKIP UNCHANGED COMPONENTS
+            manifest = ExportManifest.load(manifest_path(srcpath))
+            icon_sha256 = hash_file(iconpath)
+            ExportedComponents = []
+            to_export = []
+            entries = {}
+            skipped = 0
+            t0 = time.perf_counter()
             for script_id, scriptcomp in unique_script_components.items():
-                loc = self.export_scriptcomp_source(scriptcomp, srcpath)
-                res = self.export_scriptcomp_usrobj(scriptcomp, usrobjpath, iconpath)
+                files = [fp for fp in self.get_export_paths(scriptcomp, usrobjpath, srcpath) if fp]
+                entry = manifest.make_entry(scriptcomp[4],
+                                            self.get_source_version(scriptcomp[4]),
+                                            icon_sha256,
+                                            files)
+                if not ForceExport and manifest.is_current(script_id, entry):
+                    skipped += 1
+                    continue
+                entries[script_id] = entry
+                to_export.append((script_id, scriptcomp))
+            stage_timings = [('cache', time.perf_counter() - t0)]
+            if Pipelined:
+                results, timings = self.export_pipelined(to_export, usrobjpath, srcpath, iconpath)
+                stage_timings.extend(timings)
+            else:
+                t0 = time.perf_counter()
+                results = {}
+                for script_id, scriptcomp in to_export:
+                    loc = self.export_scriptcomp_source(scriptcomp, srcpath)
+                    res = self.export_scriptcomp_usrobj(scriptcomp, usrobjpath, iconpath)
+                    results[script_id] = (res, loc)
+                stage_timings.append(('total', time.perf_counter() - t0))
+            for script_id, scriptcomp in to_export:
+                res, loc = results[script_id]
                 print(res, loc)
+                if res:
+                    ExportedComponents.append(f'{scriptcomp[0]} - {scriptcomp[1]} ({scriptcomp[2]})')
+                    manifest.update(script_id, entries[script_id])
+            Timings = [f'{stage}: {seconds:.3f} s' for stage, seconds in stage_timings]
+            manifest.save()
+            rml = ghenv.Component.RuntimeMessageLevel.Remark
+            ghenv.Component.AddRuntimeMessage(
+                rml,
+                f'Exported {len(ExportedComponents)} components, skipped {skipped} unchanged components.')
         elif ExportUserObjectsAndSource and not RunComponentAnalysis:
             rml = ghenv.Component.RuntimeMessageLevel.Warning
             ghenv.Component.AddRuntimeMessage(
                 rml,
                 'UserObjects and Source cannot be exported without running Component Analysis!')
 
-        return OldScriptsDebug, CategoryDebug, VersionDebug, InfoMessages
+        return OldScriptsDebug, CategoryDebug, VersionDebug, InfoMessages, ExportedComponents, Timings
@@ -0,0 +1,114 @@
+#! python3
+# venv: DDU_SLICER
+# r: numpy==1.26.4
+# r: scipy==1.13.0
+
+# RHINO SDK IMPORTS
+import System
+import Rhino
+import Grasshopper
+
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# THIRD PARTY IMPORTS
+import numpy as np
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+from ddu_clayslicer.heat_method import get_cache, mesh_hash
+from ddu_clayslicer.instrumentation import timed
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "HeatMethodCached"
+ghenv.Component.NickName = "HeatMethodCached"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "1 Slicing"
+
+class HeatMethodCached(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Direct (non-iterative) version of HeatMethodStatic. Computes a scalar
+    field which is 1 at the HeatPoints and 0 at the ColdPoints from the
+    geodesic distances to both (heat method). The sparse factorizations
+    only depend on the mesh and are kept in a cache shared by all
+    components, keyed by a hash of the mesh, so changing the heat or cold
+    points (or the contour count downstream) does not factorize again.
+
+    CacheSize is the maximum number of cached meshes, MemoryLimit the
+    maximum memory of the cache in MB (least recently used meshes are
+    evicted first). HeatMesh, Values and Gradient match the outputs of
+    HeatMethodStatic.
+    """
+
+    def meshArrays(self, mesh):
+        mesh = mesh.DuplicateMesh()
+        mesh.Faces.ConvertQuadsToTriangles()
+        vertices = np.array([(p.X, p.Y, p.Z)
+                             for p in mesh.Vertices.ToPoint3dArray()],
+                            dtype=np.float64).reshape(-1, 3)
+        faces = np.array([(f.A, f.B, f.C) for f in mesh.Faces],
+                         dtype=np.int64).reshape(-1, 3)
+        return mesh, vertices, faces
+
+    def sourceVertices(self, vertices, points):
+        # all vertices closer than the tolerance, like HeatMethodStatic
+        tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
+        found = []
+        for pt in points:
+            d2 = ((vertices - (pt.X, pt.Y, pt.Z)) ** 2).sum(axis=1)
+            found.append(np.flatnonzero(d2 < tol))
+        return np.unique(np.concatenate(found)) if found else \
+            np.zeros(0, dtype=np.int64)
+
+    @timed("HeatMethodCached", store=st)
+    def RunScript(self,
+            RefMesh: Rhino.Geometry.Mesh,
+            HeatPoints: System.Collections.Generic.List[Rhino.Geometry.Point3d],
+            ColdPoints: System.Collections.Generic.List[Rhino.Geometry.Point3d],
+            TextureScale: float,
+            CacheSize: int,
+            MemoryLimit: float):
+
+        HeatMesh = None
+        Values = []
+        Gradient = []
+
+        if RefMesh is None:
+            ghenv.Component.AddRuntimeMessage(
+                Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning,
+                "Input Parameter RefMesh failed to collect data!")
+            return HeatMesh, Values, Gradient
+
+        mesh, vertices, faces = self.meshArrays(RefMesh)
+        hot = self.sourceVertices(vertices, HeatPoints or [])
+        cold = self.sourceVertices(vertices, ColdPoints or [])
+        if not len(hot):
+            ghenv.Component.AddRuntimeMessage(
+                Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning,
+                "No mesh vertices found at the HeatPoints!")
+            return HeatMesh, Values, Gradient
+
+        cache = get_cache(st, CacheSize or None,
+                          int(MemoryLimit * 1e6) if MemoryLimit else None)
+        misses = cache.misses
+        solver = cache.get(vertices, faces, key=mesh_hash(vertices, faces))
+        values = solver.scalar_field(hot, cold)
+        gradient = solver.vertex_gradient(values)
+
+        # set the values as texture coordinates like HeatMethodStatic
+        scale = TextureScale if TextureScale else 1.0
+        for i, v in enumerate(values.tolist()):
+            mesh.TextureCoordinates.SetTextureCoordinate(
+                i, Rhino.Geometry.Point2f(0.0, v * scale))
+        HeatMesh = mesh
+        Values = values.tolist()
+        Gradient = [Rhino.Geometry.Vector3d(*g) for g in gradient.tolist()]
+
+        stats = cache.stats
+        ghenv.Component.Message = "{0}\n{1} Meshes, {2} MB".format(
+            "Factorized" if cache.misses > misses else "Cached",
+            stats['entries'], stats['megabytes'])
+        return HeatMesh, Values, Gradient
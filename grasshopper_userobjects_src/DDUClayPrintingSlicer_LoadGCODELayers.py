@@ -0,0 +1,106 @@
+# RHINO SDK IMPORTS
+import System
+import Rhino
+import Grasshopper
+
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+from ddu_clayslicer.gcode_parser import parse_gcode, read_layers
+from ddu_clayslicer.paths import resolve_path
+from ddu_clayslicer.instrumentation import timed
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "LoadGCODELayers"
+ghenv.Component.NickName = "LoadGCODELayers"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "7 GCODE"
+
+class LoadGCODELayers(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Loads a range of layers of a saved .gcode file without reading it into
+    a list of lines. The file is indexed once (memory-mapped and parsed
+    into columns), the index is kept until the file changes, so changing
+    Start or Count only parses the bytes of the requested layers.
+
+    G, X, Y, Z, E and F match the outputs of ParseGCODE (G0/G1 moves with X
+    and Y, missing values use the last given value). Layer outputs the
+    layer number of every move, LayerCount the number of layers in the
+    file.
+    """
+
+    # UNIQUE STICKY KEY FOR STORING THE LAYER INDEX
+    INDEXKEY = str(ghenv.Component.InstanceGuid) + "___GCODEINDEX"
+
+    def getIndex(self, fp, reload):
+        # reuse the index of the file if it did not change
+        index = st.get(self.INDEXKEY, None)
+        if (not reload and index is not None and index.path == fp
+                and index.is_current()):
+            return index, None
+        columns, index = parse_gcode(fp)
+        st[self.INDEXKEY] = index
+        return index, columns
+
+    @timed("LoadGCODELayers", store=st)
+    def RunScript(self,
+            Path: str,
+            Start: int,
+            Count: int,
+            Reload: bool):
+
+        G = []
+        X = []
+        Y = []
+        Z = []
+        E = []
+        F = []
+        Layer = []
+        LayerCount = 0
+
+        if not Path:
+            ghenv.Component.AddRuntimeMessage(
+                Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning,
+                "Input Parameter Path failed to collect Data!")
+            return G, X, Y, Z, E, F, Layer, LayerCount
+
+        doc = ghenv.Component.OnPingDocument()
+        try:
+            fp = resolve_path(Path, doc.FilePath if doc else None)
+            index, columns = self.getIndex(fp, Reload)
+        except (IOError, OSError, ValueError) as e:
+            ghenv.Component.AddRuntimeMessage(
+                Grasshopper.Kernel.GH_RuntimeMessageLevel.Error, str(e))
+            return G, X, Y, Z, E, F, Layer, LayerCount
+        LayerCount = index.layer_count
+
+        # the requested layers, all remaining layers if Count is not set
+        start = min(max(Start or 0, 0), LayerCount)
+        stop = LayerCount if not Count else min(start + Count, LayerCount)
+        if columns is not None:
+            lo, hi = int(index.starts[start]), int(index.starts[stop])
+            x, y, z, e, f = [columns.filled(ax)[lo:hi] for ax in "XYZEF"]
+            columns = columns.select(slice(lo, hi))
+        else:
+            columns = read_layers(index, start, stop)
+            x, y, z, e, f = [columns.filled(ax) for ax in "XYZEF"]
+
+        # G0/G1 moves with X and Y coordinates, like ParseGCODE
+        moves = (((columns.command == 0) | (columns.command == 1)) &
+                 (columns.x == columns.x) & (columns.y == columns.y))
+        G = [str(c) for c in columns.command[moves].tolist()]
+        X = x[moves].tolist()
+        Y = y[moves].tolist()
+        # values which were never given default to 0.0, like ParseGCODE
+        Z, E, F = [[v if v == v else 0.0 for v in arr[moves].tolist()]
+                   for arr in (z, e, f)]
+        Layer = index.numbers[columns.layer[moves]].tolist()
+
+        ghenv.Component.Message = "{0}/{1} Layers".format(stop - start,
+                                                         LayerCount)
+        return G, X, Y, Z, E, F, Layer, LayerCount
@@ -1,4 +1,5 @@
 # PYTHON STANDARD LIBRARY IMPORTS
+import threading
 import time
 
 # RHINO SDK IMPORTS
@@ -14,6 +15,19 @@ from scriptcontext import sticky as st
 # ADDITIONAL IMPORTS
 from System.Drawing import Color
 
+# DDU CLAYSLICER LIBRARY IMPORTS
+try:
+    from ddu_clayslicer.update_scheduler import DebouncedScheduler
+    from ddu_clayslicer.geometry_cache import LayerGeometryCache
+except ImportError:
+    DebouncedScheduler = None
+    LayerGeometryCache = None
+try:
+    from ddu_clayslicer.instrumentation import timed
+except ImportError:
+    def timed(*args, **kwargs):
+        return lambda func: func
+
 # GHENV COMPONENT SETTINGS
 ghenv.Component.Name = "PipelineController"
 ghenv.Component.NickName = "PipelineController"
@@ -25,13 +39,24 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach
     License: MIT License
-    Version: 250314
+    Version: 261018
+
+    With DynamicUpdate enabled, Rhino document events are coalesced into
+    debounced updates if the ddu_clayslicer library is available: the
+    component is only updated after QuietPeriod seconds without changes (or
+    at the latest MaxLatency seconds after the first change) and only if
+    objects on one of the referenced layers were touched. Retrieved geometry
+    is cached per layer and per object (keyed by the runtime serial number
+    of the Rhino object), so only changed objects are coerced again.
     """
 
     # UNIQUE STICKY KEY OR STORING LAYERNAMES
     LNKEY = str(ghenv.Component.InstanceGuid) + "___LAYERNAMES"
     EVKEY = str(ghenv.Component.InstanceGuid) + "___EVENTS"
     FLAG = str(ghenv.Component.InstanceGuid) + "___FLAG"
+    SCHEDKEY = str(ghenv.Component.InstanceGuid) + "___SCHEDULER"
+    TIMERKEY = str(ghenv.Component.InstanceGuid) + "___TIMER"
+    CACHEKEY = str(ghenv.Component.InstanceGuid) + "___GEOCACHE"
 
     # COMPONENT UPDATING -------------------------------------------------------
 
@@ -73,6 +98,87 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
 
     def unsubEvent(self, sender, e):
         self.unsubscribe_all()
+        self.cancelTimer()
+        if self.CACHEKEY in st:
+            st[self.CACHEKEY].clear()
+
+    # DEBOUNCED SCHEDULING -----------------------------------------------------
+
+    def getScheduler(self):
+        if self.SCHEDKEY not in st:
+            st[self.SCHEDKEY] = DebouncedScheduler()
+        return st[self.SCHEDKEY]
+
+    def eventLayers(self, e):
+        # layer indices of all objects affected by an event
+        oldattr = getattr(e, "OldAttributes", None)
+        if oldattr is not None:
+            # attribute changes only matter if the layer has changed
+            newidx = e.NewAttributes.LayerIndex
+            if oldattr.LayerIndex == newidx:
+                return []
+            return [oldattr.LayerIndex, newidx]
+        oldobj = getattr(e, "OldRhinoObject", None)
+        if oldobj is not None:
+            return [oldobj.Attributes.LayerIndex,
+                    e.NewRhinoObject.Attributes.LayerIndex]
+        obj = getattr(e, "TheObject", None)
+        if obj is not None:
+            return [obj.Attributes.LayerIndex]
+        objs = getattr(e, "Objects", None)
+        if objs is not None:
+            return [o.Attributes.LayerIndex for o in objs]
+        return []
+
+    def touchEvent(self, sender, e):
+        layers = self.eventLayers(e)
+        cache = self.getGeometryCache()
+        cache.invalidate_layers(layers)
+        objid = getattr(e, "ObjectId", None)
+        if objid is not None:
+            cache.invalidate_object(objid)
+        if self.getScheduler().touch(layers):
+            self.armTimer()
+
+    def armTimer(self, delay=None):
+        # only one timer per component, it re-arms itself while events
+        # keep coming in
+        timer = st.get(self.TIMERKEY, None)
+        if timer is not None and timer.is_alive():
+            return
+        if delay is None:
+            delay = self.getScheduler().remaining() or 0.0
+        timer = threading.Timer(delay, self.timerElapsed)
+        timer.daemon = True
+        st[self.TIMERKEY] = timer
+        timer.start()
+
+    def cancelTimer(self):
+        timer = st.pop(self.TIMERKEY, None)
+        if timer is not None:
+            timer.cancel()
+        if self.SCHEDKEY in st:
+            st[self.SCHEDKEY].reset()
+
+    def timerElapsed(self):
+        # called from the timer thread, check the scheduler on the ui thread
+        def callBack():
+            st.pop(self.TIMERKEY, None)
+            scheduler = self.getScheduler()
+            if scheduler.take():
+                self.updateComponent()
+            elif scheduler.pending:
+                self.armTimer(scheduler.remaining())
+        Rhino.RhinoApp.InvokeOnUiThread(System.Action(callBack))
+
+    def watchLayers(self, layers):
+        # resolve the referenced layers to indices once per solution
+        if not layers:
+            self.getScheduler().watch(None)
+            return
+        doc = Rhino.RhinoDoc.ActiveDoc
+        indices = [doc.Layers.FindByFullPath(layer, -1) for layer in layers]
+        self.getScheduler().watch([i for i in indices if i >= 0])
 
     # LAYER SET HANDLING -------------------------------------------------------
 
@@ -163,25 +269,72 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
             st[self.LNKEY] = None
             return None
 
+    # GEOMETRY RETRIEVAL -------------------------------------------------------
+
+    def getGeometryCache(self):
+        if self.CACHEKEY not in st:
+            st[self.CACHEKEY] = LayerGeometryCache()
+        return st[self.CACHEKEY]
+
+    def coerceObject(self, rhobj):
+        geo = rhobj.Geometry
+        if type(geo) == Rhino.Geometry.Point:
+            return Rhino.Geometry.Point3d(geo.Location)
+        return geo
+
+    def resolveLayers(self, doc, layers):
+        # resolve all referenced layer paths to layer indices once
+        indices = []
+        for layer in layers:
+            index = doc.Layers.FindByFullPath(layer, -1)
+            if index < 0:
+                raise ValueError("{0} does not exist in LayerTable".format(layer))
+            indices.append(index)
+        return indices
+
+    def queryLayerObjects(self, doc, indices):
+        # a single enumeration of the object table, bucketed by layer index
+        buckets = dict((i, []) for i in indices)
+        settings = Rhino.DocObjects.ObjectEnumeratorSettings()
+        settings.NormalObjects = True
+        settings.LockedObjects = True
+        settings.HiddenObjects = True
+        settings.DeletedObjects = False
+        for rhobj in doc.Objects.GetObjectList(settings):
+            bucket = buckets.get(rhobj.Attributes.LayerIndex)
+            if bucket is not None:
+                bucket.append(rhobj)
+        return buckets
+
     def retrieveGeometry(self, layers):
+        doc = Rhino.RhinoDoc.ActiveDoc
+        indices = self.resolveLayers(doc, layers)
+        if LayerGeometryCache is not None:
+            cache = self.getGeometryCache()
+            cache.reset_counters()
+            stale = [i for i in indices if not cache.is_current(i)]
+        else:
+            cache = None
+            stale = indices
+        # only query the document if a layer has to be (re-)read
+        buckets = self.queryLayerObjects(doc, stale) if stale else {}
         geometry = []
-        # switch to rhinodoc
-        sc.doc = Rhino.RhinoDoc.ActiveDoc
-        # loop over layers
-        for i, layer in enumerate(layers):
-            objs = [rs.coercegeometry(obj) for obj in rs.ObjectsByLayer(layer)]
-            if objs is None:
-                objs = []
-            for i, obj in enumerate(objs):
-                if type(obj) == Rhino.Geometry.Point:
-                    objs[i] = Rhino.Geometry.Point3d(obj.Location)
-            geometry.append(objs)
-        # switch back to ghdoc
-        sc.doc = ghdoc
+        for index in indices:
+            rhobjs = buckets.get(index, [])
+            if cache is None:
+                geometry.append([self.coerceObject(o) for o in rhobjs])
+                continue
+            def listObjects(rhobjs=rhobjs):
+                return ((o.Id, o.RuntimeSerialNumber, o) for o in rhobjs)
+            geometry.append(cache.get_layer(index, listObjects,
+                                            self.coerceObject))
         return geometry
 
+    @timed("PipelineController", store=st)
     def RunScript(self,
             DynamicUpdate: bool,
+            QuietPeriod: float,
+            MaxLatency: float,
             CreateAndRef: bool,
             LoadAndRef: bool,
             ParentLayerPrefix: str,
@@ -195,7 +348,20 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
         AssemblyGeo = Grasshopper.DataTree[object]()
         CurrentLayers = []
         # subscribe to events for automatic component updating -----------------
-        if DynamicUpdate:
+        if DynamicUpdate and DebouncedScheduler is not None:
+            self.getScheduler().configure(QuietPeriod, MaxLatency)
+            self.subscribe_to(Rhino.RhinoDoc.BeforeTransformObjects, self.touchEvent, "BeforeTransformObjects")
+            self.subscribe_to(Rhino.RhinoDoc.DeleteRhinoObject, self.touchEvent, "DeleteRhinoObject")
+            self.subscribe_to(Rhino.RhinoDoc.AddRhinoObject, self.touchEvent, "AddRhinoObject")
+            self.subscribe_to(Rhino.RhinoDoc.UndeleteRhinoObject, self.touchEvent, "UndeleteRhinoObjects")
+            self.subscribe_to(Rhino.RhinoDoc.ReplaceRhinoObject, self.touchEvent, "ReplaceRhinoObject")
+            self.subscribe_to(Rhino.RhinoDoc.ModifyObjectAttributes, self.touchEvent, "ModifyObjectAttributes")
+            self.subscribe_to(Rhino.RhinoDoc.CloseDocument, self.unsubEvent, "CloseDocument")
+            self.subscribe_to(Rhino.RhinoDoc.NewDocument, self.unsubEvent, "NewDocument")
+        elif DynamicUpdate:
+            # fall back to updating on the next idle after any event
+            if self.FLAG not in st:
+                st[self.FLAG] = False
             self.subscribe_to(Rhino.RhinoDoc.BeforeTransformObjects, self.flagEvent, "BeforeTransformObjects")
             self.subscribe_to(Rhino.RhinoDoc.DeleteRhinoObject, self.flagEvent, "DeleteRhinoObject")
             self.subscribe_to(Rhino.RhinoDoc.AddRhinoObject, self.flagEvent, "AddRhinoObject")
@@ -206,6 +372,11 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
             self.subscribe_to(Rhino.RhinoDoc.NewDocument, self.unsubEvent, "NewDocument")
         else:
             self.unsubscribe_all()
+            self.cancelTimer()
+        # the geometry cache can only skip unchanged layers if it is kept up
+        # to date by the events
+        if LayerGeometryCache is not None:
+            self.getGeometryCache().track(DynamicUpdate)
         # catch missing layer colours ------------------------------------------
         laycount = len(ReferenceLayers + AssistanceLayers)
         if not LayerColours or len(LayerColours) == 0:
@@ -234,6 +405,9 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
                 CurrentLayers = self.LoadCurrentLayers(ReferenceLayers)
             except Exception:
                 return AssemblyGeo, CurrentLayers
+        # only events on the referenced layers trigger updates
+        if DynamicUpdate and DebouncedScheduler is not None:
+            self.watchLayers(CurrentLayers)
         # retrieve all geometry
         if CurrentLayers:
             try:
@@ -250,5 +424,10 @@ class PipelineController(Grasshopper.Kernel.GH_ScriptInstance):
         if allgeometry:
             for i, geo in enumerate(allgeometry):
                 AssemblyGeo.AddRange(geo, Grasshopper.Kernel.Data.GH_Path(i))
+        if allgeometry and LayerGeometryCache is not None:
+            cache = self.getGeometryCache()
+            ghenv.Component.AddRuntimeMessage(ghenv.Component.RuntimeMessageLevel.Remark,
+                "Geometry cache: {0} hits, {1} misses".format(cache.hits,
+                                                             cache.misses))
         # return outputs
         return AssemblyGeo, CurrentLayers
\ No newline at end of file
@@ -6,6 +6,12 @@ import Grasshopper
 import System
 import Rhino
 
+# DDU CLAYSLICER LIBRARY IMPORTS
+try:
+    from ddu_clayslicer.rounding import round_branches
+except ImportError:
+    round_branches = None
+
 # GHENV COMPONENT SETTINGS
 ghenv.Component.Name = "RoundToDecimal"
 ghenv.Component.NickName = "RTD"
@@ -16,7 +22,11 @@ class RoundToDecimal(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach
     License: MIT License
-    Version: 250423
+    Version: 261018
+
+    Rounds a list of Numbers. Numbers beyond the last of the DecimalPlaces
+    use the last one. See RoundToDecimalBatch to round whole trees in one
+    call.
     """
 
     def RunScript(self,
@@ -29,15 +39,22 @@ class RoundToDecimal(Grasshopper.Kernel.GH_ScriptInstance):
             DecimalPlaces = list(DecimalPlaces)
 
         if Numbers and Numbers != [None]:
-            rounded = []
-            for i, num in enumerate(Numbers):
-                # retrieve decimalplaces
-                if i < len(DecimalPlaces):
-                    dp = DecimalPlaces[i]
-                else:
-                    dp = DecimalPlaces[-1]
-                # round number
-                rounded.append(round(num, dp))
+            if round_branches is not None:
+                # vectorized rounding if the library is available
+                rounded = round_branches([Numbers], [DecimalPlaces])[0][0]
+            else:
+                rounded = []
+                for i, num in enumerate(Numbers):
+                    if num is None:
+                        rounded.append(None)
+                        continue
+                    # retrieve decimalplaces
+                    if i < len(DecimalPlaces):
+                        dp = DecimalPlaces[i]
+                    else:
+                        dp = DecimalPlaces[-1]
+                    # round number
+                    rounded.append(round(num, dp))
         else:
             rounded = Grasshopper.DataTree[object]()
 
@@ -0,0 +1,85 @@
+# PYTHON STANDARD LIBRARY IMPORTS
+from __future__ import division, print_function
+
+# GHPYTHONLIB SDK IMPORTS
+import Grasshopper
+import System
+import Rhino
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+try:
+    from ddu_clayslicer.rounding import round_branches
+except ImportError:
+    round_branches = None
+
+# GHENV COMPONENT SETTINGS
+ghenv.Component.Name = "RoundToDecimalBatch"
+ghenv.Component.NickName = "RTDBatch"
+ghenv.Component.Category = "DDUClayPrintingSlicer"
+ghenv.Component.SubCategory = "9 Utilities"
+
+class RoundToDecimalBatch(Grasshopper.Kernel.GH_ScriptInstance):
+    """
+    Author: Max Benjamin Eschenbach
+    License: MIT License
+    Version: 261018
+
+    Batch version of RoundToDecimal. Rounds a whole tree of Numbers in one
+    call. DecimalPlaces are matched per branch (longest list) and broadcast
+    over the numbers of a branch, numbers beyond the last decimal place use
+    the last one. Empty items are passed through. Strings outputs the
+    rounded numbers as fixed-decimal strings (i.e. for G-code).
+    """
+
+    def roundBranch(self, numbers, decimals):
+        # fallback if the ddu_clayslicer library is not available
+        rounded = []
+        strings = []
+        for i, num in enumerate(numbers):
+            if num is None:
+                rounded.append(None)
+                strings.append(None)
+                continue
+            # retrieve decimalplaces
+            if i < len(decimals):
+                dp = decimals[i]
+            else:
+                dp = decimals[-1]
+            # round number
+            rounded.append(round(num, dp))
+            strings.append("{0:.{1}f}".format(rounded[-1], max(dp, 0)))
+        return rounded, strings
+
+    def RunScript(self,
+            Numbers: Grasshopper.DataTree[float],
+            DecimalPlaces: Grasshopper.DataTree[int]):
+
+        Rounded = Grasshopper.DataTree[object]()
+        Strings = Grasshopper.DataTree[object]()
+
+        if Numbers.DataCount == 0:
+            return Rounded, Strings
+
+        branches = [list(br) for br in Numbers.Branches]
+        decimal_branches = [list(br) or [0] for br in DecimalPlaces.Branches]
+        if not decimal_branches:
+            decimal_branches = [[0]]
+
+        if round_branches is not None:
+            rounded, strings = round_branches(branches,
+                                              decimal_branches,
+                                              strings=True)
+        else:
+            rounded = []
+            strings = []
+            for k, branch in enumerate(branches):
+                decimals = decimal_branches[min(k, len(decimal_branches) - 1)]
+                r, s = self.roundBranch(branch, decimals)
+                rounded.append(r)
+                strings.append(s)
+
+        for k, path in enumerate(Numbers.Paths):
+            Rounded.AddRange(rounded[k], path)
+            Strings.AddRange(strings[k], path)
+
+        return Rounded, Strings
@@ -8,6 +8,24 @@ import Rhino
 import Grasshopper
 import rhinoscriptsyntax as rs
 
+# CUSTOM RHINO IMPORTS
+from scriptcontext import sticky as st
+
+# DDU CLAYSLICER LIBRARY IMPORTS
+try:
+    from ddu_clayslicer.gcode_writer import write_gcode
+    from ddu_clayslicer.gcode_export import export_gcode_async
+    from ddu_clayslicer import gcode_codecs
+except ImportError:
+    write_gcode = None
+    export_gcode_async = None
+    gcode_codecs = None
+try:
+    from ddu_clayslicer.instrumentation import timed
+except ImportError:
+    def timed(*args, **kwargs):
+        return lambda func: func
+
 # GHENV COMPONENT SETTINGS
 ghenv.Component.Name = "SaveGCODE"
 ghenv.Component.NickName = "SaveGCODE"
@@ -18,9 +36,65 @@ class SaveGCODE(Grasshopper.Kernel.GH_ScriptInstance):
     """
     Author: Max Benjamin Eschenbach
     License: MIT License
-    Version: 250314
+    Version: 261018
     """
 
+    # UNIQUE STICKY KEY FOR STORING THE RUNNING EXPORT JOB
+    JOBKEY = str(ghenv.Component.InstanceGuid) + "___EXPORTJOB"
+
+    # BACKGROUND EXPORT --------------------------------------------------------
+
+    def showProgress(self, job):
+        # called from the export thread, so update the ui on the ui thread
+        def callBack():
+            ghenv.Component.Message = job.message
+            Grasshopper.Instances.RedrawCanvas()
+        Rhino.RhinoApp.InvokeOnUiThread(System.Action(callBack))
+
+    def expireOnDone(self, job):
+        # called from the export thread, expire the component on the ui
+        # thread so that the result of the job gets reported
+        def callBack():
+            ghenv.Component.ExpireSolution(True)
+        Rhino.RhinoApp.InvokeOnUiThread(System.Action(callBack))
+
+    def startExport(self, fp, GCODE, fmt, level):
+        # snapshot gcode and start export, cancelling any running export
+        job = export_gcode_async(fp,
+                                 GCODE,
+                                 previous=st.get(self.JOBKEY, None),
+                                 on_progress=self.showProgress,
+                                 on_done=self.expireOnDone,
+                                 fmt=fmt,
+                                 level=level)
+        st[self.JOBKEY] = job
+        ghenv.Component.Message = job.message
+
+    def reportExport(self):
+        # report the result of a finished background export once
+        job = st.get(self.JOBKEY, None)
+        if job is None:
+            return
+        ghenv.Component.Message = job.message
+        if not job.done:
+            return
+        st.pop(self.JOBKEY)
+        if job.error is None:
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Remark
+            ghenv.Component.AddRuntimeMessage(rml,
+                                   ("Successfully wrote {0} "
+                                    "to {1}!".format(job.stats.summary(),
+                                                     basename(job.path))))
+        elif job.state == "CANCELLED":
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
+            ghenv.Component.AddRuntimeMessage(rml, str(job.error))
+        else:
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Error
+            ghenv.Component.AddRuntimeMessage(rml,
+                                   ("Writing {0} failed: "
+                                    "{1}".format(basename(job.path),
+                                                 job.error)))
+
     def SaveFileDialog(self, title=None, filter=None, folder=None,
                        filename=None, extension=None):
         """
@@ -49,7 +123,33 @@ class SaveGCODE(Grasshopper.Kernel.GH_ScriptInstance):
         # return None if something goes wrong while picking the file
         return None
 
-    def RunScript(self, Save: bool, GCODE: System.Collections.Generic.List[object]):
+    @timed("SaveGCODE", store=st)
+    def RunScript(self,
+            Save: bool,
+            GCODE: System.Collections.Generic.List[object],
+            Async: bool,
+            Format: str,
+            Level: int):
+        # report on previously started background exports
+        if not Save:
+            self.reportExport()
+        # verify output format, defaults to plain text gcode
+        fmt = Format.strip().lower() if Format else "text"
+        if fmt != "text" and not gcode_codecs:
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
+            ghenv.Component.AddRuntimeMessage(rml,
+                ("Format {0} requires the ddu_clayslicer library! "
+                 "Falling back to text.".format(fmt)))
+            fmt = "text"
+        elif gcode_codecs and fmt not in gcode_codecs.EXTENSIONS:
+            rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Error
+            ghenv.Component.AddRuntimeMessage(rml,
+                ("Unknown Format {0}! Use one of: "
+                 "{1}".format(fmt, ", ".join(gcode_codecs.EXTENSIONS))))
+            return
+        ext = gcode_codecs.EXTENSIONS[fmt] if gcode_codecs else ".gcode"
+        # compression level is only used for compressed formats
+        level = Level if Level else None
         # on button click, execute save
         if Save and GCODE:
             if not GCODE or GCODE == [None]:
@@ -57,21 +157,32 @@ class SaveGCODE(Grasshopper.Kernel.GH_ScriptInstance):
                 return
             fp = self.SaveFileDialog(
                                 "Save GCODE File",
-                                "GCODE Files (*.gcode)",
+                                "GCODE Files (*{0})".format(ext),
                                 dirname(ghenv.Component.OnPingDocument().FilePath),
                                 None,
-                                ".gcode")
+                                ext)
             # write gcode to selected file
             if fp:
                 # mac os file extension fix
-                if not fp.endswith(".gcode"):
-                    fp = fp + ".gcode"
-                # write every line to file
+                if not fp.endswith(ext):
+                    fp = fp + ext
+                rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Remark
+                # write lines to file on a background thread
+                if Async and export_gcode_async:
+                    self.startExport(fp, GCODE, fmt, level)
+                    return
+                # write lines to file in large buffered chunks
+                if write_gcode:
+                    stats = write_gcode(fp, GCODE, fmt=fmt, level=level)
+                    ghenv.Component.AddRuntimeMessage(rml,
+                                       ("Successfully wrote {0} "
+                                        "to {1}!".format(stats.summary(),
+                                                         basename(fp))))
+                    return
+                # fallback if the ddu_clayslicer library is not available
                 with open(fp, "w") as f:
-                    for l in GCODE:
-                        f.write(l + "\n")
+                    f.write("\n".join(GCODE) + "\n")
                 # report success
-                rml = Grasshopper.Kernel.GH_RuntimeMessageLevel.Remark
                 ghenv.Component.AddRuntimeMessage(rml,
                                        ("Successfully wrote {0} "
                                         "lines to {1}!".format(len(GCODE),